@@ -0,0 +1,47 @@
+"""progress attempt counter
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Tables are created by Base.metadata.create_all on startup, which already
+    # includes these columns on a fresh database
+    op.execute("ALTER TABLE user_progress ADD COLUMN IF NOT EXISTS attempts_count INTEGER NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE user_progress ADD COLUMN IF NOT EXISTS last_result_id UUID")
+
+    # Backfill from existing attempts
+    op.execute("""
+        UPDATE user_progress p
+        SET attempts_count = s.attempts_count,
+            last_result_id = s.last_result_id
+        FROM (
+            SELECT DISTINCT ON (progress_id)
+                progress_id,
+                COUNT(*) OVER (PARTITION BY progress_id) AS attempts_count,
+                id AS last_result_id
+            FROM test_results
+            WHERE progress_id IS NOT NULL
+            ORDER BY progress_id, attempt_number DESC, completed_at DESC
+        ) s
+        WHERE p.id = s.progress_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column("user_progress", "last_result_id")
+    op.drop_column("user_progress", "attempts_count")
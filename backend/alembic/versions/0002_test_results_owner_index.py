@@ -0,0 +1,40 @@
+"""test results owner column and covering index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 11:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE test_results ADD COLUMN IF NOT EXISTS user_id UUID")
+
+    op.execute("""
+        UPDATE test_results r
+        SET user_id = p.user_id
+        FROM user_progress p
+        WHERE r.progress_id = p.id AND r.user_id IS NULL
+    """)
+
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_test_results_user_completed
+        ON test_results (user_id, completed_at, id)
+        INCLUDE (module_id, score, max_score, percentage, passed, attempt_number)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_test_results_user_completed", table_name="test_results")
+    op.drop_column("test_results", "user_id")
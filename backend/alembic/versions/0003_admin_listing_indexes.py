@@ -0,0 +1,32 @@
+"""keyset pagination indexes for admin listings
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE INDEX IF NOT EXISTS ix_courses_order_id ON courses (order_index, id)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_modules_order_id ON modules (order_index, id)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_modules_course_order_id ON modules (course_id, order_index, id)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_lessons_module_order_id ON lessons (module_id, order_index, id)")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lessons_module_order_id", table_name="lessons")
+    op.drop_index("ix_modules_course_order_id", table_name="modules")
+    op.drop_index("ix_modules_order_id", table_name="modules")
+    op.drop_index("ix_courses_order_id", table_name="courses")
@@ -0,0 +1,75 @@
+"""per-user progress summary
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS user_progress_summary (
+            user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+            total_modules INTEGER NOT NULL DEFAULT 0,
+            in_progress_modules INTEGER NOT NULL DEFAULT 0,
+            testing_modules INTEGER NOT NULL DEFAULT 0,
+            completed_modules INTEGER NOT NULL DEFAULT 0,
+            failed_modules INTEGER NOT NULL DEFAULT 0,
+            grade_sum INTEGER NOT NULL DEFAULT 0,
+            grade_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP WITHOUT TIME ZONE
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_user_progress_user_started ON user_progress (user_id, started_at)")
+
+    # Rebuild counters from existing progress (status enum is stored by name)
+    op.execute("""
+        INSERT INTO user_progress_summary (
+            user_id, total_modules, in_progress_modules, testing_modules,
+            completed_modules, failed_modules, grade_sum, grade_count, updated_at
+        )
+        SELECT
+            p.user_id,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE p.status::text = 'IN_PROGRESS'),
+            COUNT(*) FILTER (WHERE p.status::text = 'TESTING'),
+            COUNT(*) FILTER (WHERE p.status::text = 'COMPLETED'),
+            COUNT(*) FILTER (WHERE p.status::text = 'FAILED'),
+            COALESCE(SUM(g.grade_sum), 0),
+            COALESCE(SUM(g.grade_count), 0),
+            now()
+        FROM user_progress p
+        LEFT JOIN (
+            SELECT r.progress_id, SUM(r.percentage) AS grade_sum, COUNT(*) AS grade_count
+            FROM test_results r
+            WHERE r.passed
+            GROUP BY r.progress_id
+        ) g ON g.progress_id = p.id AND p.status::text = 'COMPLETED'
+        GROUP BY p.user_id
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_modules = EXCLUDED.total_modules,
+            in_progress_modules = EXCLUDED.in_progress_modules,
+            testing_modules = EXCLUDED.testing_modules,
+            completed_modules = EXCLUDED.completed_modules,
+            failed_modules = EXCLUDED.failed_modules,
+            grade_sum = EXCLUDED.grade_sum,
+            grade_count = EXCLUDED.grade_count,
+            updated_at = EXCLUDED.updated_at
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_progress_user_started", table_name="user_progress")
+    op.drop_table("user_progress_summary")
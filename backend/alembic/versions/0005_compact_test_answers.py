@@ -0,0 +1,33 @@
+"""compact storage for test answers
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 14:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE test_results ADD COLUMN IF NOT EXISTS question_set_version VARCHAR(16)")
+    op.execute("ALTER TABLE test_results ADD COLUMN IF NOT EXISTS correct_bits BYTEA")
+    op.execute("ALTER TABLE test_results ADD COLUMN IF NOT EXISTS answers_compact JSONB")
+    # Existing rows keep the verbose JSON; new rows leave it empty
+    op.alter_column("test_results", "answers", nullable=True)
+    op.alter_column("test_results", "detailed_results", nullable=True)
+
+
+def downgrade() -> None:
+    op.drop_column("test_results", "answers_compact")
+    op.drop_column("test_results", "correct_bits")
+    op.drop_column("test_results", "question_set_version")
@@ -0,0 +1,38 @@
+"""test result archive index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 15:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS test_result_archive (
+            result_id UUID PRIMARY KEY,
+            user_id UUID,
+            module_id VARCHAR(50) NOT NULL,
+            completed_at TIMESTAMP WITHOUT TIME ZONE,
+            segment VARCHAR(100) NOT NULL,
+            block_offset BIGINT NOT NULL,
+            block_length INTEGER NOT NULL
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_test_results_completed_at ON test_results (completed_at)")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_test_results_completed_at", table_name="test_results")
+    op.drop_table("test_result_archive")
@@ -0,0 +1,118 @@
+"""partition test_results by month
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 16:00:00
+
+"""
+from datetime import date, datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+COLUMNS = (
+    "id, progress_id, user_id, module_id, score, max_score, percentage, passed, "
+    "answers, detailed_results, question_set_version, correct_bits, answers_compact, "
+    "attempt_number, completed_at"
+)
+
+
+def _add_months(value: date, months: int) -> date:
+    month_index = value.year * 12 + value.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _is_partitioned(conn) -> bool:
+    return conn.execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = 'test_results'"
+    )).scalar() is not None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if _is_partitioned(conn):
+        # Fresh database: create_all already built the partitioned table
+        op.execute("CREATE TABLE IF NOT EXISTS test_results_default PARTITION OF test_results DEFAULT")
+        return
+
+    op.execute("ALTER TABLE test_results RENAME TO test_results_unpartitioned")
+    op.execute("ALTER INDEX IF EXISTS ix_test_results_user_completed RENAME TO ix_test_results_user_completed_old")
+    op.execute("ALTER INDEX IF EXISTS ix_test_results_completed_at RENAME TO ix_test_results_completed_at_old")
+
+    op.execute("""
+        CREATE TABLE test_results (
+            id UUID NOT NULL,
+            progress_id UUID REFERENCES user_progress (id),
+            user_id UUID,
+            module_id VARCHAR(50) NOT NULL,
+            score INTEGER NOT NULL,
+            max_score INTEGER NOT NULL,
+            percentage INTEGER NOT NULL,
+            passed BOOLEAN NOT NULL,
+            answers JSON,
+            detailed_results JSON,
+            question_set_version VARCHAR(16),
+            correct_bits BYTEA,
+            answers_compact JSONB,
+            attempt_number INTEGER,
+            completed_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, completed_at)
+        ) PARTITION BY RANGE (completed_at)
+    """)
+
+    # One partition per month from the oldest attempt through MONTHS_AHEAD
+    oldest = conn.execute(sa.text("SELECT MIN(completed_at) FROM test_results_unpartitioned")).scalar()
+    today = datetime.utcnow().date()
+    month = date((oldest or datetime.utcnow()).year, (oldest or datetime.utcnow()).month, 1)
+    last = _add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE test_results_p{month.year:04d}_{month.month:02d} PARTITION OF test_results "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+    # Rows past the last monthly partition go here instead of failing the insert
+    op.execute("CREATE TABLE test_results_default PARTITION OF test_results DEFAULT")
+
+    op.execute(f"""
+        INSERT INTO test_results ({COLUMNS})
+        SELECT {COLUMNS.replace('completed_at', "COALESCE(completed_at, now() AT TIME ZONE 'utc')")}
+        FROM test_results_unpartitioned
+    """)
+    op.execute("DROP TABLE test_results_unpartitioned")
+
+    # Indexes on the parent cascade to every partition
+    op.execute("""
+        CREATE INDEX ix_test_results_user_completed
+        ON test_results (user_id, completed_at, id)
+        INCLUDE (module_id, score, max_score, percentage, passed, attempt_number)
+    """)
+    op.execute("CREATE INDEX ix_test_results_completed_at ON test_results (completed_at)")
+    op.execute("CREATE INDEX ix_test_results_module_completed ON test_results (module_id, completed_at)")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE test_results RENAME TO test_results_partitioned")
+    op.execute("CREATE TABLE test_results (LIKE test_results_partitioned INCLUDING DEFAULTS)")
+    op.execute(f"INSERT INTO test_results ({COLUMNS}) SELECT {COLUMNS} FROM test_results_partitioned")
+    op.execute("DROP TABLE test_results_partitioned CASCADE")
+    op.execute("ALTER TABLE test_results ADD PRIMARY KEY (id)")
+    op.execute("ALTER TABLE test_results ADD FOREIGN KEY (progress_id) REFERENCES user_progress (id)")
+    op.execute("""
+        CREATE INDEX ix_test_results_user_completed
+        ON test_results (user_id, completed_at, id)
+        INCLUDE (module_id, score, max_score, percentage, passed, attempt_number)
+    """)
+    op.execute("CREATE INDEX ix_test_results_completed_at ON test_results (completed_at)")
@@ -0,0 +1,44 @@
+"""learning event log
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 17:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS learning_events (
+            id BIGSERIAL PRIMARY KEY,
+            event_type VARCHAR(32) NOT NULL,
+            user_id UUID NOT NULL,
+            module_id VARCHAR(50) NOT NULL,
+            lesson_number INTEGER,
+            data JSONB,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """)
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_learning_events_user_created "
+        "ON learning_events (user_id, created_at)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_learning_events_module_created "
+        "ON learning_events (module_id, created_at)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("learning_events")
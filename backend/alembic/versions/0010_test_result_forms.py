@@ -0,0 +1,28 @@
+"""test result forms
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 22:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE test_results ADD COLUMN IF NOT EXISTS form_seed BIGINT")
+    op.execute("ALTER TABLE test_results ADD COLUMN IF NOT EXISTS form_size INTEGER")
+
+
+def downgrade() -> None:
+    op.drop_column("test_results", "form_size")
+    op.drop_column("test_results", "form_seed")
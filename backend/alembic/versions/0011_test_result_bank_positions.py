@@ -0,0 +1,26 @@
+"""test result bank positions
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 23:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE test_results ADD COLUMN IF NOT EXISTS bank_positions INTEGER[]")
+
+
+def downgrade() -> None:
+    op.drop_column("test_results", "bank_positions")
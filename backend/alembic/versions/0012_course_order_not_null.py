@@ -0,0 +1,30 @@
+"""courses.order_index not null
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-20 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0012"
+down_revision: Union[str, None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # NULLs drop out of the (order_index, id) keyset comparison
+    op.execute("UPDATE courses SET order_index = 0 WHERE order_index IS NULL")
+    op.execute("ALTER TABLE courses ALTER COLUMN order_index SET DEFAULT 0")
+    op.execute("ALTER TABLE courses ALTER COLUMN order_index SET NOT NULL")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE courses ALTER COLUMN order_index DROP NOT NULL")
+    op.execute("ALTER TABLE courses ALTER COLUMN order_index DROP DEFAULT")
@@ -0,0 +1,28 @@
+"""unique index on lower(users.email)
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-21 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0013"
+down_revision: Union[str, None] = "0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bulk import dedupes on lower(email) and registration matches it; fails
+    # if two accounts differ only in email case (merge them first)
+    op.execute("CREATE UNIQUE INDEX ix_users_email_lower ON users (lower(email))")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_email_lower", table_name="users")
@@ -1,52 +1,86 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Form, Query
 from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+from datetime import datetime, timezone
 import io
+import os
+import redis.asyncio as redis
 
-from app.core.security import get_current_admin_user
+from app.config import settings as app_settings
+from app.core.security import get_current_admin_user, set_token_version, invalidate_user_identity
+from app.core.pagination import encode_cursor, decode_cursor
 from app.db.session import get_db
 from app.models.user import User
 from app.crud.course import (
-    get_all_courses, get_course, create_course,
-    update_course, delete_course
+    get_course, create_course,
+    update_course, delete_course, list_courses_page
 )
 from app.crud.module import (
     get_all_modules, get_module, create_module, 
-    update_module, delete_module
+    update_module, delete_module, list_modules_page
 )
+from app.crud.lesson import list_lessons_page
 from app.schemas.course import CourseCreate, CourseUpdate, CourseResponse, CourseWithModules
 from app.schemas.module import ModuleCreate, ModuleUpdate, ModuleResponse
 from app.schemas.lesson import LessonResponse
+from app.schemas.user import UserAdminUpdate, UserResponse
 from app.core.storage import StorageService
-from app.dependencies import get_storage_service
+from app.services.content_service import ContentService
+from app.dependencies import get_storage_service, get_content_service, get_redis
 from uuid import UUID
 
 router = APIRouter()
 
 
+def _page_limit(limit: Optional[int]) -> int:
+    return limit or app_settings.ADMIN_PAGE_SIZE
+
+
+def _decode_page_cursor(cursor: Optional[str]) -> Optional[list]:
+    """Decode (order_index, id) keyset cursor or raise 400"""
+    try:
+        position = decode_cursor(cursor)
+    except ValueError:
+        position = []
+    if position is not None and (len(position) != 2 or not isinstance(position[0], int)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return position
+
+
+def _set_next_cursor(response: Response, rows: list, limit: int) -> None:
+    """Expose next page position in X-Next-Cursor when the page is full"""
+    if len(rows) == limit:
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor([last.order_index, str(last.id)])
+
+
 # Course Management
 @router.get("/courses", response_model=List[CourseResponse])
 async def admin_list_courses(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=app_settings.ADMIN_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
-    """List all courses (admin only)"""
-    courses = await get_all_courses(db, include_inactive=True)
-    # Convert to response models to ensure proper serialization
-    result = []
-    for course in courses:
-        course_dict = {
-            "id": course.id,
-            "title": course.title,
-            "description": course.description or None,
-            "order_index": course.order_index,
-            "is_active": course.is_active,
-            "created_at": course.created_at,
-            "updated_at": course.updated_at
-        }
-        result.append(CourseResponse(**course_dict))
-    return result
+    """List courses page by page (admin only)"""
+    limit = _page_limit(limit)
+    position = _decode_page_cursor(cursor)
+    try:
+        after = (position[0], UUID(position[1])) if position else None
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    
+    rows = await list_courses_page(db, limit, after)
+    _set_next_cursor(response, rows, limit)
+    return [CourseResponse(**row._mapping) for row in rows]
 
 
 @router.get("/courses/{course_id}", response_model=CourseWithModules)
@@ -127,7 +161,11 @@ async def admin_update_course(
     admin_user: User = Depends(get_current_admin_user)
 ):
     """Update course (admin only)"""
-    course = await update_course(db, course_id, course_data.dict(exclude_unset=True))
+    update_data = course_data.dict(exclude_unset=True)
+    # order_index is NOT NULL (keyset pagination); an explicit null keeps the current value
+    if update_data.get("order_index", 0) is None:
+        del update_data["order_index"]
+    course = await update_course(db, course_id, update_data)
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -181,12 +219,21 @@ async def admin_delete_course(
 # Module Management
 @router.get("/modules", response_model=List[ModuleResponse])
 async def admin_list_modules(
+    response: Response,
+    course_id: Optional[UUID] = None,
+    limit: Optional[int] = Query(None, ge=1, le=app_settings.ADMIN_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
-    """List all modules (admin only)"""
-    modules = await get_all_modules(db, include_inactive=True)
-    return modules
+    """List modules page by page (admin only)"""
+    limit = _page_limit(limit)
+    position = _decode_page_cursor(cursor)
+    after = (position[0], str(position[1])) if position else None
+    
+    rows = await list_modules_page(db, limit, after, course_id=course_id)
+    _set_next_cursor(response, rows, limit)
+    return [ModuleResponse(**row._mapping) for row in rows]
 
 
 @router.post("/modules", response_model=ModuleResponse, status_code=status.HTTP_201_CREATED)
@@ -245,6 +292,7 @@ async def admin_update_module(
 async def admin_delete_module(
     module_id: str,
     db: AsyncSession = Depends(get_db),
+    content_service: ContentService = Depends(get_content_service),
     admin_user: User = Depends(get_current_admin_user)
 ):
     """Delete module (admin only)"""
@@ -254,6 +302,7 @@ async def admin_delete_module(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Module not found"
         )
+    await content_service.invalidate_module(module_id)
     return None
 
 
@@ -261,15 +310,20 @@ async def admin_delete_module(
 @router.get("/modules/{module_id}/lessons", response_model=List[dict])
 async def admin_list_lessons(
     module_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=app_settings.ADMIN_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
-    """List all lessons for a module (admin only)"""
-    from app.crud.lesson import get_all_lessons
-    from app.schemas.lesson import LessonResponse
+    """List lessons for a module page by page (admin only)"""
+    limit = _page_limit(limit)
+    position = _decode_page_cursor(cursor)
+    after = (position[0], str(position[1])) if position else None
     
-    lessons = await get_all_lessons(db, module_id=module_id, include_inactive=True)
-    return [LessonResponse.model_validate(lesson).dict() for lesson in lessons]
+    rows = await list_lessons_page(db, module_id, limit, after)
+    _set_next_cursor(response, rows, limit)
+    return [dict(row._mapping) for row in rows]
 
 
 @router.get("/modules/{module_id}/lessons/{lesson_number}")
@@ -366,6 +420,7 @@ async def admin_update_lesson(
     lesson_number: int,
     lesson_data: dict,
     db: AsyncSession = Depends(get_db),
+    content_service: ContentService = Depends(get_content_service),
     admin_user: User = Depends(get_current_admin_user)
 ):
     """Update lesson (admin only)"""
@@ -386,6 +441,9 @@ async def admin_update_lesson(
             detail="Failed to update lesson"
         )
     
+    await content_service.invalidate_lesson_meta(module_id, lesson_number)
+    await content_service.invalidate_lesson_meta(module_id, updated_lesson.lesson_number)
+    
     return LessonResponse.model_validate(updated_lesson).dict()
 
 
@@ -394,6 +452,7 @@ async def admin_delete_lesson(
     module_id: str,
     lesson_number: int,
     db: AsyncSession = Depends(get_db),
+    content_service: ContentService = Depends(get_content_service),
     admin_user: User = Depends(get_current_admin_user)
 ):
     """Delete lesson (admin only)"""
@@ -412,6 +471,7 @@ async def admin_delete_lesson(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete lesson"
         )
+    await content_service.invalidate_lesson_meta(module_id, lesson_number)
     return None
 
 
@@ -600,7 +660,158 @@ async def admin_save_lesson_content(
     return {"status": "success", "message": "Lesson content saved"}
 
 
+# User Management
+@router.post("/users/import", status_code=status.HTTP_202_ACCEPTED)
+async def admin_import_users(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    format: Optional[str] = Form(None),
+    redis_client: redis.Redis = Depends(get_redis),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Start a bulk user import from a CSV or JSONL upload (admin only)
+
+    Columns/keys: username, email, password (or password_hash), is_active.
+    The upload is spooled to disk and imported in the background; poll
+    GET /users/import/{job_id} for the status and the per-row error report.
+    """
+    from app.db.session import engine
+    from app.core.uploads import spool_upload
+    from app.services.user_import import UserImportJobs
+    
+    fmt = format or ("jsonl" if (file.filename or "").endswith((".jsonl", ".ndjson")) else "csv")
+    if fmt not in ("csv", "jsonl"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid format. Must be one of: ['csv', 'jsonl']"
+        )
+    
+    path = await spool_upload(file, suffix=f".{fmt}")
+    jobs = UserImportJobs(redis_client)
+    try:
+        job = await jobs.create(file.filename)
+    except Exception:
+        os.unlink(path)
+        raise
+    background_tasks.add_task(jobs.run, job["job_id"], engine, path, fmt)
+    return job
+
+
+@router.get("/users/import/{job_id}")
+async def admin_get_user_import(
+    job_id: str,
+    redis_client: redis.Redis = Depends(get_redis),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Status of a bulk user import; the report once it is done (admin only)"""
+    from app.services.user_import import UserImportJobs
+    
+    job = await UserImportJobs(redis_client).get(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Import job not found"
+        )
+    return job
+
+
+@router.patch("/users/{user_id}", response_model=UserResponse)
+async def admin_update_user(
+    user_id: UUID,
+    update_data: UserAdminUpdate,
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Activate/deactivate a user or change admin rights (admin only)"""
+    from app.crud.user import get_user_by_id, update_user_flags
+    
+    user = await get_user_by_id(db, str(user_id))
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    user = await update_user_flags(db, user, **update_data.model_dump(exclude_unset=True))
+    await set_token_version(user.id, user.token_version, redis_client)
+    await invalidate_user_identity(user.id, redis_client)
+    return user
+
+
 # Test Management
+@router.get("/modules/{module_id}/test/stats")
+async def admin_get_test_stats(
+    module_id: str,
+    date_from: datetime,
+    date_to: datetime,
+    db: AsyncSession = Depends(get_db),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Attempt statistics for a module over a date range (admin only)"""
+    from app.crud.test_result import get_module_result_stats
+    
+    # completed_at is naive UTC
+    if date_from.tzinfo:
+        date_from = date_from.astimezone(timezone.utc).replace(tzinfo=None)
+    if date_to.tzinfo:
+        date_to = date_to.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    if date_to <= date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_to must be after date_from"
+        )
+    
+    stats = await get_module_result_stats(db, module_id, date_from, date_to)
+    return {
+        "module_id": module_id,
+        "date_from": date_from,
+        "date_to": date_to,
+        "attempts": stats.attempts,
+        "passed": stats.passed,
+        "users": stats.users,
+        "average_percentage": round(float(stats.average_percentage), 1) if stats.average_percentage is not None else None
+    }
+
+
+@router.get("/modules/{module_id}/test/item-stats")
+async def admin_get_item_stats(
+    module_id: str,
+    version: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    content_service: ContentService = Depends(get_content_service),
+    redis_client: redis.Redis = Depends(get_redis),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Per-question statistics for a question-set version, current by default (admin only)
+
+    Counters are rebuilt from stored results by rebuild_item_stats.py.
+    """
+    from app.services.item_stats import ItemStatsService
+    
+    if version is None:
+        test_questions = await content_service.get_test_questions(module_id, db)
+        if not test_questions or not test_questions.get("questions"):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Test questions not found"
+            )
+        questions = test_questions["questions"]
+        version = await content_service.snapshot_question_set(
+            module_id, questions, db, test_questions["question_set_version"]
+        )
+    else:
+        questions = await content_service.get_question_set(module_id, version, db)
+        if questions is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Question set version not found"
+            )
+    
+    return await ItemStatsService(redis_client).report(module_id, version, questions)
+
+
 @router.get("/modules/{module_id}/test")
 async def admin_get_test(
     module_id: str,
@@ -639,6 +850,8 @@ async def admin_get_test(
             "time_limit_minutes": 30,
             "max_attempts": 3,
             "shuffle_questions": True,
+            "shuffle_options": False,
+            "questions_per_attempt": None,
             "show_results_immediately": False,
             "allow_review": True
         }
@@ -655,6 +868,7 @@ async def admin_save_test_questions(
     test_data: dict,
     db: AsyncSession = Depends(get_db),
     storage_service: StorageService = Depends(get_storage_service),
+    content_service: ContentService = Depends(get_content_service),
     admin_user: User = Depends(get_current_admin_user)
 ):
     """Save test questions (admin only)"""
@@ -674,9 +888,78 @@ async def admin_save_test_questions(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to save test questions"
         )
+    await content_service.invalidate_test_questions(module_id, db)
     return {"status": "success", "message": "Test questions saved successfully"}
 
 
+@router.post("/modules/{module_id}/test/bank")
+async def admin_import_question_bank(
+    module_id: str,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+    content_service: ContentService = Depends(get_content_service),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Import a JSONL question bank as the module's new bank version (admin only)
+
+    One question per line: id, options, correct_answer, points, and optional
+    difficulty (integer) and tags (list of strings) used by settings.bank_draw.
+    """
+    from app.core.uploads import iter_upload_lines
+    
+    module = await get_module(db, module_id)
+    if not module:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Module not found"
+        )
+    
+    report = await content_service.banks.import_bank(module.course_id, module_id, iter_upload_lines(file))
+    if report["version"] is None:
+        # Valid rows that still got no version mean the bank could not be stored
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR if report["imported"] else status.HTTP_400_BAD_REQUEST,
+            detail=report
+        )
+    return report
+
+
+@router.post("/modules/{module_id}/test/regrade")
+async def admin_regrade_test_results(
+    module_id: str,
+    dry_run: bool = Query(True),
+    limit: int = Query(10000, ge=1, le=50000),
+    db: AsyncSession = Depends(get_db),
+    content_service: ContentService = Depends(get_content_service),
+    admin_user: User = Depends(get_current_admin_user)
+):
+    """Preview a re-grade of the oldest `limit` attempts against the current questions (admin only)
+
+    Dry run only, bounded and with counts only, so it fits in a request;
+    module-wide re-grades and writes go through regrade_results.py.
+    """
+    from app.services.regrade_service import RegradeService
+    
+    if not dry_run:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only dry_run is supported here; run regrade_results.py to write"
+        )
+    
+    test_questions = await content_service.get_test_questions(module_id, db)
+    if not test_questions or not test_questions.get("questions"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test questions not found"
+        )
+    
+    service = RegradeService(db, content_service)
+    report = await service.regrade_module(module_id, test_questions["questions"], dry_run=True, limit=limit)
+    report["flipped_to_pass"] = len(report["flipped_to_pass"])
+    report["flipped_to_fail"] = len(report["flipped_to_fail"])
+    return report
+
+
 @router.put("/modules/{module_id}/test/settings")
 async def admin_update_test_settings(
     module_id: str,
@@ -1,17 +1,34 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+import redis.asyncio as redis
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
+from typing import Optional
 
 from app.core.security import (
-    verify_password,
+    verify_password_async,
+    get_password_hash_async,
+    password_needs_rehash,
     create_access_token,
-    get_current_user
+    get_current_user,
+    user_token_claims,
+    revoke_token,
+    security,
+    CurrentUser
 )
 from app.config import settings
 from app.db.session import get_db
-from app.crud.user import get_user_by_username, create_user, get_user_by_email
-from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
-from app.models.user import User
+from app.dependencies import get_redis
+from app.crud.user import (
+    get_user_by_username,
+    create_user,
+    get_user_by_email,
+    get_user_by_id,
+    update_password_hash
+)
+from app.schemas.user import UserCreate, UserLogin, UserResponse, Token, RefreshRequest
+from app.core.refresh_tokens import RefreshTokenStore
 
 router = APIRouter()
 
@@ -51,12 +68,13 @@ async def register(
 @router.post("/login", response_model=Token)
 async def login(
     credentials: UserLogin,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis)
 ):
-    """Login user and get access token"""
+    """Login user and get access and refresh tokens"""
     user = await get_user_by_username(db, credentials.username)
     
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not user or not await verify_password_async(credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -69,28 +87,107 @@ async def login(
             detail="User account is inactive"
         )
     
+    # Upgrade hashes made with an older BCRYPT_ROUNDS while we have the password
+    if password_needs_rehash(user.hashed_password):
+        try:
+            await update_password_hash(db, user, await get_password_hash_async(credentials.password))
+        except HTTPException:
+            pass  # Pool saturated; try again on a later login
+    
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id)},
+        data=user_token_claims(user),
         expires_delta=access_token_expires
     )
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Without Redis the client simply logs in again when the access token expires
+    refresh_token = None
+    try:
+        refresh_token = await RefreshTokenStore(redis_client).issue(user.id)
+    except Exception as e:
+        print(f"Warning: Could not issue refresh token: {e}")
+    
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(
+    request: RefreshRequest,
+    db: AsyncSession = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis)
+):
+    """Exchange a refresh token for a new access token and refresh token"""
+    invalid_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    try:
+        rotated = await RefreshTokenStore(redis_client).rotate(request.refresh_token)
+    except Exception as e:
+        print(f"Warning: Could not rotate refresh token: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Session store unavailable, please log in again"
+        )
+    if rotated is None:
+        raise invalid_exception
+    user_id, refresh_token = rotated
+    
+    # Claims reflect the user's current state, not the state at login
+    user = await get_user_by_id(db, user_id)
+    if user is None or not user.is_active:
+        raise invalid_exception
+    
+    access_token = create_access_token(
+        data=user_token_claims(user),
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    request: Optional[RefreshRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: CurrentUser = Depends(get_current_user),
+    redis_client: redis.Redis = Depends(get_redis)
+):
+    """Revoke the presented access token and, if given, its refresh session"""
+    payload = jwt.decode(
+        credentials.credentials,
+        settings.SECRET_KEY,
+        algorithms=[settings.ALGORITHM]
+    )
+    await revoke_token(payload, redis_client)
+    if request is not None:
+        await RefreshTokenStore(redis_client).revoke(request.refresh_token)
+    return None
 
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get current user information"""
+    # Auth resolves a cached identity only; profile fields come from the row
+    user = await get_user_by_id(db, str(current_user.id))
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
     # Explicitly return user data to ensure is_superuser is included
     return {
-        "id": current_user.id,
-        "username": current_user.username,
-        "email": current_user.email,
-        "is_active": current_user.is_active,
-        "is_superuser": current_user.is_superuser,
-        "created_at": current_user.created_at
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "is_active": user.is_active,
+        "is_superuser": user.is_superuser,
+        "created_at": user.created_at
     }
 
 
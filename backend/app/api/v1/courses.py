@@ -3,7 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from app.core.security import get_current_user
-from app.db.session import get_db
+from app.dependencies import get_read_db
 from app.models.user import User
 from app.crud.course import get_all_courses, get_course
 from app.crud.module import get_all_modules
@@ -14,7 +14,7 @@ router = APIRouter()
 
 @router.get("", response_model=List[CourseWithModules])
 async def list_courses(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """List all available courses with their modules"""
@@ -42,7 +42,7 @@ async def list_courses(
 @router.get("/{course_id}", response_model=CourseWithModules)
 async def get_course_details(
     course_id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get course details with modules"""
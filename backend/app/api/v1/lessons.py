@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.ext.asyncio import AsyncSession
+import redis.asyncio as redis
 
 from app.core.security import get_current_user
-from app.db.session import get_db
+from app.db.session import get_db, engine_router
 from app.models.user import User
 from app.models.progress import ProgressStatus
 from app.services.content_service import ContentService
 from app.services.progress_service import ProgressService
+from app.services.event_log import event_log, LESSON_VIEWED, LESSON_ADVANCED
+from app.api.v1.tests import open_test_attempt
 from app.core.storage import StorageService
 from app.schemas.lesson import LessonContentResponse
 from app.crud.module import get_module
@@ -14,7 +17,9 @@ from app.crud.lesson import get_lesson_by_module_and_number
 from app.dependencies import (
     get_content_service,
     get_progress_service,
-    get_storage_service
+    get_storage_service,
+    get_read_db,
+    get_redis
 )
 
 router = APIRouter()
@@ -25,28 +30,26 @@ async def get_lesson(
     module_id: str,
     lesson_number: int,
     db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     content_service: ContentService = Depends(get_content_service),
     progress_service: ProgressService = Depends(get_progress_service)
 ):
     """Get lesson content"""
-    # Get lesson from DB or create if content exists
-    lesson = await get_lesson_by_module_and_number(db, module_id, lesson_number)
+    # Cache first: lesson metadata and content are served from Redis when warm,
+    # so a session only checks out a connection on a miss (replica when fresh)
+    lesson = await content_service.get_lesson_meta(module_id, lesson_number, read_db)
+    lesson_data = await content_service.get_lesson_content(module_id, lesson_number, read_db)
+    
+    if not lesson and read_db is not db:
+        # A lagging replica may not have a lesson created moments ago
+        lesson = await content_service.get_lesson_meta(module_id, lesson_number, db)
     
-    # If lesson doesn't exist in DB, try to get content and create lesson
+    # If lesson doesn't exist in DB, create it when content exists
     if not lesson:
-        lesson_data = await content_service.get_lesson_content(module_id, lesson_number, db)
         if lesson_data:
             # Auto-create lesson in DB
             from app.crud.lesson import create_lesson
-            from app.crud.module import get_module
-            
-            module = await get_module(db, module_id)
-            if not module:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Module not found"
-                )
             
             lesson_id = f"{module_id}_Lesson_{lesson_number:02d}"
             lesson_data_db = {
@@ -57,38 +60,39 @@ async def get_lesson(
                 "order_index": lesson_number,
                 "is_active": True
             }
-            lesson = await create_lesson(db, lesson_data_db)
+            created = await create_lesson(db, lesson_data_db)
+            lesson = {"id": created.id, "is_active": created.is_active}
         else:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Lesson {lesson_number} not found"
             )
-    elif not lesson.is_active:
+    elif not lesson["is_active"]:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Lesson {lesson_number} not found"
         )
     
-    # Get lesson content
-    lesson_data = await content_service.get_lesson_content(module_id, lesson_number, db)
     if not lesson_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Lesson content not found"
         )
     
-    # Get user progress
-    progress = await progress_service.get_user_progress(current_user.id, module_id)
+    # Get user progress (cached too, so a warm read never checks out a connection)
+    progress = await progress_service.get_lesson_state(current_user.id, module_id)
     
     progress_percentage = None
     if progress:
-        progress_percentage = int((lesson_number / progress.total_lessons) * 100)
+        progress_percentage = int((lesson_number / progress["total_lessons"]) * 100)
+    
+    event_log.emit(LESSON_VIEWED, current_user.id, module_id, lesson_number)
     
     return LessonContentResponse(
         status="success",
-        lesson_id=lesson.id,
+        lesson_id=lesson["id"],
         lesson_number=lesson_number,
-        total_lessons=progress.total_lessons if progress else None,
+        total_lessons=progress["total_lessons"] if progress else None,
         content=lesson_data.get("content"),
         content_type=lesson_data.get("content_type", "markdown"),
         module_id=module_id,
@@ -103,7 +107,7 @@ async def get_lesson_file(
     lesson_number: int,
     file_type: str,
     filename: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     storage_service: StorageService = Depends(get_storage_service)
 ):
@@ -166,10 +170,12 @@ async def get_lesson_file(
 @router.post("/modules/{module_id}/next", response_model=LessonContentResponse)
 async def get_next_lesson(
     module_id: str,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     content_service: ContentService = Depends(get_content_service),
-    progress_service: ProgressService = Depends(get_progress_service)
+    progress_service: ProgressService = Depends(get_progress_service),
+    redis_client: redis.Redis = Depends(get_redis)
 ):
     """Get next lesson in sequence or transition to test"""
     # Get user progress
@@ -188,14 +194,19 @@ async def get_next_lesson(
         return LessonContentResponse(
             status="completed",
             message="Module already completed",
-            test_result_id=str(progress.test_results[-1].id) if progress.test_results else None
+            test_result_id=str(progress.last_result_id) if progress.last_result_id else None
         )
     
     # Check if all lessons completed -> start test
     if progress.current_lesson >= progress.total_lessons:
-        await progress_service.update_status(progress.id, ProgressStatus.TESTING)
+        # Same attempt checks, timed session and form as GET /test
+        test_questions, headers = await open_test_attempt(
+            module_id, current_user.id, progress, db, content_service, redis_client
+        )
+        response.headers.update(headers)
         
-        test_questions = await content_service.get_test_questions(module_id, db)
+        await progress_service.update_status(progress.id, ProgressStatus.TESTING)
+        await engine_router.mark_write(current_user.id, redis_client)
         
         return LessonContentResponse(
             status="module_completed",
@@ -208,7 +219,7 @@ async def get_next_lesson(
     next_lesson_number = progress.current_lesson + 1
     
     # Check if lesson exists in DB, if not try to auto-create from storage
-    lesson = await get_lesson_by_module_and_number(db, module_id, next_lesson_number)
+    lesson = await content_service.get_lesson_meta(module_id, next_lesson_number, db)
     if not lesson:
         # Try to get content first
         lesson_content = await content_service.get_lesson_content(
@@ -226,7 +237,8 @@ async def get_next_lesson(
                 "order_index": next_lesson_number,
                 "is_active": True
             }
-            lesson = await create_lesson(db, lesson_data_db)
+            created = await create_lesson(db, lesson_data_db)
+            lesson = {"id": created.id, "is_active": created.is_active}
         else:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -246,14 +258,16 @@ async def get_next_lesson(
     
     # Update progress
     await progress_service.update_current_lesson(
-        progress.id, next_lesson_number
+        progress, next_lesson_number
     )
+    await engine_router.mark_write(current_user.id, redis_client)
+    event_log.emit(LESSON_ADVANCED, current_user.id, module_id, next_lesson_number)
     
     progress_percentage = int((next_lesson_number / progress.total_lessons) * 100)
     
     return LessonContentResponse(
         status="success",
-        lesson_id=lesson.id,
+        lesson_id=lesson["id"],
         lesson_number=next_lesson_number,
         total_lessons=progress.total_lessons,
         content=lesson_content.get("content"),
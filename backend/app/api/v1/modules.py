@@ -1,18 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
+import redis.asyncio as redis
 
 from app.core.security import get_current_user
-from app.db.session import get_db
+from app.db.session import get_db, engine_router
 from app.models.user import User
 from app.crud.module import get_all_modules, get_module
 from app.schemas.module import ModuleResponse
+from app.services.progress_service import ProgressService
+from app.dependencies import get_read_db, get_redis, get_progress_service
 
 router = APIRouter()
 
 
 @router.get("", response_model=list[ModuleResponse])
 async def list_modules(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """List all available modules"""
@@ -23,7 +26,7 @@ async def list_modules(
 @router.get("/{module_id}", response_model=ModuleResponse)
 async def get_module_details(
     module_id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get module details"""
@@ -40,15 +43,14 @@ async def get_module_details(
 async def start_module(
     module_id: str,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    progress_service: ProgressService = Depends(get_progress_service),
+    redis_client: redis.Redis = Depends(get_redis)
 ):
     """Start a module"""
-    from app.services.progress_service import ProgressService
     from app.crud.module import get_module
     from app.crud.progress import get_user_progress
     
-    progress_service = ProgressService(db)
-    
     # Check if module exists
     module = await get_module(db, module_id)
     if not module:
@@ -73,6 +75,7 @@ async def start_module(
         module_id,
         module.total_lessons
     )
+    await engine_router.mark_write(current_user.id, redis_client)
     
     return {
         "status": "started",
@@ -3,45 +3,36 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from app.core.security import get_current_user
-from app.db.session import get_db
+from app.dependencies import get_read_db, get_progress_service
 from app.models.user import User
 from app.crud.progress import get_all_user_progress
 from app.schemas.progress import ProgressResponse, OverallProgressResponse
-from app.models.test import TestResult
-from sqlalchemy import select, func
+from app.services.progress_service import ProgressService
 
 router = APIRouter()
 
 
 @router.get("", response_model=OverallProgressResponse)
 async def get_progress(
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+    progress_service: ProgressService = Depends(get_progress_service)
 ):
     """Get user's overall progress"""
+    # Counters and grade come from the maintained summary (cached; misses read the primary)
+    summary = await progress_service.get_summary(current_user.id)
     all_progress = await get_all_user_progress(db, current_user.id)
+    await progress_service.apply_pending(all_progress)
     
-    completed_modules = sum(1 for p in all_progress if p.status.value == "completed")
-    in_progress_modules = sum(1 for p in all_progress if p.status.value in ["in_progress", "testing"])
-    
-    # Calculate average grade
-    completed_progress_ids = [p.id for p in all_progress if p.status.value == "completed"]
     average_grade = None
-    
-    if completed_progress_ids:
-        result = await db.execute(
-            select(func.avg(TestResult.percentage))
-            .where(TestResult.progress_id.in_(completed_progress_ids))
-            .where(TestResult.passed == True)
-        )
-        avg = result.scalar()
-        if avg:
-            average_grade = round(float(avg) / 10, 1)  # Convert to 10-point scale
+    if summary["grade_count"] and summary["grade_sum"]:
+        avg = summary["grade_sum"] / summary["grade_count"]
+        average_grade = round(avg / 10, 1)  # Convert to 10-point scale
     
     return OverallProgressResponse(
-        total_modules=len(all_progress),
-        completed_modules=completed_modules,
-        in_progress_modules=in_progress_modules,
+        total_modules=summary["total_modules"],
+        completed_modules=summary["completed_modules"],
+        in_progress_modules=summary["in_progress_modules"],
         average_grade=average_grade,
         modules=[ProgressResponse(
             module_id=p.module_id,
@@ -59,8 +50,9 @@ async def get_progress(
 @router.get("/{module_id}", response_model=ProgressResponse)
 async def get_module_progress(
     module_id: str,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+    progress_service: ProgressService = Depends(get_progress_service)
 ):
     """Get progress for specific module"""
     from app.crud.progress import get_user_progress
@@ -73,6 +65,8 @@ async def get_module_progress(
             detail="Progress not found for this module"
         )
     
+    await progress_service.apply_pending([progress])
+    
     return ProgressResponse(
         module_id=progress.module_id,
         current_lesson=progress.current_lesson,
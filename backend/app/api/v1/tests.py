@@ -1,34 +1,154 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import Response, JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime
+import redis.asyncio as redis
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
 
 from app.core.security import get_current_user
 from app.db.session import get_db
 from app.models.user import User
 from app.models.progress import ProgressStatus
-from app.models.test import TestResult
+from app.crud.test_result import get_user_test_result, list_user_test_results
+from app.core.pagination import encode_cursor, decode_cursor
+from app.services.result_codec import decode_result
 from app.services.content_service import ContentService
 from app.services.test_service import TestGradingService
+from app.services.test_forms import form_seed, asked_questions
 from app.services.progress_service import ProgressService
-from app.schemas.test import TestSubmission, TestResultResponse
+from app.services.archive_service import ResultArchiveService
+from app.services.event_log import event_log, TEST_STARTED
+from app.services.test_attempts import finalize_attempt, AttemptAlreadyFinalized
+from app.services.test_sessions import (
+    TestSessionService,
+    NO_SESSION,
+    CLAIMED,
+    EXPIRED,
+    FINALIZING,
+    SAVED,
+    TIME_UP
+)
+from app.schemas.test import (
+    TestSubmission,
+    TestResultResponse,
+    TestResultRecord,
+    TestResultSummary,
+    TestResultPage,
+    TestSessionState
+)
 from app.dependencies import (
     get_content_service,
     get_grading_service,
-    get_progress_service
+    get_progress_service,
+    get_read_db,
+    get_redis,
+    get_archive_service
 )
 
 router = APIRouter()
 
 
+def _positive_int(value: Any) -> Optional[int]:
+    return value if isinstance(value, int) and not isinstance(value, bool) and value > 0 else None
+
+
+def _attempt_limits(test_settings: Optional[Dict[str, Any]]) -> Tuple[Optional[int], Optional[int]]:
+    """(max_attempts, time_limit_minutes) from settings.json; None means no limit"""
+    test_settings = test_settings or {}
+    return (
+        _positive_int(test_settings.get("max_attempts")),
+        _positive_int(test_settings.get("time_limit_minutes"))
+    )
+
+
+def _check_attempts_left(progress, max_attempts: Optional[int]) -> None:
+    if max_attempts is not None and progress.attempts_count >= max_attempts:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No attempts left for this test"
+        )
+
+
+def _deadline_header(deadline: Optional[float]) -> Dict[str, str]:
+    if not deadline:
+        return {}
+    return {"X-Test-Deadline": datetime.fromtimestamp(deadline, tz=timezone.utc).isoformat()}
+
+
+async def open_test_attempt(
+    module_id: str,
+    user_id: UUID,
+    progress,
+    db: AsyncSession,
+    content_service: ContentService,
+    redis_client: redis.Redis,
+    serialized: bool = False
+) -> Tuple[Any, Dict[str, str]]:
+    """Check attempts left, start (or resume) the timed session and build the form.
+
+    Shared by GET /test and /next, which both hand the test to the student.
+    Returns (form, response headers); with serialized the untouched student
+    projection comes back as pre-serialized JSON.
+    """
+    max_attempts, time_limit = _attempt_limits(await content_service.get_test_settings(module_id, db))
+    _check_attempts_left(progress, max_attempts)
+    
+    spec = await content_service.get_form_spec(module_id, db)
+    bank_version = await content_service.get_bank_version(module_id, db) if spec.draw else None
+    
+    # Reloading the test resumes the attempt; the deadline and the bank
+    # version are set once, when the attempt starts
+    deadline = None
+    # Without Redis, count the start when progress moves to testing (/next)
+    started = progress.status != ProgressStatus.TESTING
+    try:
+        deadline, bank_version, started = await TestSessionService(redis_client).start(
+            user_id, module_id, progress.attempts_count + 1, time_limit, bank_version
+        )
+    except Exception as e:
+        print(f"Warning: Could not start test session: {e}")
+    
+    if spec.is_identity:
+        if serialized:
+            test_questions = await content_service.get_public_test_json(module_id, db)
+        else:
+            test_questions = await content_service.get_public_test_questions(module_id, db)
+    else:
+        seed = form_seed(user_id, module_id, progress.attempts_count + 1)
+        test_questions = await content_service.get_test_form(module_id, spec, seed, db, bank_version)
+    
+    if not test_questions:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test questions not found"
+        )
+    
+    # Reloads and repeated /next calls resume the attempt; only a new one is an event
+    if started:
+        event_log.emit(TEST_STARTED, user_id, module_id)
+    
+    return test_questions, _deadline_header(deadline)
+
+
+async def _release_session(sessions: TestSessionService, user_id: UUID, module_id: str) -> None:
+    """Hand a claimed session back after a failed submit, so the student can retry"""
+    try:
+        await sessions.release(user_id, module_id)
+    except Exception as e:
+        print(f"Warning: Could not release test session: {e}")
+
+
 @router.get("/modules/{module_id}/test")
 async def get_test_questions(
     module_id: str,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     content_service: ContentService = Depends(get_content_service),
-    progress_service: ProgressService = Depends(get_progress_service)
+    progress_service: ProgressService = Depends(get_progress_service),
+    redis_client: redis.Redis = Depends(get_redis)
 ):
-    """Get test questions for a module"""
+    """Get test questions for a module (without answer keys) and start the attempt"""
     # Get user progress
     progress = await progress_service.get_user_progress(
         current_user.id, module_id
@@ -40,15 +160,60 @@ async def get_test_questions(
             detail="Test not available. Complete all lessons first."
         )
     
-    test_questions = await content_service.get_test_questions(module_id, db)
+    test_questions, headers = await open_test_attempt(
+        module_id, current_user.id, progress, db, content_service, redis_client, serialized=True
+    )
     
-    if not test_questions:
+    if isinstance(test_questions, str):
+        # Pre-serialized student projection, sent as is
+        return Response(content=test_questions, media_type="application/json", headers=headers)
+    return JSONResponse(content=test_questions, headers=headers)
+
+
+@router.put("/modules/{module_id}/test/answers", status_code=status.HTTP_204_NO_CONTENT)
+async def autosave_test_answers(
+    module_id: str,
+    submission: TestSubmission,
+    current_user: User = Depends(get_current_user),
+    redis_client: redis.Redis = Depends(get_redis)
+):
+    """Autosave answers of the running attempt (Redis only, no database writes)"""
+    answers = [{"question_id": ans.question_id, "answer": ans.answer} for ans in submission.answers]
+    saved = await TestSessionService(redis_client).save_answers(current_user.id, module_id, answers)
+    
+    if saved == TIME_UP:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Time is up for this attempt"
+        )
+    if saved != SAVED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="No test attempt in progress"
+        )
+    return None
+
+
+@router.get("/modules/{module_id}/test/answers", response_model=TestSessionState)
+async def get_saved_test_answers(
+    module_id: str,
+    current_user: User = Depends(get_current_user),
+    redis_client: redis.Redis = Depends(get_redis)
+):
+    """Answers autosaved for the running attempt and its deadline"""
+    session = await TestSessionService(redis_client).get(current_user.id, module_id)
+    if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Test questions not found"
+            detail="No test attempt in progress"
         )
     
-    return test_questions
+    deadline = session["deadline"]
+    return TestSessionState(
+        attempt_number=session["attempt"],
+        deadline=datetime.fromtimestamp(deadline, tz=timezone.utc) if deadline else None,
+        answers=session["answers"]
+    )
 
 
 @router.post("/modules/{module_id}/test", response_model=TestResultResponse)
@@ -59,7 +224,8 @@ async def submit_test(
     current_user: User = Depends(get_current_user),
     content_service: ContentService = Depends(get_content_service),
     grading_service: TestGradingService = Depends(get_grading_service),
-    progress_service: ProgressService = Depends(get_progress_service)
+    progress_service: ProgressService = Depends(get_progress_service),
+    redis_client: redis.Redis = Depends(get_redis)
 ):
     """Submit test answers and get results"""
     # Get user progress
@@ -73,54 +239,72 @@ async def submit_test(
             detail="Test not available. Complete all lessons first."
         )
     
-    # Get test questions (which contain correct answers)
-    test_questions_data = await content_service.get_test_questions(module_id, db)
-    
-    if not test_questions_data:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Test questions not found"
-        )
+    max_attempts, _ = _attempt_limits(await content_service.get_test_settings(module_id, db))
+    _check_attempts_left(progress, max_attempts)
     
     # Format answers for grading
     user_answers = [{"question_id": ans.question_id, "answer": ans.answer} for ans in submission.answers]
     
-    # Extract questions with correct answers
-    questions = test_questions_data.get("questions", [])
-    
-    # Grade test
-    result = grading_service.grade_test(
-        user_answers,
-        questions
-    )
-    
-    # Calculate attempt number
-    attempt_number = len(progress.test_results) + 1
+    # Save the submitted answers into the session first, so that whoever ends
+    # up finalizing the attempt grades them; then take the attempt from the
+    # deadline sweeper (past the deadline it is the sweeper's)
+    sessions = TestSessionService(redis_client)
+    session = None
+    try:
+        if user_answers:
+            await sessions.save_answers(current_user.id, module_id, user_answers)
+        claim, session = await sessions.claim(current_user.id, module_id)
+    except Exception as e:
+        print(f"Warning: Could not claim test session: {e}")
+        claim = NO_SESSION
     
-    # Save result
-    test_result = TestResult(
-        progress_id=progress.id,
-        module_id=module_id,
-        score=result.score,
-        max_score=result.max_score,
-        percentage=result.percentage,
-        passed=result.passed,
-        answers=[{"question_id": ans.question_id, "answer": ans.answer} for ans in submission.answers],
-        detailed_results=[detail.dict() for detail in result.detailed_results],
-        attempt_number=attempt_number
-    )
+    if claim == EXPIRED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Time is up. The attempt is auto-finalized with saved answers."
+        )
+    if claim == FINALIZING:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This attempt is already being submitted"
+        )
     
-    db.add(test_result)
+    # Submitted answers win over autosaved ones
+    bank_version = None
+    if session and session["attempt"] == progress.attempts_count + 1:
+        bank_version = session["bank_version"]
+        answers_by_question = {ans["question_id"]: ans["answer"] for ans in session["answers"]}
+        answers_by_question.update((ans["question_id"], ans["answer"]) for ans in user_answers)
+        user_answers = [{"question_id": key, "answer": value} for key, value in answers_by_question.items()]
     
-    # Update progress status
-    if result.passed:
-        progress.status = ProgressStatus.COMPLETED
-        progress.completed_at = datetime.utcnow()
-    else:
-        progress.status = ProgressStatus.FAILED
+    try:
+        written = await finalize_attempt(
+            db, content_service, progress_service, grading_service, redis_client,
+            current_user.id, module_id, progress, user_answers, bank_version
+        )
+    except AttemptAlreadyFinalized:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This attempt has already been submitted"
+        )
+    except Exception:
+        if claim == CLAIMED:
+            await _release_session(sessions, current_user.id, module_id)
+        raise
+    if written is None:
+        if claim == CLAIMED:
+            await _release_session(sessions, current_user.id, module_id)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Test questions not found"
+        )
+    test_result, result, attempt_number = written
     
-    await db.commit()
-    await db.refresh(test_result)
+    if claim == CLAIMED:
+        try:
+            await sessions.finish(current_user.id, module_id)
+        except Exception as e:
+            print(f"Warning: Could not close test session: {e}")
     
     # Calculate next module
     next_module_unlocked = None
@@ -134,6 +318,7 @@ async def submit_test(
     return TestResultResponse(
         status="test_completed",
         result_id=test_result.id,
+        completed_at=test_result.completed_at,
         score=result.score,
         max_score=result.max_score,
         percentage=result.percentage,
@@ -144,34 +329,94 @@ async def submit_test(
     )
 
 
-@router.get("/results/{result_id}")
-async def get_test_result(
-    result_id: str,
-    db: AsyncSession = Depends(get_db),
+@router.get("/results", response_model=TestResultPage)
+async def list_my_test_results(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get test result by ID"""
-    from sqlalchemy import select
-    from uuid import UUID
+    """List current user's test results, newest first"""
+    try:
+        position = decode_cursor(cursor)
+        after = (datetime.fromisoformat(position[0]), UUID(position[1])) if position else None
+    except (ValueError, IndexError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    
+    rows = await list_user_test_results(db, current_user.id, limit, after)
     
-    result = await db.execute(
-        select(TestResult).where(TestResult.id == UUID(result_id))
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = encode_cursor([last.completed_at.isoformat(), str(last.id)])
+    
+    return TestResultPage(
+        items=[TestResultSummary(**row._mapping) for row in rows],
+        next_cursor=next_cursor
     )
-    test_result = result.scalar_one_or_none()
+
+
+@router.get("/results/{result_id}", response_model=TestResultRecord)
+async def get_test_result(
+    result_id: str,
+    completed_at: Optional[datetime] = Query(None),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+    content_service: ContentService = Depends(get_content_service),
+    archive_service: ResultArchiveService = Depends(get_archive_service)
+):
+    """Get test result by ID (hot table first, then archive)
+
+    Pass completed_at from the submit response or the results list so the
+    lookup reads a single test_results partition.
+    """
+    try:
+        result_uuid = UUID(result_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid result ID format"
+        )
     
-    if not test_result:
+    # Ownership is part of the lookup, so foreign results are indistinguishable from missing ones
+    if completed_at is not None and completed_at.tzinfo is not None:
+        # completed_at is stored as naive UTC
+        completed_at = completed_at.astimezone(timezone.utc).replace(tzinfo=None)
+    test_result = await get_user_test_result(db, result_uuid, current_user.id, completed_at)
+    if test_result:
+        record = dict(test_result._mapping)
+    else:
+        record = await archive_service.get_result(result_uuid, current_user.id)
+    
+    if not record:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Test result not found"
         )
     
-    # Verify ownership
-    if test_result.progress.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied"
+    version = record.pop("question_set_version")
+    correct_bits = record.pop("correct_bits")
+    answers_compact = record.pop("answers_compact")
+    seed = record.pop("form_seed")
+    size = record.pop("form_size")
+    positions = record.pop("bank_positions")
+    
+    if record["detailed_results"] is None:
+        if positions is not None:
+            questions = await content_service.get_bank_questions(record["module_id"], version, positions, db)
+        else:
+            questions = await content_service.get_question_set(record["module_id"], version, db)
+        if questions is None:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Question set for this result not found"
+            )
+        asked = asked_questions(seed, len(questions), size) if size is not None else None
+        record["answers"], record["detailed_results"] = decode_result(
+            questions, correct_bits, answers_compact, asked=asked
         )
     
-    return test_result
-
-
+    return TestResultRecord(**record)
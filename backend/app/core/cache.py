@@ -27,12 +27,23 @@ class CacheService:
             return False
     
     async def delete(self, key: str) -> bool:
-        """Delete key from cache"""
-        return await self.redis.delete(key) > 0
+        """Delete key from cache.
+
+        Called after the DB change it invalidates is committed, so a Redis
+        outage is logged rather than failing a request whose write succeeded.
+        """
+        try:
+            return await self.redis.delete(key) > 0
+        except Exception as e:
+            print(f"Warning: Could not invalidate cache key {key}: {e}")
+            return False
     
     async def exists(self, key: str) -> bool:
         """Check if key exists"""
-        return await self.redis.exists(key) > 0
+        try:
+            return await self.redis.exists(key) > 0
+        except Exception:
+            return False
     
     async def get_or_set(
         self,
@@ -0,0 +1,23 @@
+import base64
+import json
+from typing import Any, List, Optional
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode keyset position as an opaque URL-safe cursor"""
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[List[Any]]:
+    """Decode cursor produced by encode_cursor; raises ValueError if malformed"""
+    if not cursor:
+        return None
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
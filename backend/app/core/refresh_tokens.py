@@ -0,0 +1,100 @@
+import hashlib
+import hmac
+import json
+import secrets
+import time
+import uuid
+from typing import Optional, Tuple
+
+import redis.asyncio as redis
+
+from app.config import settings
+
+# refresh_token:{hash} -> {"user_id", "family", "started_at"}, TTL = idle timeout
+# refresh_family:{family} -> hash of the family's current token
+# refresh_used:{hash} -> family, remembers rotated tokens to detect reuse
+
+# Consume a token atomically; on reuse of a rotated token kill its family
+ROTATE_SCRIPT = """
+local data = redis.call('GET', KEYS[1])
+if data then
+    redis.call('DEL', KEYS[1])
+    return data
+end
+local family = redis.call('GET', KEYS[2])
+if family then
+    local current = redis.call('GET', 'refresh_family:' .. family)
+    if current then
+        redis.call('DEL', 'refresh_token:' .. current)
+    end
+    redis.call('DEL', 'refresh_family:' .. family)
+end
+return false
+"""
+
+
+def _hash(token: str) -> str:
+    # Keyed hash: a leaked Redis dump does not yield usable tokens
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), token.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+class RefreshTokenStore:
+    """Rotating refresh tokens, stored hashed in Redis.
+
+    Every refresh consumes the presented token and issues a new one in the
+    same family, extending the session by REFRESH_TOKEN_IDLE_DAYS (sliding)
+    up to REFRESH_SESSION_MAX_DAYS from login. Presenting an already rotated
+    token revokes the whole family.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+
+    async def _store(self, user_id: str, family: str, started_at: float) -> Optional[str]:
+        token = secrets.token_urlsafe(32)
+        token_hash = _hash(token)
+        ttl = int(min(
+            settings.REFRESH_TOKEN_IDLE_DAYS * 86400,
+            started_at + settings.REFRESH_SESSION_MAX_DAYS * 86400 - time.time()
+        ))
+        if ttl <= 0:
+            return None
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.setex(
+                f"refresh_token:{token_hash}", ttl,
+                json.dumps({"user_id": user_id, "family": family, "started_at": started_at})
+            )
+            pipe.setex(f"refresh_family:{family}", ttl, token_hash)
+            await pipe.execute()
+        return token
+
+    async def issue(self, user_id) -> str:
+        """Start a new session at login"""
+        return await self._store(str(user_id), uuid.uuid4().hex, time.time())
+
+    async def rotate(self, token: str) -> Optional[Tuple[str, str]]:
+        """Consume token; return (user_id, new token) or None if invalid"""
+        token_hash = _hash(token)
+        data = await self.redis.eval(
+            ROTATE_SCRIPT, 2, f"refresh_token:{token_hash}", f"refresh_used:{token_hash}"
+        )
+        if not data:
+            return None
+
+        session = json.loads(data)
+        await self.redis.setex(
+            f"refresh_used:{token_hash}", settings.REFRESH_TOKEN_IDLE_DAYS * 86400, session["family"]
+        )
+        new_token = await self._store(session["user_id"], session["family"], session["started_at"])
+        if new_token is None:
+            return None
+        return session["user_id"], new_token
+
+    async def revoke(self, token: str) -> None:
+        """End the session the token belongs to (logout)"""
+        token_hash = _hash(token)
+        data = await self.redis.get(f"refresh_token:{token_hash}")
+        if data:
+            family = json.loads(data)["family"]
+            await self.redis.delete(f"refresh_token:{token_hash}", f"refresh_family:{family}")
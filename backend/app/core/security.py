@@ -1,5 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+import asyncio
+import json
+import os
+import time
+import uuid
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
@@ -11,6 +19,133 @@ from app.db.session import get_db
 
 security = HTTPBearer()
 
+# bcrypt releases the GIL, so a thread pool keeps it off the event loop
+_password_pool: Optional[ThreadPoolExecutor] = None
+_password_jobs = 0
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Identity resolved for a request; load the User row when more is needed"""
+    id: UUID
+    is_active: bool
+    is_superuser: bool
+
+
+# user_id -> (expires at, identity); per process, in front of Redis.
+# Serves tokens issued before claims were added (no "ver").
+_identity_cache: Dict[str, Tuple[float, CurrentUser]] = {}
+
+
+def _identity_key(user_id: str) -> str:
+    return f"user_identity:{user_id}"
+
+
+async def _get_cached_identity(user_id: str, redis_client) -> Optional[CurrentUser]:
+    entry = _identity_cache.get(user_id)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    
+    try:
+        cached = await redis_client.get(_identity_key(user_id))
+    except Exception:
+        cached = None
+    if not cached:
+        return None
+    
+    data = json.loads(cached)
+    identity = CurrentUser(id=UUID(user_id), is_active=data["is_active"], is_superuser=data["is_superuser"])
+    _identity_cache[user_id] = (time.monotonic() + settings.USER_CACHE_LOCAL_SECONDS, identity)
+    return identity
+
+
+async def _cache_identity(identity: CurrentUser, redis_client) -> None:
+    user_id = str(identity.id)
+    _identity_cache[user_id] = (time.monotonic() + settings.USER_CACHE_LOCAL_SECONDS, identity)
+    try:
+        await redis_client.setex(
+            _identity_key(user_id),
+            settings.USER_CACHE_SECONDS,
+            json.dumps({"is_active": identity.is_active, "is_superuser": identity.is_superuser})
+        )
+    except Exception:
+        pass
+
+
+async def invalidate_user_identity(user_id, redis_client) -> None:
+    """Drop cached identity after changing is_active or is_superuser.
+
+    Other processes keep their local copy for at most USER_CACHE_LOCAL_SECONDS.
+    """
+    _identity_cache.pop(str(user_id), None)
+    try:
+        await redis_client.delete(_identity_key(str(user_id)))
+    except Exception:
+        pass
+
+
+def _token_version_key(user_id) -> str:
+    return f"token_version:{user_id}"
+
+
+def _revoked_token_key(jti: str) -> str:
+    return f"revoked_token:{jti}"
+
+
+def user_token_claims(user) -> dict:
+    """Claims that let get_current_user authorize without loading the user"""
+    return {
+        "sub": str(user.id),
+        "act": bool(user.is_active),
+        "adm": bool(user.is_superuser),
+        "ver": user.token_version or 0,
+        "jti": uuid.uuid4().hex
+    }
+
+
+async def set_token_version(user_id, version: int, redis_client) -> None:
+    """Publish user's current token version; older tokens stop working at once.
+
+    Call after committing users.token_version, which stays the source of truth
+    when the Redis key is missing.
+    """
+    try:
+        await redis_client.setex(_token_version_key(user_id), settings.TOKEN_VERSION_CACHE_SECONDS, version)
+    except Exception as e:
+        print(f"Warning: Could not publish token version: {e}")
+
+
+async def revoke_token(payload: dict, redis_client) -> None:
+    """Revoke a single token until it expires (logout)"""
+    jti = payload.get("jti")
+    if not jti:
+        return
+    ttl = int(payload.get("exp", 0) - time.time())
+    if ttl > 0:
+        await redis_client.setex(_revoked_token_key(jti), ttl, "1")
+
+
+async def _token_state(user_id: str, jti: Optional[str], db: AsyncSession, redis_client) -> Tuple[Optional[int], bool]:
+    """(current token version, revoked) with one Redis round trip; DB on a miss"""
+    from app.crud.user import get_token_version
+    
+    version, revoked = None, None
+    try:
+        version, revoked = await redis_client.mget(
+            _token_version_key(user_id), _revoked_token_key(jti or "-")
+        )
+    except Exception:
+        pass
+    
+    if version is None:
+        version = await get_token_version(db, user_id)
+        if version is not None:
+            try:
+                await redis_client.setex(_token_version_key(user_id), settings.TOKEN_VERSION_CACHE_SECONDS, version)
+            except Exception:
+                pass
+    return (int(version) if version is not None else None), bool(revoked)
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -42,17 +177,59 @@ def get_password_hash(password: str) -> str:
     password_bytes = password.encode('utf-8')
     if len(password_bytes) > 72:
         password_bytes = password_bytes[:72]
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True when the hash was made with a different cost than BCRYPT_ROUNDS"""
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+def _password_workers() -> int:
+    return settings.PASSWORD_WORKERS or os.cpu_count() or 1
+
+
+async def _run_password_job(func, *args):
+    """Run bcrypt work in the bounded pool; 503 when the queue is full"""
+    global _password_pool, _password_jobs
+    if _password_jobs >= _password_workers() + settings.PASSWORD_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry",
+            headers={"Retry-After": "1"}
+        )
+    if _password_pool is None:
+        _password_pool = ThreadPoolExecutor(
+            max_workers=_password_workers(), thread_name_prefix="bcrypt"
+        )
+    
+    _password_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_pool, func, *args)
+    finally:
+        _password_jobs -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_password_job(get_password_hash, password)
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
 ):
     # Import here to avoid circular import
     from app.crud.user import get_user_by_id
+    from app.dependencies import get_redis
     
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -70,21 +247,41 @@ async def get_current_user(
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
-    except JWTError:
+        UUID(user_id)
+    except (JWTError, ValueError):
         raise credentials_exception
     
-    user = await get_user_by_id(db, user_id)
-    if user is None:
-        raise credentials_exception
+    if "ver" in payload:
+        # Authorize from claims; the lazy session is only used when Redis
+        # has no token version for this user
+        version, revoked = await _token_state(user_id, payload.get("jti"), db, await get_redis())
+        if revoked or version is None or payload["ver"] != version:
+            raise credentials_exception
+        identity = CurrentUser(id=UUID(user_id), is_active=payload["act"], is_superuser=payload["adm"])
+    else:
+        # Tokens issued before claims were added: cached identity, user row on a miss
+        redis_client = await get_redis()
+        identity = await _get_cached_identity(user_id, redis_client)
+        if identity is None:
+            user = await get_user_by_id(db, user_id)
+            if user is None:
+                raise credentials_exception
+            identity = CurrentUser(id=user.id, is_active=bool(user.is_active), is_superuser=bool(user.is_superuser))
+            await _cache_identity(identity, redis_client)
+    
+    if not identity.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive"
+        )
     
-    return user
+    return identity
 
 
 async def get_current_admin_user(
     current_user = Depends(get_current_user)
 ):
     """Dependency to check if user is admin"""
-    from app.models.user import User
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -1,7 +1,8 @@
+import asyncio
 import json
 import os
 import shutil
-from typing import Optional, Dict, Any, BinaryIO, List
+from typing import Optional, Dict, Any, BinaryIO, List, Tuple
 from pathlib import Path
 from uuid import UUID
 
@@ -415,6 +416,51 @@ class StorageService:
             )
             return True
     
+    async def get_question_set_version(
+        self,
+        course_id: UUID,
+        module_id: str,
+        version: str
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Retrieve an immutable snapshot of test questions by version"""
+        if settings.USE_LOCAL_STORAGE:
+            file_path = self._get_file_path("courses", str(course_id), "modules", module_id, "test", "versions", f"{version}.json")
+            if not file_path:
+                return None
+            with open(file_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        else:
+            blob_path = f"courses/{course_id}/modules/{module_id}/test/versions/{version}.json"
+            blob = self.bucket.blob(blob_path)
+            if not blob.exists():
+                return None
+            content = blob.download_as_text()
+            return json.loads(content)
+    
+    async def save_question_set_version(
+        self,
+        course_id: UUID,
+        module_id: str,
+        version: str,
+        questions: List[Dict[str, Any]]
+    ) -> bool:
+        """Save snapshot of test questions under its version (write once)"""
+        if settings.USE_LOCAL_STORAGE:
+            file_path = self._ensure_directory("courses", str(course_id), "modules", module_id, "test", "versions", f"{version}.json")
+            if file_path:
+                with open(file_path, "w", encoding="utf-8") as f:
+                    json.dump(questions, f, ensure_ascii=False)
+                return True
+            return False
+        else:
+            blob_path = f"courses/{course_id}/modules/{module_id}/test/versions/{version}.json"
+            blob = self.bucket.blob(blob_path)
+            blob.upload_from_string(
+                json.dumps(questions, ensure_ascii=False),
+                content_type="application/json"
+            )
+            return True
+    
     async def get_test_settings(self, course_id: UUID, module_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve test settings from storage"""
         if settings.USE_LOCAL_STORAGE:
@@ -454,6 +500,156 @@ class StorageService:
             )
             return True
     
+    # Question bank methods (bank/{version}.jsonl + bank/{version}.idx.json, bank/current.json)
+    async def save_question_bank(
+        self,
+        course_id: UUID,
+        module_id: str,
+        version: str,
+        data_path: str,
+        index: Dict[str, Any]
+    ) -> bool:
+        """Upload a bank file and its index, then make it the current bank"""
+        parts = ("courses", str(course_id), "modules", module_id, "test", "bank")
+        index_json = json.dumps(index, ensure_ascii=False, separators=(",", ":"))
+        current_json = json.dumps({"version": version})
+        if settings.USE_LOCAL_STORAGE:
+            file_path = self._ensure_directory(*parts, f"{version}.jsonl")
+            if not file_path:
+                return False
+            shutil.copyfile(data_path, file_path)
+            with open(self._ensure_directory(*parts, f"{version}.idx.json"), "w", encoding="utf-8") as f:
+                f.write(index_json)
+            # Pointer last: readers never see a version without its files
+            with open(self._ensure_directory(*parts, "current.json"), "w", encoding="utf-8") as f:
+                f.write(current_json)
+            return True
+        else:
+            prefix = "/".join(parts)
+            self.bucket.blob(f"{prefix}/{version}.jsonl").upload_from_filename(
+                data_path, content_type="application/x-ndjson"
+            )
+            self.bucket.blob(f"{prefix}/{version}.idx.json").upload_from_string(
+                index_json, content_type="application/json"
+            )
+            self.bucket.blob(f"{prefix}/current.json").upload_from_string(
+                current_json, content_type="application/json"
+            )
+            return True
+    
+    async def get_question_bank_version(self, course_id: UUID, module_id: str) -> Optional[str]:
+        """Version of the module's current question bank, if it has one"""
+        if settings.USE_LOCAL_STORAGE:
+            file_path = self._get_file_path("courses", str(course_id), "modules", module_id, "test", "bank", "current.json")
+            if not file_path:
+                return None
+            with open(file_path, "r", encoding="utf-8") as f:
+                return json.load(f)["version"]
+        else:
+            blob = self.bucket.blob(f"courses/{course_id}/modules/{module_id}/test/bank/current.json")
+            if not blob.exists():
+                return None
+            return json.loads(blob.download_as_text())["version"]
+    
+    async def get_question_bank_index(
+        self,
+        course_id: UUID,
+        module_id: str,
+        version: str
+    ) -> Optional[Dict[str, Any]]:
+        """Offset index of a question bank version"""
+        if settings.USE_LOCAL_STORAGE:
+            file_path = self._get_file_path("courses", str(course_id), "modules", module_id, "test", "bank", f"{version}.idx.json")
+            if not file_path:
+                return None
+            with open(file_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        else:
+            blob = self.bucket.blob(f"courses/{course_id}/modules/{module_id}/test/bank/{version}.idx.json")
+            if not blob.exists():
+                return None
+            return json.loads(blob.download_as_text())
+    
+    async def read_question_bank_range(
+        self,
+        course_id: UUID,
+        module_id: str,
+        version: str,
+        offset: int,
+        length: int
+    ) -> Optional[bytes]:
+        """Read a byte range (one or more items) of a question bank version"""
+        if settings.USE_LOCAL_STORAGE:
+            file_path = self._get_file_path("courses", str(course_id), "modules", module_id, "test", "bank", f"{version}.jsonl")
+            if not file_path:
+                return None
+            with open(file_path, "rb") as f:
+                f.seek(offset)
+                return f.read(length)
+        else:
+            blob = self.bucket.blob(f"courses/{course_id}/modules/{module_id}/test/bank/{version}.jsonl")
+            return blob.download_as_bytes(start=offset, end=offset + length - 1)
+    
+    async def read_question_bank_ranges(
+        self,
+        course_id: UUID,
+        module_id: str,
+        version: str,
+        ranges: List[Tuple[int, int]]
+    ) -> Optional[List[bytes]]:
+        """Read several (offset, length) byte ranges of a question bank version at once"""
+        if settings.USE_LOCAL_STORAGE:
+            file_path = self._get_file_path("courses", str(course_id), "modules", module_id, "test", "bank", f"{version}.jsonl")
+            if not file_path:
+                return None
+            chunks = []
+            with open(file_path, "rb") as f:
+                for offset, length in ranges:
+                    f.seek(offset)
+                    chunks.append(f.read(length))
+            return chunks
+        else:
+            path = f"courses/{course_id}/modules/{module_id}/test/bank/{version}.jsonl"
+            # Range requests run concurrently in threads instead of blocking the loop one by one
+            return list(await asyncio.gather(*[
+                asyncio.to_thread(
+                    self.bucket.blob(path).download_as_bytes, start=offset, end=offset + length - 1
+                )
+                for offset, length in ranges
+            ]))
+    
+    # Archive segment methods
+    async def save_archive_segment(self, segment: str, data: bytes) -> bool:
+        """Write an append-only archive segment (never overwritten)"""
+        if settings.USE_LOCAL_STORAGE:
+            file_path = self._ensure_directory("archive", "test_results", segment)
+            if file_path:
+                with open(file_path, "xb") as f:
+                    f.write(data)
+                return True
+            return False
+        else:
+            blob_path = f"archive/test_results/{segment}"
+            blob = self.bucket.blob(blob_path)
+            blob.upload_from_string(data, content_type="application/gzip", if_generation_match=0)
+            return True
+    
+    async def read_archive_range(self, segment: str, offset: int, length: int) -> Optional[bytes]:
+        """Read a byte range of an archive segment"""
+        if settings.USE_LOCAL_STORAGE:
+            file_path = self._get_file_path("archive", "test_results", segment)
+            if not file_path:
+                return None
+            with open(file_path, "rb") as f:
+                f.seek(offset)
+                return f.read(length)
+        else:
+            blob_path = f"archive/test_results/{segment}"
+            blob = self.bucket.blob(blob_path)
+            if not blob.exists():
+                return None
+            return blob.download_as_bytes(start=offset, end=offset + length - 1)
+    
     # Backward compatibility methods (for migration)
     async def get_correct_answers(self, module_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve correct answers (deprecated - for backward compatibility)"""
@@ -0,0 +1,39 @@
+import codecs
+import os
+import tempfile
+from typing import AsyncIterator
+
+from fastapi import UploadFile
+
+
+async def spool_upload(upload: UploadFile, suffix: str = "", chunk_size: int = 1 << 16) -> str:
+    """Copy an upload to a temporary file (it is closed once the response is sent)"""
+    handle, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(handle, "wb") as spool:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                spool.write(chunk)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path
+
+
+async def iter_upload_lines(upload: UploadFile, chunk_size: int = 1 << 16) -> AsyncIterator[str]:
+    """Decode an upload line by line without reading it into memory"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    while True:
+        chunk = await upload.read(chunk_size)
+        text = tail + decoder.decode(chunk or b"", final=not chunk)
+        lines = text.split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+        if not chunk:
+            break
+    if tail:
+        yield tail.rstrip("\r")
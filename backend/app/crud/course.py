@@ -1,6 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List, Optional
+from sqlalchemy import select, tuple_
+from sqlalchemy.engine import Row
+from typing import List, Optional, Tuple
 from uuid import UUID
 
 from app.models.course import Course
@@ -49,3 +50,22 @@ async def delete_course(db: AsyncSession, course_id: UUID) -> bool:
     await db.commit()
     return True
 
+
+async def list_courses_page(
+    db: AsyncSession,
+    limit: int,
+    after: Optional[Tuple[int, UUID]] = None
+) -> List[Row]:
+    """Page of courses ordered by (order_index, id), projected to listed columns"""
+    query = (
+        select(
+            Course.id, Course.title, Course.description, Course.order_index,
+            Course.is_active, Course.created_at, Course.updated_at
+        )
+        .order_by(Course.order_index, Course.id)
+        .limit(limit)
+    )
+    if after is not None:
+        query = query.where(tuple_(Course.order_index, Course.id) > after)
+    result = await db.execute(query)
+    return list(result.all())
@@ -1,6 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List, Optional
+from sqlalchemy import select, tuple_
+from sqlalchemy.engine import Row
+from typing import List, Optional, Tuple
 
 from app.models.lesson import Lesson
 
@@ -73,3 +74,24 @@ async def delete_lesson(db: AsyncSession, lesson_id: str) -> bool:
     await db.commit()
     return True
 
+
+async def list_lessons_page(
+    db: AsyncSession,
+    module_id: str,
+    limit: int,
+    after: Optional[Tuple[int, str]] = None
+) -> List[Row]:
+    """Page of module's lessons ordered by (order_index, id), projected to listed columns"""
+    query = (
+        select(
+            Lesson.id, Lesson.module_id, Lesson.lesson_number, Lesson.title,
+            Lesson.order_index, Lesson.is_active, Lesson.created_at, Lesson.updated_at
+        )
+        .where(Lesson.module_id == module_id)
+        .order_by(Lesson.order_index, Lesson.id)
+        .limit(limit)
+    )
+    if after is not None:
+        query = query.where(tuple_(Lesson.order_index, Lesson.id) > after)
+    result = await db.execute(query)
+    return list(result.all())
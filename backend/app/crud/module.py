@@ -1,6 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List, Optional
+from sqlalchemy import select, tuple_
+from sqlalchemy.engine import Row
+from typing import List, Optional, Tuple
 from uuid import UUID
 
 from app.models.module import Module
@@ -53,3 +54,25 @@ async def delete_module(db: AsyncSession, module_id: str) -> bool:
     return True
 
 
+async def list_modules_page(
+    db: AsyncSession,
+    limit: int,
+    after: Optional[Tuple[int, str]] = None,
+    course_id: Optional[UUID] = None
+) -> List[Row]:
+    """Page of modules ordered by (order_index, id), projected to listed columns"""
+    query = (
+        select(
+            Module.id, Module.course_id, Module.title, Module.description,
+            Module.total_lessons, Module.order_index, Module.is_active,
+            Module.created_at, Module.updated_at
+        )
+        .order_by(Module.order_index, Module.id)
+        .limit(limit)
+    )
+    if course_id:
+        query = query.where(Module.course_id == course_id)
+    if after is not None:
+        query = query.where(tuple_(Module.order_index, Module.id) > after)
+    result = await db.execute(query)
+    return list(result.all())
@@ -1,9 +1,19 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import Optional, List
 from uuid import UUID
 
-from app.models.progress import UserProgress, ProgressStatus
+from app.models.progress import UserProgress, ProgressStatus, UserProgressSummary
+
+
+# Summary counter column for each progress status
+STATUS_COUNTERS = {
+    ProgressStatus.IN_PROGRESS: "in_progress_modules",
+    ProgressStatus.TESTING: "testing_modules",
+    ProgressStatus.COMPLETED: "completed_modules",
+    ProgressStatus.FAILED: "failed_modules",
+}
 
 
 async def get_user_progress(
@@ -45,6 +55,11 @@ async def create_user_progress(
         current_lesson=0
     )
     db.add(progress)
+    await adjust_progress_summary(
+        db, user_id,
+        total_modules=1,
+        **{STATUS_COUNTERS[ProgressStatus.IN_PROGRESS]: 1}
+    )
     await db.commit()
     await db.refresh(progress)
     return progress
@@ -74,9 +89,82 @@ async def update_status(
         select(UserProgress).where(UserProgress.id == progress_id)
     )
     progress = result.scalar_one()
+    if progress.status != status:
+        await adjust_status_counters(db, progress.user_id, progress.status, status)
     progress.status = status
     await db.commit()
     await db.refresh(progress)
     return progress
 
 
+async def record_attempt(
+    db: AsyncSession,
+    progress_id: UUID,
+    result_id: UUID
+) -> Optional[int]:
+    """Atomically bump the attempt counter and point at the new result.
+
+    Only a module still in testing takes an attempt; returns None when a
+    concurrent submit already finished it. Does not commit; the caller
+    commits together with the TestResult row.
+    """
+    result = await db.execute(
+        update(UserProgress)
+        .where(
+            UserProgress.id == progress_id,
+            UserProgress.status == ProgressStatus.TESTING
+        )
+        .values(
+            attempts_count=UserProgress.attempts_count + 1,
+            last_result_id=result_id
+        )
+        .returning(UserProgress.attempts_count)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one_or_none()
+
+
+async def adjust_progress_summary(
+    db: AsyncSession,
+    user_id: UUID,
+    **deltas: int
+) -> None:
+    """Add deltas to user's summary counters (upsert, does not commit)"""
+    stmt = pg_insert(UserProgressSummary).values(user_id=user_id, **deltas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserProgressSummary.user_id],
+        set_={
+            **{
+                name: getattr(UserProgressSummary, name) + stmt.excluded[name]
+                for name in deltas
+            },
+            "updated_at": stmt.excluded.updated_at
+        }
+    )
+    await db.execute(stmt)
+
+
+async def adjust_status_counters(
+    db: AsyncSession,
+    user_id: UUID,
+    old_status: Optional[ProgressStatus],
+    new_status: ProgressStatus
+) -> None:
+    """Move one module between status counters (does not commit)"""
+    deltas = {}
+    if old_status in STATUS_COUNTERS:
+        deltas[STATUS_COUNTERS[old_status]] = -1
+    if new_status in STATUS_COUNTERS:
+        deltas[STATUS_COUNTERS[new_status]] = deltas.get(STATUS_COUNTERS[new_status], 0) + 1
+    if deltas:
+        await adjust_progress_summary(db, user_id, **deltas)
+
+
+async def get_progress_summary(
+    db: AsyncSession,
+    user_id: UUID
+) -> Optional[UserProgressSummary]:
+    result = await db.execute(
+        select(UserProgressSummary).where(UserProgressSummary.user_id == user_id)
+    )
+    return result.scalar_one_or_none()
@@ -0,0 +1,107 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, tuple_, func, case
+from sqlalchemy.engine import Row
+from typing import List, Optional, Tuple
+from datetime import datetime
+from uuid import UUID
+
+from app.models.test import TestResult
+
+
+# Columns returned to the owner of a result
+RESULT_COLUMNS = (
+    TestResult.id,
+    TestResult.module_id,
+    TestResult.score,
+    TestResult.max_score,
+    TestResult.percentage,
+    TestResult.passed,
+    TestResult.answers,
+    TestResult.detailed_results,
+    TestResult.question_set_version,
+    TestResult.correct_bits,
+    TestResult.answers_compact,
+    TestResult.form_seed,
+    TestResult.form_size,
+    TestResult.bank_positions,
+    TestResult.attempt_number,
+    TestResult.completed_at,
+)
+
+# Columns served from ix_test_results_user_completed (index-only scan)
+SUMMARY_COLUMNS = (
+    TestResult.id,
+    TestResult.module_id,
+    TestResult.score,
+    TestResult.max_score,
+    TestResult.percentage,
+    TestResult.passed,
+    TestResult.attempt_number,
+    TestResult.completed_at,
+)
+
+
+async def get_user_test_result(
+    db: AsyncSession,
+    result_id: UUID,
+    user_id: UUID,
+    completed_at: Optional[datetime] = None
+) -> Optional[Row]:
+    """Fetch a result only if it belongs to user, in one query.
+
+    completed_at (carried in the result reference) narrows the lookup to one
+    test_results partition; without it every month is probed.
+    """
+    query = (
+        select(*RESULT_COLUMNS)
+        .where(TestResult.id == result_id)
+        .where(TestResult.user_id == user_id)
+    )
+    if completed_at is not None:
+        query = query.where(TestResult.completed_at == completed_at)
+    result = await db.execute(query)
+    return result.one_or_none()
+
+
+async def list_user_test_results(
+    db: AsyncSession,
+    user_id: UUID,
+    limit: int,
+    after: Optional[Tuple[datetime, UUID]] = None
+) -> List[Row]:
+    """List user's results newest first using keyset pagination on (completed_at, id)"""
+    query = (
+        select(*SUMMARY_COLUMNS)
+        .where(TestResult.user_id == user_id)
+        .order_by(TestResult.completed_at.desc(), TestResult.id.desc())
+        .limit(limit)
+    )
+    if after is not None:
+        query = query.where(tuple_(TestResult.completed_at, TestResult.id) < after)
+    result = await db.execute(query)
+    return list(result.all())
+
+
+async def get_module_result_stats(
+    db: AsyncSession,
+    module_id: str,
+    date_from: datetime,
+    date_to: datetime
+) -> Row:
+    """Aggregate attempts for a module within [date_from, date_to).
+
+    The half-open range on completed_at lets Postgres prune test_results
+    partitions to the months involved.
+    """
+    result = await db.execute(
+        select(
+            func.count().label("attempts"),
+            func.count(case((TestResult.passed == True, 1))).label("passed"),
+            func.avg(TestResult.percentage).label("average_percentage"),
+            func.count(func.distinct(TestResult.user_id)).label("users")
+        )
+        .where(TestResult.module_id == module_id)
+        .where(TestResult.completed_at >= date_from)
+        .where(TestResult.completed_at < date_to)
+    )
+    return result.one()
@@ -1,10 +1,10 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
 from typing import Optional
 from uuid import UUID
 
 from app.models.user import User
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
 
 
 async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
@@ -13,7 +13,8 @@ async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User
 
 
 async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
-    result = await db.execute(select(User).where(User.email == email))
+    # Case-insensitive, like bulk import (ix_users_email_lower)
+    result = await db.execute(select(User).where(func.lower(User.email) == email.lower()))
     return result.scalar_one_or_none()
 
 
@@ -22,11 +23,32 @@ async def get_user_by_id(db: AsyncSession, user_id: str) -> Optional[User]:
     return result.scalar_one_or_none()
 
 
+async def get_token_version(db: AsyncSession, user_id: str) -> Optional[int]:
+    result = await db.execute(select(User.token_version).where(User.id == UUID(user_id)))
+    return result.scalar_one_or_none()
+
+
+async def update_user_flags(db: AsyncSession, user: User, **fields) -> User:
+    """Change is_active/is_superuser and invalidate the user's issued tokens"""
+    for name, value in fields.items():
+        setattr(user, name, value)
+    user.token_version = (user.token_version or 0) + 1
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+async def update_password_hash(db: AsyncSession, user: User, hashed_password: str) -> User:
+    user.hashed_password = hashed_password
+    await db.commit()
+    return user
+
+
 async def create_user(db: AsyncSession, username: str, email: str, password: str) -> User:
-    hashed_password = get_password_hash(password)
+    hashed_password = await get_password_hash_async(password)
     user = User(
         username=username,
-        email=email,
+        email=email.lower(),
         hashed_password=hashed_password
     )
     db.add(user)
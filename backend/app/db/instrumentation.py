@@ -0,0 +1,112 @@
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+
+slow_query_logger = logging.getLogger("app.sql.slow")
+n_plus_one_logger = logging.getLogger("app.sql.n_plus_one")
+
+_whitespace = re.compile(r"\s+")
+
+
+@dataclass
+class QueryStats:
+    """Statements executed while handling a single request"""
+    count: int = 0
+    total_ms: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+    warned_shapes: set = field(default_factory=set)
+
+
+_request_stats: ContextVar[Optional[QueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def _statement_shape(statement: str) -> str:
+    # Statements are already parametrized, so collapsing whitespace is enough
+    return _whitespace.sub(" ", statement).strip()
+
+
+def _redact(parameters) -> str:
+    """Describe bound parameters without leaking their values"""
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}=?" for key in parameters) + "}"
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f"<{len(parameters)} parameter sets>"
+        return "(" + ", ".join("?" for _ in parameters) + ")"
+    return "?"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.total_ms += elapsed_ms
+
+        threshold = settings.N_PLUS_ONE_THRESHOLD
+        if threshold > 0:
+            shape = _statement_shape(statement)
+            stats.shapes[shape] += 1
+            if stats.shapes[shape] > threshold and shape not in stats.warned_shapes:
+                stats.warned_shapes.add(shape)
+                n_plus_one_logger.warning(
+                    "Possible N+1: statement ran more than %d times in one request: %s",
+                    threshold, shape
+                )
+
+    if elapsed_ms >= settings.SLOW_QUERY_MS and random.random() < settings.SLOW_QUERY_SAMPLE_RATE:
+        slow_query_logger.warning(
+            "Slow query (%.1f ms): %s params=%s",
+            elapsed_ms, _statement_shape(statement), _redact(parameters)
+        )
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Attach query timing listeners to an async engine"""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware that reports per-request DB usage in Server-Timing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries"'.encode("latin-1")
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
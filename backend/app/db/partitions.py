@@ -0,0 +1,141 @@
+import re
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import settings
+
+# test_results is range-partitioned by month on completed_at; rows outside
+# every monthly partition land in the DEFAULT partition instead of failing
+PARENT_TABLE = "test_results"
+DEFAULT_PARTITION = "test_results_default"
+_partition_name = re.compile(r"^test_results_p(\d{4})_(\d{2})$")
+
+# Serializes partition maintenance across workers (pg_advisory_xact_lock key)
+PARTITION_LOCK_ID = 7007
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    month_index = value.year * 12 + value.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month.year:04d}_{month.month:02d}"
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    result = await conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :name"
+    ), {"name": PARENT_TABLE})
+    return result.scalar() is not None
+
+
+async def ensure_partitions(
+    conn: AsyncConnection,
+    months_ahead: Optional[int] = None,
+    start: Optional[date] = None
+) -> List[str]:
+    """Create monthly partitions from `start` (default: this month) through months_ahead"""
+    if not await is_partitioned(conn):
+        return []
+
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    first = month_start(start or datetime.utcnow().date())
+    last = add_months(month_start(datetime.utcnow().date()), months_ahead)
+
+    # Workers starting together would otherwise race on CREATE TABLE
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": PARTITION_LOCK_ID})
+    await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+
+    existing = set(await list_partitions(conn))
+    created = []
+    month = first
+    while month <= last:
+        name = partition_name(month)
+        if month not in existing:
+            await _create_partition(conn, month)
+        created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+async def _create_partition(conn: AsyncConnection, month: date) -> None:
+    """Create a month's partition, taking over its rows from the DEFAULT partition"""
+    name = partition_name(month)
+    bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    in_range = f"completed_at >= '{month.isoformat()}' AND completed_at < '{add_months(month, 1).isoformat()}'"
+
+    stray = await conn.execute(text(f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range} LIMIT 1"))
+    if stray.scalar() is None:
+        await conn.execute(text(f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} FOR VALUES {bounds}"))
+        return
+
+    # A new partition cannot overlap rows still in DEFAULT: move them first
+    await conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    await conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ))
+    await conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+
+
+async def list_partitions(conn: AsyncConnection) -> List[date]:
+    """Months that currently have an attached partition, oldest first"""
+    result = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :name"
+    ), {"name": PARENT_TABLE})
+    months = []
+    for (name,) in result.all():
+        match = _partition_name.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+async def detach_partitions_before(
+    conn: AsyncConnection,
+    before: date,
+    require_empty: bool = False
+) -> List[str]:
+    """Detach whole-month partitions older than `before`.
+
+    Detaching is a catalog change, not a row-by-row DELETE; the detached
+    tables keep their data and can be archived or dropped afterwards.
+    With require_empty (before a drop), nothing is detached while any of
+    those partitions still holds rows that were not moved to the archive:
+    dropping them would lose results that GET /results/{id} and
+    user_progress.last_result_id still point at.
+    """
+    months = [month for month in await list_partitions(conn) if add_months(month, 1) <= month_start(before)]
+
+    if require_empty:
+        not_archived = []
+        for month in months:
+            name = partition_name(month)
+            rows = await conn.execute(text(f"SELECT 1 FROM {name} LIMIT 1"))
+            if rows.scalar() is not None:
+                not_archived.append(name)
+        if not_archived:
+            raise ValueError(
+                f"Partitions still hold results, archive them first (archive_results.py): "
+                f"{', '.join(not_archived)}"
+            )
+
+    detached = []
+    for month in months:
+        name = partition_name(month)
+        await conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+        detached.append(name)
+    return detached
@@ -0,0 +1,122 @@
+import asyncio
+import itertools
+import time
+from typing import Dict, List, Optional
+from uuid import UUID
+
+import redis.asyncio as redis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+
+
+# Replay lag in seconds; 0 when the replica has applied everything it received
+# or when the server is not in recovery at all
+REPLICA_LAG_SQL = text(
+    "SELECT COALESCE("
+    "CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END, 0)"
+)
+
+
+class EngineRouter:
+    """Route read-only sessions to replicas, falling back to the primary.
+
+    A replica is used only while its measured replay lag is below
+    REPLICA_MAX_LAG_SECONDS. Users who wrote recently are pinned to the
+    primary for READ_YOUR_WRITES_SECONDS so they always see their own writes.
+    """
+    
+    def __init__(self, primary: AsyncEngine, replicas: List[AsyncEngine]):
+        self.primary = primary
+        self.replicas = replicas
+        self._cycle = itertools.cycle(range(len(replicas))) if replicas else None
+        self._lag: Dict[int, float] = {}
+        self._checked_at: Dict[int, float] = {}
+        self._locks: Dict[int, asyncio.Lock] = {i: asyncio.Lock() for i in range(len(replicas))}
+        # Local stickiness, used when Redis is unavailable; kept in expiry order
+        self._sticky_until: Dict[str, float] = {}
+    
+    def _sticky_key(self, user_id: UUID) -> str:
+        return f"db_sticky:{user_id}"
+    
+    async def mark_write(self, user_id: UUID, redis_client: Optional[redis.Redis] = None) -> None:
+        """Pin user's reads to the primary after their own write"""
+        if not self.replicas:
+            return
+        ttl = settings.READ_YOUR_WRITES_SECONDS
+        now = time.monotonic()
+        # Same TTL for every entry: re-inserting keeps the dict ordered by expiry,
+        # so expired users (who wrote and left) are pruned from the front
+        for key, until in list(itertools.islice(self._sticky_until.items(), 64)):
+            if until > now:
+                break
+            del self._sticky_until[key]
+        self._sticky_until.pop(str(user_id), None)
+        self._sticky_until[str(user_id)] = now + ttl
+        if redis_client is not None:
+            try:
+                await redis_client.setex(self._sticky_key(user_id), ttl, "1")
+            except Exception:
+                pass
+    
+    async def is_sticky(self, user_id: UUID, redis_client: Optional[redis.Redis] = None) -> bool:
+        until = self._sticky_until.get(str(user_id))
+        if until is not None:
+            if until > time.monotonic():
+                return True
+            self._sticky_until.pop(str(user_id), None)
+        if redis_client is not None:
+            try:
+                return await redis_client.exists(self._sticky_key(user_id)) > 0
+            except Exception:
+                return False
+        return False
+    
+    def _fresh_lag(self, index: int) -> Optional[float]:
+        """Cached lag if checked within REPLICA_LAG_CHECK_SECONDS; None forces a check"""
+        checked_at = self._checked_at.get(index)
+        if checked_at is None or time.monotonic() - checked_at >= settings.REPLICA_LAG_CHECK_SECONDS:
+            return None
+        return self._lag.get(index)
+    
+    async def _replica_lag(self, index: int) -> float:
+        """Return cached replay lag for replica, refreshing it when stale"""
+        lag = self._fresh_lag(index)
+        if lag is not None:
+            return lag
+        
+        async with self._locks[index]:
+            # Another request may have refreshed it while we waited
+            lag = self._fresh_lag(index)
+            if lag is not None:
+                return lag
+            try:
+                async with self.replicas[index].connect() as conn:
+                    lag = float((await conn.execute(REPLICA_LAG_SQL)).scalar() or 0)
+            except Exception as e:
+                print(f"Warning: replica {index} health check failed: {e}")
+                lag = float("inf")
+            self._lag[index] = lag
+            self._checked_at[index] = time.monotonic()
+            return lag
+    
+    async def engine_for_read(
+        self,
+        user_id: Optional[UUID] = None,
+        redis_client: Optional[redis.Redis] = None
+    ) -> AsyncEngine:
+        """Pick a replica within the lag budget, or the primary"""
+        if not self.replicas:
+            return self.primary
+        
+        if user_id is not None and await self.is_sticky(user_id, redis_client):
+            return self.primary
+        
+        for _ in range(len(self.replicas)):
+            index = next(self._cycle)
+            if await self._replica_lag(index) <= settings.REPLICA_MAX_LAG_SECONDS:
+                return self.replicas[index]
+        
+        return self.primary
@@ -1,9 +1,14 @@
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from app.config import settings
+from app.db.routing import EngineRouter
+from app.db.instrumentation import instrument_engine
 
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=True
+    echo=settings.DB_ECHO,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -12,11 +17,37 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+# Handle DATABASE_REPLICA_URLS as list or comma-separated string
+replica_urls = settings.DATABASE_REPLICA_URLS
+if isinstance(replica_urls, str):
+    replica_urls = [url.strip() for url in replica_urls.split(",") if url.strip()]
+
+replica_engines = [
+    create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT
+    )
+    for url in replica_urls
+]
+
+for _engine in [engine, *replica_engines]:
+    instrument_engine(_engine)
+
+engine_router = EngineRouter(engine, replica_engines)
+
 
 async def get_db():
+    """Yield a lazy session for the request.
+
+    AsyncSession autobegins on the first statement, so a pooled connection is
+    only checked out when a route actually queries the database. Routes that
+    are answered from cache never touch the pool.
+    """
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
             await session.close()
-
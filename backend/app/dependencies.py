@@ -2,13 +2,15 @@ from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 import redis.asyncio as redis
 
-from app.db.session import get_db
+from app.db.session import get_db, engine_router, AsyncSessionLocal
 from app.config import settings
+from app.core.security import get_current_user
 from app.core.cache import CacheService
 from app.core.storage import StorageService
 from app.services.content_service import ContentService
 from app.services.test_service import TestGradingService
 from app.services.progress_service import ProgressService
+from app.services.archive_service import ResultArchiveService
 
 
 # Redis connection (singleton pattern)
@@ -31,6 +33,25 @@ async def get_redis() -> redis.Redis:
     return _redis_client
 
 
+async def get_read_db(
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user),
+    redis_client: redis.Redis = Depends(get_redis)
+):
+    """Session for read-only endpoints, routed to a replica when one is fresh enough"""
+    read_engine = await engine_router.engine_for_read(current_user.id, redis_client)
+    if read_engine is engine_router.primary:
+        # Reuse the request's primary session instead of opening a second one
+        yield db
+        return
+    
+    async with AsyncSessionLocal(bind=read_engine) as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
 def get_cache_service(redis_client: redis.Redis = Depends(get_redis)) -> CacheService:
     return CacheService(redis_client)
 
@@ -50,6 +71,15 @@ def get_grading_service() -> TestGradingService:
     return TestGradingService()
 
 
-def get_progress_service(db: AsyncSession = Depends(get_db)) -> ProgressService:
-    return ProgressService(db)
+def get_progress_service(
+    db: AsyncSession = Depends(get_db),
+    cache_service: CacheService = Depends(get_cache_service)
+) -> ProgressService:
+    return ProgressService(db, cache_service)
 
+
+def get_archive_service(
+    db: AsyncSession = Depends(get_read_db),
+    storage_service: StorageService = Depends(get_storage_service)
+) -> ResultArchiveService:
+    return ResultArchiveService(db, storage_service)
@@ -1,12 +1,57 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import redis.asyncio as redis
 
 from app.api.v1 import auth, courses, modules, lessons, tests, progress, admin
 from app.config import settings
 from app.db.session import engine
+from app.db.instrumentation import QueryStatsMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.db.partitions import ensure_partitions
 from app.db.base import Base
+from app.services.event_log import event_log
+from app.services.progress_buffer import ProgressWriteBuffer
+from app.services.test_attempts import sweep_expired_sessions
+
+
+# Retry delay after a failed partition check (e.g. the database was restarting)
+PARTITION_RETRY_SECONDS = 300
+
+
+async def maintain_partitions():
+    """Keep future test_results partitions in place (daily, retried soon after a failure)"""
+    while True:
+        try:
+            async with engine.begin() as conn:
+                await ensure_partitions(conn)
+        except Exception as e:
+            print(f"Warning: Could not create test_results partitions: {e}")
+            await asyncio.sleep(PARTITION_RETRY_SECONDS)
+            continue
+        await asyncio.sleep(24 * 3600)
+
+
+async def flush_progress_advances(buffer: ProgressWriteBuffer):
+    """Flush write-behind lesson advances every PROGRESS_FLUSH_MS"""
+    while True:
+        await asyncio.sleep(settings.PROGRESS_FLUSH_MS / 1000)
+        try:
+            await buffer.flush(engine)
+        except Exception as e:
+            print(f"Warning: Could not flush progress advances: {e}")
+
+
+async def expire_test_sessions(redis_client: redis.Redis):
+    """Auto-submit timed attempts past their deadline every TEST_SWEEP_SECONDS"""
+    while True:
+        await asyncio.sleep(settings.TEST_SWEEP_SECONDS)
+        try:
+            await sweep_expired_sessions(redis_client)
+        except Exception as e:
+            print(f"Warning: Could not finalize expired test sessions: {e}")
+
 
 # Lifespan context manager
 @asynccontextmanager
@@ -19,6 +64,9 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"Warning: Could not create tables: {e}")
     
+    partitions_task = asyncio.create_task(maintain_partitions())
+    event_log.start()
+    
     # Initialize Redis
     try:
         app.state.redis = redis.from_url(
@@ -30,9 +78,33 @@ async def lifespan(app: FastAPI):
         print(f"Warning: Could not connect to Redis: {e}")
         app.state.redis = None
     
+    flush_task = None
+    if settings.PROGRESS_WRITE_BEHIND and app.state.redis:
+        progress_buffer = ProgressWriteBuffer(app.state.redis)
+        # Replay advances left in Redis by a crash before serving traffic
+        try:
+            await progress_buffer.flush(engine)
+        except Exception as e:
+            print(f"Warning: Could not replay progress advances: {e}")
+        flush_task = asyncio.create_task(flush_progress_advances(progress_buffer))
+    
+    sweep_task = None
+    if app.state.redis:
+        sweep_task = asyncio.create_task(expire_test_sessions(app.state.redis))
+    
     yield
     
     # Shutdown
+    partitions_task.cancel()
+    await event_log.stop()
+    if sweep_task:
+        sweep_task.cancel()
+    if flush_task:
+        flush_task.cancel()
+        try:
+            await progress_buffer.flush(engine)
+        except Exception as e:
+            print(f"Warning: Could not flush progress advances: {e}")
     if app.state.redis:
         await app.state.redis.close()
 
@@ -42,6 +114,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Rate limits run inside CORS (so 429s carry CORS headers) but before routing
+app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware
 # Handle ALLOWED_ORIGINS as list or string
 allowed_origins = settings.ALLOWED_ORIGINS
@@ -55,8 +130,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browser-readable: attempt deadline of timed tests, next page of admin listings
+    expose_headers=["X-Test-Deadline", "X-Next-Cursor"],
 )
 
+# Per-request query count and DB time in Server-Timing
+app.add_middleware(QueryStatsMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(courses.router, prefix="/api/v1/courses", tags=["courses"])
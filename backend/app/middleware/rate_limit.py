@@ -0,0 +1,236 @@
+import ipaddress
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+
+from jose import JWTError, jwt
+
+from app.config import settings
+
+# Token bucket in a Redis hash; refill, take one token and set the expiry
+# in a single atomic step. Returns {allowed, retry_after_ms}.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = math.ceil((1 - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1000)
+return {allowed, retry_after}
+"""
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Buckets kept per process while Redis is down (least recently used evicted)
+LOCAL_MAX_BUCKETS = 100000
+
+# How long to stay on local buckets after a Redis error
+REDIS_RETRY_SECONDS = 5.0
+
+
+@dataclass
+class RateLimitRule:
+    method: str
+    pattern: re.Pattern
+    name: str
+    capacity: int
+    period: int
+
+    @property
+    def rate_per_ms(self) -> float:
+        return self.capacity / (self.period * 1000)
+
+
+def parse_rule(spec: str) -> RateLimitRule:
+    """Parse "POST /api/v1/auth/login 5/minute"; path parameters as {name}"""
+    method, path, limit = spec.split()
+    count, period = limit.split("/")
+    regex = "^" + re.sub(r"\\\{[^/]+?\\\}", "[^/]+", re.escape(path)) + "$"
+    return RateLimitRule(
+        method=method.upper(),
+        pattern=re.compile(regex),
+        name=f"{method.upper()} {path}",
+        capacity=int(count),
+        period=PERIODS[period.rstrip("s")]
+    )
+
+
+def parse_rules(specs) -> List[RateLimitRule]:
+    if isinstance(specs, str):
+        specs = [spec for spec in specs.split(",")]
+    return [parse_rule(spec.strip()) for spec in specs if spec.strip()]
+
+
+def parse_networks(specs) -> List[Network]:
+    if isinstance(specs, str):
+        specs = specs.split(",")
+    return [ipaddress.ip_network(spec.strip(), strict=False) for spec in specs if spec.strip()]
+
+
+def _is_trusted(address: str, networks: List[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def client_address(scope, trusted: List[Network]) -> str:
+    """Client IP, looking through trusted reverse proxies.
+
+    Forwarding headers are only believed when the peer is a trusted proxy;
+    X-Forwarded-For is read from the right, skipping trusted hops, so a
+    client cannot pick its own address by sending the header itself.
+    """
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    if not trusted or not _is_trusted(address, trusted):
+        return address
+
+    forwarded_for, real_ip = None, None
+    for name, value in scope.get("headers", []):
+        if name == b"x-forwarded-for":
+            forwarded_for = value.decode("latin-1")
+        elif name == b"x-real-ip":
+            real_ip = value.decode("latin-1").strip()
+
+    if forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not _is_trusted(hop, trusted):
+                return hop
+        return hops[0] if hops else address
+    return real_ip or address
+
+
+class LocalTokenBuckets:
+    """Per-process buckets used while Redis is unavailable.
+
+    Kept in least-recently-used order and capped at max_buckets: a new key
+    evicts the bucket idle the longest (the one closest to full), so many
+    distinct clients cannot grow the dict or reset anyone else's limit.
+    """
+
+    def __init__(self, max_buckets: int = LOCAL_MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: str, rule: RateLimitRule, now_ms: float) -> Tuple[bool, int]:
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            bucket = (rule.capacity, now_ms)
+            while len(self._buckets) >= self.max_buckets:
+                self._buckets.popitem(last=False)
+        tokens, ts = bucket
+        tokens = min(rule.capacity, tokens + max(0.0, now_ms - ts) * rule.rate_per_ms)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now_ms)
+            return True, 0
+        self._buckets[key] = (tokens, now_ms)
+        return False, math.ceil((1 - tokens) / rule.rate_per_ms)
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying token buckets per route and per user or IP.
+
+    Runs before routing, so rejected requests never resolve dependencies or
+    take a DB session. There is a bucket per request path (path parameters
+    included) and per user id from a valid bearer token, otherwise per
+    client address (as forwarded by TRUSTED_PROXIES).
+    """
+
+    def __init__(self, app, rules: Optional[List[RateLimitRule]] = None):
+        self.app = app
+        self.rules = rules if rules is not None else parse_rules(settings.RATE_LIMITS)
+        self.trusted_proxies = parse_networks(settings.TRUSTED_PROXIES)
+        self.local = LocalTokenBuckets()
+        self._script = None
+        self._redis_down_until = 0.0
+
+    def _match(self, scope) -> Optional[RateLimitRule]:
+        method = scope["method"]
+        path = scope["path"]
+        for rule in self.rules:
+            if rule.method == method and rule.pattern.match(path):
+                return rule
+        return None
+
+    def _client_key(self, scope) -> str:
+        for name, value in scope.get("headers", []):
+            if name == b"authorization" and value[:7].lower() == b"bearer ":
+                try:
+                    payload = jwt.decode(
+                        value[7:].decode("latin-1"),
+                        settings.SECRET_KEY,
+                        algorithms=[settings.ALGORITHM]
+                    )
+                    if payload.get("sub"):
+                        return f"user:{payload['sub']}"
+                except JWTError:
+                    pass
+                break
+        return f"ip:{client_address(scope, self.trusted_proxies)}"
+
+    async def _take(self, key: str, rule: RateLimitRule) -> Tuple[bool, int]:
+        now_ms = time.time() * 1000
+        if time.monotonic() >= self._redis_down_until:
+            try:
+                if self._script is None:
+                    from app.dependencies import get_redis
+                    self._script = (await get_redis()).register_script(TOKEN_BUCKET_SCRIPT)
+                allowed, retry_after = await self._script(
+                    keys=[key], args=[rule.capacity, rule.rate_per_ms, now_ms]
+                )
+                return bool(allowed), int(retry_after)
+            except Exception as e:
+                print(f"Warning: Rate limiter using local buckets, Redis unavailable: {e}")
+                self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+        return self.local.take(key, rule, now_ms)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        rule = self._match(scope)
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Keyed by the concrete path: "3/hour" on /modules/{module_id}/test
+        # limits each module, not all modules together
+        allowed, retry_after_ms = await self._take(
+            f"rate_limit:{rule.method} {scope['path']}:{self._client_key(scope)}", rule
+        )
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps({"detail": "Too many requests"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(max(1, math.ceil(retry_after_ms / 1000))).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -2,8 +2,9 @@ from app.models.user import User
 from app.models.course import Course
 from app.models.module import Module
 from app.models.lesson import Lesson
-from app.models.progress import UserProgress, ProgressStatus
-from app.models.test import TestResult
+from app.models.progress import UserProgress, ProgressStatus, UserProgressSummary
+from app.models.test import TestResult, ArchivedTestResult
+from app.models.event import LearningEvent
 
 __all__ = [
     "User",
@@ -12,6 +13,9 @@ __all__ = [
     "Lesson",
     "UserProgress",
     "ProgressStatus",
+    "UserProgressSummary",
     "TestResult",
+    "ArchivedTestResult",
+    "LearningEvent",
 ]
 
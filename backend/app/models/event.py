@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from datetime import datetime
+
+from app.db.base import Base
+
+
+class LearningEvent(Base):
+    """Append-only student activity stream, written in batches by app.services.event_log"""
+    __tablename__ = "learning_events"
+    __table_args__ = (
+        Index("ix_learning_events_user_created", "user_id", "created_at"),
+        Index("ix_learning_events_module_created", "module_id", "created_at"),
+    )
+    
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    event_type = Column(String(32), nullable=False)
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    module_id = Column(String(50), nullable=False)
+    lesson_number = Column(Integer, nullable=True)
+    data = Column(JSONB, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
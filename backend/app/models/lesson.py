@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -7,6 +7,9 @@ from app.db.base import Base
 
 class Lesson(Base):
     __tablename__ = "lessons"
+    __table_args__ = (
+        Index("ix_lessons_module_order_id", "module_id", "order_index", "id"),
+    )
     
     id = Column(String(100), primary_key=True)
     module_id = Column(String(50), ForeignKey("modules.id", ondelete="CASCADE"), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import UUID
@@ -8,6 +8,10 @@ from app.db.base import Base
 
 class Module(Base):
     __tablename__ = "modules"
+    __table_args__ = (
+        Index("ix_modules_order_id", "order_index", "id"),
+        Index("ix_modules_course_order_id", "course_id", "order_index", "id"),
+    )
     
     id = Column(String(50), primary_key=True)
     course_id = Column(UUID(as_uuid=True), ForeignKey("courses.id", ondelete="CASCADE"), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, Enum, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -18,6 +18,9 @@ class ProgressStatus(str, enum.Enum):
 
 class UserProgress(Base):
     __tablename__ = "user_progress"
+    __table_args__ = (
+        Index("ix_user_progress_user_started", "user_id", "started_at"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -28,9 +31,26 @@ class UserProgress(Base):
     started_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
+    # Denormalized so attempt numbering and "last result" never load test_results
+    attempts_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_result_id = Column(UUID(as_uuid=True), nullable=True)
     
     # Relationships
     user = relationship("User", back_populates="progress")
     test_results = relationship("TestResult", back_populates="progress", cascade="all, delete-orphan")
 
 
+class UserProgressSummary(Base):
+    """Per-user dashboard counters, maintained in the same transaction as progress changes"""
+    __tablename__ = "user_progress_summary"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_modules = Column(Integer, nullable=False, default=0)
+    in_progress_modules = Column(Integer, nullable=False, default=0)
+    testing_modules = Column(Integer, nullable=False, default=0)
+    completed_modules = Column(Integer, nullable=False, default=0)
+    failed_modules = Column(Integer, nullable=False, default=0)
+    # Running sum/count of passing percentages, for the average grade
+    grade_sum = Column(Integer, nullable=False, default=0)
+    grade_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
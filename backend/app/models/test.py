@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, ForeignKey, JSON
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, BigInteger, Boolean, DateTime, ForeignKey, JSON, Index, LargeBinary
+from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -9,20 +9,61 @@ from app.db.base import Base
 
 class TestResult(Base):
     __tablename__ = "test_results"
+    __table_args__ = (
+        # Covers the "my results" listing without touching the heap
+        Index(
+            "ix_test_results_user_completed",
+            "user_id", "completed_at", "id",
+            postgresql_include=["module_id", "score", "max_score", "percentage", "passed", "attempt_number"]
+        ),
+        Index("ix_test_results_module_completed", "module_id", "completed_at"),
+        # Monthly range partitions, see app/db/partitions.py
+        {"postgresql_partition_by": "RANGE (completed_at)"},
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     progress_id = Column(UUID(as_uuid=True), ForeignKey("user_progress.id"))
+    # Denormalized owner so ownership checks and listings skip user_progress
+    user_id = Column(UUID(as_uuid=True), nullable=True)
     module_id = Column(String(50), nullable=False)
     score = Column(Integer, nullable=False)
     max_score = Column(Integer, nullable=False)
     percentage = Column(Integer, nullable=False)
     passed = Column(Boolean, nullable=False)
-    answers = Column(JSON, nullable=False)
-    detailed_results = Column(JSON, nullable=False)
+    # Legacy verbose form; new attempts use the compact columns below
+    answers = Column(JSON, nullable=True)
+    detailed_results = Column(JSON, nullable=True)
+    # Compact form: answers by question index and a correctness bitset,
+    # decoded against the question set snapshot with this version
+    question_set_version = Column(String(16), nullable=True)
+    correct_bits = Column(LargeBinary, nullable=True)
+    answers_compact = Column(JSONB, nullable=True)
+    # Randomized test form: seed of question/option order, and the number of
+    # questions drawn when the form samples from the question set
+    form_seed = Column(BigInteger, nullable=True)
+    form_size = Column(Integer, nullable=True)
+    # Positions of the drawn questions in the question bank version
+    # (question_set_version) when the test comes from a bank
+    bank_positions = Column(ARRAY(Integer), nullable=True)
     attempt_number = Column(Integer, default=1)
-    completed_at = Column(DateTime, default=datetime.utcnow)
+    # Partition key, so it is part of the primary key
+    completed_at = Column(DateTime, primary_key=True, default=datetime.utcnow, index=True)
     
     # Relationships
     progress = relationship("UserProgress", back_populates="test_results")
 
 
+
+
+class ArchivedTestResult(Base):
+    """Point-lookup index for test results moved to archive segments"""
+    __tablename__ = "test_result_archive"
+    
+    result_id = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), nullable=True)
+    module_id = Column(String(50), nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+    # Gzip member inside the segment that holds this result
+    segment = Column(String(100), nullable=False)
+    block_offset = Column(BigInteger, nullable=False)
+    block_length = Column(Integer, nullable=False)
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+from datetime import datetime
 from uuid import UUID
 
 
@@ -30,6 +31,8 @@ class TestResult(BaseModel):
 class TestResultResponse(BaseModel):
     status: str
     result_id: UUID
+    # Part of the result reference: GET /results/{result_id}?completed_at=...
+    completed_at: Optional[datetime] = None
     score: int
     max_score: int
     percentage: int
@@ -39,3 +42,36 @@ class TestResultResponse(BaseModel):
     next_module_unlocked: Optional[str] = None
 
 
+class TestResultRecord(BaseModel):
+    id: UUID
+    module_id: str
+    score: int
+    max_score: int
+    percentage: int
+    passed: bool
+    answers: Any
+    detailed_results: Any
+    attempt_number: int
+    completed_at: datetime
+
+
+class TestResultSummary(BaseModel):
+    id: UUID
+    module_id: str
+    score: int
+    max_score: int
+    percentage: int
+    passed: bool
+    attempt_number: int
+    completed_at: datetime
+
+
+class TestResultPage(BaseModel):
+    items: List[TestResultSummary]
+    next_cursor: Optional[str] = None
+
+
+class TestSessionState(BaseModel):
+    attempt_number: int
+    deadline: Optional[datetime] = None
+    answers: List[AnswerSubmission]
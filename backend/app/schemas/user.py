@@ -18,6 +18,11 @@ class UserLogin(BaseModel):
     password: str
 
 
+class UserAdminUpdate(BaseModel):
+    is_active: Optional[bool] = None
+    is_superuser: Optional[bool] = None
+
+
 class UserResponse(UserBase):
     id: UUID
     is_active: bool
@@ -31,5 +36,10 @@ class UserResponse(UserBase):
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
@@ -0,0 +1,159 @@
+import base64
+import gzip
+import json
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List
+from uuid import UUID
+
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.storage import StorageService
+from app.models.test import TestResult, ArchivedTestResult
+
+
+def _serialize(result: TestResult) -> Dict[str, Any]:
+    return {
+        "id": str(result.id),
+        "user_id": str(result.user_id) if result.user_id else None,
+        "progress_id": str(result.progress_id) if result.progress_id else None,
+        "module_id": result.module_id,
+        "score": result.score,
+        "max_score": result.max_score,
+        "percentage": result.percentage,
+        "passed": result.passed,
+        "answers": result.answers,
+        "detailed_results": result.detailed_results,
+        "question_set_version": result.question_set_version,
+        "correct_bits": base64.b64encode(result.correct_bits).decode("ascii") if result.correct_bits else None,
+        "answers_compact": result.answers_compact,
+        "form_seed": result.form_seed,
+        "form_size": result.form_size,
+        "bank_positions": result.bank_positions,
+        "attempt_number": result.attempt_number,
+        "completed_at": result.completed_at.isoformat() if result.completed_at else None,
+    }
+
+
+def _deserialize(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert archived JSON back to the column mapping used by the results API"""
+    return {
+        "id": UUID(record["id"]),
+        "module_id": record["module_id"],
+        "score": record["score"],
+        "max_score": record["max_score"],
+        "percentage": record["percentage"],
+        "passed": record["passed"],
+        "answers": record["answers"],
+        "detailed_results": record["detailed_results"],
+        "question_set_version": record["question_set_version"],
+        "correct_bits": base64.b64decode(record["correct_bits"]) if record["correct_bits"] else None,
+        "answers_compact": record["answers_compact"],
+        # Absent in segments written before randomized forms
+        "form_seed": record.get("form_seed"),
+        "form_size": record.get("form_size"),
+        "bank_positions": record.get("bank_positions"),
+        "attempt_number": record["attempt_number"],
+        "completed_at": datetime.fromisoformat(record["completed_at"]) if record["completed_at"] else None,
+    }
+
+
+class ResultArchiveService:
+    """Move old test results out of the hot table into append-only segments.
+
+    A segment is a series of gzip members, each holding ARCHIVE_BLOCK_SIZE
+    JSONL records. test_result_archive maps every result id to its member's
+    byte range, so a point lookup reads and inflates one small block.
+    """
+
+    def __init__(self, db: AsyncSession, storage_service: StorageService):
+        self.db = db
+        self.storage = storage_service
+
+    async def archive_older_than(self, days: Optional[int] = None) -> int:
+        """Archive results completed more than `days` ago; return number archived"""
+        cutoff = datetime.utcnow() - timedelta(days=days if days is not None else settings.ARCHIVE_AFTER_DAYS)
+        archived = 0
+
+        while True:
+            result = await self.db.execute(
+                select(TestResult)
+                .where(TestResult.completed_at < cutoff)
+                .order_by(TestResult.completed_at, TestResult.id)
+                .limit(settings.ARCHIVE_BATCH_SIZE)
+            )
+            rows = list(result.scalars().all())
+            if not rows:
+                break
+
+            await self._archive_batch(rows)
+            archived += len(rows)
+            self.db.expunge_all()
+
+        return archived
+
+    async def _archive_batch(self, rows: List[TestResult]) -> None:
+        segment = f"segment-{datetime.utcnow():%Y%m%dT%H%M%S%f}-{rows[0].id.hex[:8]}.jsonl.gz"
+        data = bytearray()
+        index_rows = []
+
+        for start in range(0, len(rows), settings.ARCHIVE_BLOCK_SIZE):
+            block = rows[start:start + settings.ARCHIVE_BLOCK_SIZE]
+            payload = "".join(
+                json.dumps(_serialize(row), ensure_ascii=False, separators=(",", ":")) + "\n"
+                for row in block
+            ).encode("utf-8")
+            member = gzip.compress(payload)
+            for row in block:
+                index_rows.append({
+                    "result_id": row.id,
+                    "user_id": row.user_id,
+                    "module_id": row.module_id,
+                    "completed_at": row.completed_at,
+                    "segment": segment,
+                    "block_offset": len(data),
+                    "block_length": len(member),
+                })
+            data.extend(member)
+
+        # Segment first: if the commit below fails the rows stay hot and the
+        # orphaned segment is simply never referenced
+        await self.storage.save_archive_segment(segment, bytes(data))
+
+        await self.db.execute(
+            pg_insert(ArchivedTestResult).on_conflict_do_nothing(),
+            index_rows
+        )
+        # Rows come ordered by completed_at; the range lets Postgres prune the
+        # test_results partitions instead of probing every month for the ids
+        await self.db.execute(
+            delete(TestResult)
+            .where(TestResult.completed_at >= rows[0].completed_at)
+            .where(TestResult.completed_at <= rows[-1].completed_at)
+            .where(TestResult.id.in_([row.id for row in rows]))
+        )
+        await self.db.commit()
+
+    async def get_result(self, result_id: UUID, user_id: UUID) -> Optional[Dict[str, Any]]:
+        """Look up an archived result owned by user"""
+        result = await self.db.execute(
+            select(ArchivedTestResult)
+            .where(ArchivedTestResult.result_id == result_id)
+            .where(ArchivedTestResult.user_id == user_id)
+        )
+        entry = result.scalar_one_or_none()
+        if not entry:
+            return None
+
+        block = await self.storage.read_archive_range(entry.segment, entry.block_offset, entry.block_length)
+        if block is None:
+            return None
+
+        wanted = str(result_id)
+        for line in gzip.decompress(block).splitlines():
+            record = json.loads(line)
+            if record["id"] == wanted:
+                return _deserialize(record)
+        return None
@@ -1,18 +1,95 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+from collections import OrderedDict
 import json
 from uuid import UUID
 
 from app.core.cache import CacheService
 from app.core.storage import StorageService
+from app.services.result_codec import question_set_version
+from app.services.test_service import GradingPlan, compile_grading_plan
+from app.services.test_forms import FormSpec, form_spec, build_form
+from app.services.question_bank import QuestionBankService
 from app.crud.module import get_module
+from app.crud.lesson import get_lesson_by_module_and_number
 from app.db.session import get_db
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+GRADING_PLAN_CACHE_SIZE = 256
+
+# Parsed student projections by module, reused while the cached JSON is unchanged
+_public_tests: "OrderedDict[str, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+PUBLIC_TEST_CACHE_SIZE = 256
+
+# Question fields that must never reach students before grading
+PRIVATE_QUESTION_FIELDS = ("correct_answer", "explanation")
+
+
+def public_test_projection(test_questions: Dict[str, Any]) -> Dict[str, Any]:
+    """Student-facing copy of questions.json: answer keys stripped, version attached"""
+    questions = test_questions.get("questions", [])
+    projection = {key: value for key, value in test_questions.items() if key != "questions"}
+    projection["question_set_version"] = test_questions.get("question_set_version") or question_set_version(questions)
+    projection["questions"] = [
+        {key: value for key, value in question.items() if key not in PRIVATE_QUESTION_FIELDS}
+        for question in questions
+    ]
+    return projection
+
+
 class ContentService:
+    # Compiled grading plans by question-set version, shared by the process;
+    # versions are immutable, so the LRU never serves a stale plan
+    _grading_plans: "OrderedDict[str, GradingPlan]" = OrderedDict()
+    
     def __init__(self, cache_service: CacheService, storage_service: StorageService):
         self.cache = cache_service
         self.storage = storage_service
+        self.banks = QuestionBankService(cache_service, storage_service)
+    
+    async def get_course_id(self, module_id: str, db: AsyncSession) -> Optional[UUID]:
+        """Resolve course_id for a module (cache first, DB on miss)"""
+        cache_key = f"module_course:{module_id}"
+        
+        cached = await self.cache.get(cache_key)
+        if cached:
+            return UUID(cached)
+        
+        module = await get_module(db, module_id)
+        if not module:
+            return None
+        
+        await self.cache.set(cache_key, str(module.course_id), expire=3600)
+        return module.course_id
+    
+    async def invalidate_module(self, module_id: str) -> None:
+        """Drop cached module -> course mapping"""
+        await self.cache.delete(f"module_course:{module_id}")
+    
+    async def get_lesson_meta(
+        self,
+        module_id: str,
+        lesson_number: int,
+        db: AsyncSession
+    ) -> Optional[Dict[str, Any]]:
+        """Get lesson id and active flag (cache first, DB on miss)"""
+        cache_key = f"lesson_meta:{module_id}:{lesson_number}"
+        
+        cached = await self.cache.get(cache_key)
+        if cached:
+            return json.loads(cached)
+        
+        lesson = await get_lesson_by_module_and_number(db, module_id, lesson_number)
+        if not lesson:
+            return None
+        
+        meta = {"id": lesson.id, "is_active": lesson.is_active}
+        await self.cache.set(cache_key, json.dumps(meta), expire=3600)
+        return meta
+    
+    async def invalidate_lesson_meta(self, module_id: str, lesson_number: int) -> None:
+        """Drop cached lesson metadata"""
+        await self.cache.delete(f"lesson_meta:{module_id}:{lesson_number}")
     
     async def get_lesson_for_user(
         self,
@@ -21,12 +98,10 @@ class ContentService:
         db: AsyncSession
     ) -> Optional[Dict[str, Any]]:
         """Get lesson content for user (with course_id resolution)"""
-        # Get module to get course_id
-        module = await get_module(db, module_id)
-        if not module:
+        course_id = await self.get_course_id(module_id, db)
+        if not course_id:
             return None
         
-        course_id = module.course_id
         cache_key = f"lesson:{course_id}:{module_id}:{lesson_id}"
         
         # Try cache first
@@ -54,13 +129,6 @@ class ContentService:
         db: AsyncSession
     ) -> Optional[Dict[str, Any]]:
         """Retrieve lesson content from cache or storage (backward compatibility)"""
-        # Get module to get course_id
-        module = await get_module(db, module_id)
-        if not module:
-            return None
-        
-        course_id = module.course_id
-        
         # Construct lesson_id from module_id and lesson_number
         lesson_id = f"{module_id}_Lesson_{lesson_number:02d}"
         
@@ -92,35 +160,239 @@ class ContentService:
         return await self.get_lesson_content(module_id, next_lesson_number, db)
     
     async def get_test_questions(self, module_id: str, db: AsyncSession) -> Optional[Dict[str, Any]]:
-        """Retrieve test questions from storage"""
-        # Get module to get course_id
-        module = await get_module(db, module_id)
-        if not module:
+        """Retrieve test questions from storage.
+
+        The question-set version is hashed once per load and cached in the
+        same entry under "question_set_version".
+        """
+        course_id = await self.get_course_id(module_id, db)
+        if not course_id:
             return None
         
-        course_id = module.course_id
         cache_key = f"test_questions:{course_id}:{module_id}"
         
         cached = await self.cache.get(cache_key)
         if cached:
-            return json.loads(cached)
+            questions = json.loads(cached)
+            if "question_set_version" in questions:
+                return questions
+        else:
+            questions = await self.storage.get_test_questions(course_id, module_id)
+            if not questions:
+                return questions
         
-        questions = await self.storage.get_test_questions(course_id, module_id)
+        # Loaded from storage (or cached before the version was kept alongside)
+        questions["question_set_version"] = question_set_version(questions.get("questions", []))
+        # Cache for 1 hour
+        await self.cache.set(cache_key, json.dumps(questions, default=str), expire=3600)
+        return questions
+    
+    async def get_public_test_json(self, module_id: str, db: AsyncSession) -> Optional[str]:
+        """Student projection of the test, serialized once per question-set version"""
+        course_id = await self.get_course_id(module_id, db)
+        if not course_id:
+            return None
         
-        if questions:
-            # Cache for 1 hour
-            await self.cache.set(cache_key, json.dumps(questions, default=str), expire=3600)
+        cache_key = f"test_public:{course_id}:{module_id}"
         
+        cached = await self.cache.get(cache_key)
+        if cached:
+            return cached
+        
+        test_questions = await self.get_test_questions(module_id, db)
+        if not test_questions:
+            return None
+        
+        payload = json.dumps(public_test_projection(test_questions), default=str, ensure_ascii=False)
+        # Dropped together with test_questions when the questions change
+        await self.cache.set(cache_key, payload, expire=3600)
+        return payload
+    
+    async def get_public_test_questions(self, module_id: str, db: AsyncSession) -> Optional[Dict[str, Any]]:
+        """Student projection of the test as a dict; shared, must not be modified"""
+        payload = await self.get_public_test_json(module_id, db)
+        if not payload:
+            return None
+        
+        cached = _public_tests.get(module_id)
+        if cached is not None and cached[0] == payload:
+            _public_tests.move_to_end(module_id)
+            return cached[1]
+        
+        public_test = json.loads(payload)
+        _public_tests[module_id] = (payload, public_test)
+        if len(_public_tests) > PUBLIC_TEST_CACHE_SIZE:
+            _public_tests.popitem(last=False)
+        return public_test
+    
+    async def get_form_spec(self, module_id: str, db: AsyncSession) -> FormSpec:
+        """Randomization options (shuffle_questions, shuffle_options, questions_per_attempt)"""
+        return form_spec(await self.get_test_settings(module_id, db))
+    
+    async def get_test_form(
+        self,
+        module_id: str,
+        spec: FormSpec,
+        seed: int,
+        db: AsyncSession,
+        bank_version: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Student form for one attempt, generated from the seed"""
+        if spec.draw:
+            drawn = await self.draw_bank_questions(module_id, spec, seed, db, bank_version)
+            if drawn is None:
+                return None
+            version, _, questions = drawn
+            public_test = public_test_projection({"module_id": module_id, "questions": questions})
+            public_test["question_set_version"] = version
+            # Drawn order is already random; only options are shuffled
+            spec = FormSpec(shuffle_options=spec.shuffle_options)
+        else:
+            public_test = await self.get_public_test_questions(module_id, db)
+            if public_test is None:
+                return None
+        return build_form(public_test, seed, spec)
+    
+    async def draw_bank_questions(
+        self,
+        module_id: str,
+        spec: FormSpec,
+        seed: int,
+        db: AsyncSession,
+        version: Optional[str] = None
+    ) -> Optional[Tuple[str, List[int], List[Dict[str, Any]]]]:
+        """Questions of one attempt drawn from the question bank: (version, positions, questions)
+
+        version pins the bank version the attempt started with; without it
+        the current version is used.
+        """
+        course_id = await self.get_course_id(module_id, db)
+        if not course_id:
+            return None
+        return await self.banks.draw(course_id, module_id, spec.draw, seed, version)
+    
+    async def get_bank_version(self, module_id: str, db: AsyncSession) -> Optional[str]:
+        """Current question bank version of a module"""
+        course_id = await self.get_course_id(module_id, db)
+        if not course_id:
+            return None
+        return await self.banks.current_version(course_id, module_id)
+    
+    async def get_bank_questions(
+        self,
+        module_id: str,
+        version: str,
+        positions: List[int],
+        db: AsyncSession
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Questions of a stored attempt by their positions in a bank version"""
+        course_id = await self.get_course_id(module_id, db)
+        if not course_id:
+            return None
+        return await self.banks.get_items(course_id, module_id, version, positions)
+    
+    async def invalidate_test_questions(self, module_id: str, db: AsyncSession) -> None:
+        """Drop cached test questions and their student projection after they are edited"""
+        course_id = await self.get_course_id(module_id, db)
+        if course_id:
+            await self.cache.delete(f"test_questions:{course_id}:{module_id}")
+            await self.cache.delete(f"test_public:{course_id}:{module_id}")
+    
+    async def snapshot_question_set(
+        self,
+        module_id: str,
+        questions: List[Dict[str, Any]],
+        db: AsyncSession,
+        version: Optional[str] = None
+    ) -> Optional[str]:
+        """Make sure the current question set is stored under its version; return version
+
+        Pass the version cached with the test questions to skip re-hashing.
+        """
+        course_id = await self.get_course_id(module_id, db)
+        if not course_id:
+            return None
+        
+        if version is None:
+            version = question_set_version(questions)
+        cache_key = f"question_set:{course_id}:{module_id}:{version}"
+        if await self.cache.exists(cache_key):
+            return version
+        
+        if await self.storage.get_question_set_version(course_id, module_id, version) is None:
+            await self.storage.save_question_set_version(course_id, module_id, version, questions)
+        
+        # Versions are immutable, so they can stay cached for a day
+        await self.cache.set(cache_key, json.dumps(questions, default=str), expire=86400)
+        return version
+    
+    def get_grading_plan(
+        self,
+        version: Optional[str],
+        questions: List[Dict[str, Any]]
+    ) -> GradingPlan:
+        """Get compiled grading plan for a question-set version"""
+        if version is None:
+            return compile_grading_plan(questions)
+        
+        plans = ContentService._grading_plans
+        plan = plans.get(version)
+        if plan is not None:
+            plans.move_to_end(version)
+            return plan
+        
+        plan = compile_grading_plan(questions)
+        plans[version] = plan
+        if len(plans) > GRADING_PLAN_CACHE_SIZE:
+            plans.popitem(last=False)
+        return plan
+    
+    async def get_grading_questions(
+        self,
+        module_id: str,
+        db: AsyncSession
+    ) -> Optional[Tuple[str, List[Dict[str, Any]], GradingPlan]]:
+        """Current questions for grading: (version, questions, plan).
+
+        The version comes from the test questions cache entry, so a submit
+        neither re-hashes the question set nor recompiles its plan.
+        """
+        test_questions = await self.get_test_questions(module_id, db)
+        if not test_questions:
+            return None
+        questions = test_questions.get("questions", [])
+        version = await self.snapshot_question_set(
+            module_id, questions, db, test_questions["question_set_version"]
+        )
+        return version, questions, self.get_grading_plan(version, questions)
+    
+    async def get_question_set(
+        self,
+        module_id: str,
+        version: str,
+        db: AsyncSession
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Retrieve question set snapshot by version (for decoding stored results)"""
+        course_id = await self.get_course_id(module_id, db)
+        if not course_id:
+            return None
+        
+        cache_key = f"question_set:{course_id}:{module_id}:{version}"
+        cached = await self.cache.get(cache_key)
+        if cached:
+            return json.loads(cached)
+        
+        questions = await self.storage.get_question_set_version(course_id, module_id, version)
+        if questions is not None:
+            await self.cache.set(cache_key, json.dumps(questions, default=str), expire=86400)
         return questions
     
     async def get_test_settings(self, module_id: str, db: AsyncSession) -> Optional[Dict[str, Any]]:
         """Retrieve test settings from storage"""
-        # Get module to get course_id
-        module = await get_module(db, module_id)
-        if not module:
+        course_id = await self.get_course_id(module_id, db)
+        if not course_id:
             return None
         
-        course_id = module.course_id
         cache_key = f"test_settings:{course_id}:{module_id}"
         
         cached = await self.cache.get(cache_key)
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.db.session import engine
+
+logger = logging.getLogger("app.events")
+
+LESSON_VIEWED = "lesson_viewed"
+LESSON_ADVANCED = "lesson_advanced"
+TEST_STARTED = "test_started"
+TEST_SUBMITTED = "test_submitted"
+
+EVENT_COLUMNS = ["event_type", "user_id", "module_id", "lesson_number", "data", "created_at"]
+
+EventRecord = Tuple[str, UUID, str, Optional[int], Optional[str], datetime]
+
+
+class EventLog:
+    """In-process buffer for learning events, flushed to learning_events in batches.
+
+    emit() only appends to a bounded deque, so request latency never includes
+    the write. A background task flushes every EVENT_FLUSH_MS, or as soon as
+    EVENT_FLUSH_SIZE events are waiting, using COPY. While the DB is slow or
+    unavailable the buffer grows up to EVENT_BUFFER_MAX; after that new events
+    are dropped and counted rather than blocking requests or exhausting memory.
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self._buffer: Deque[EventRecord] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.dropped = 0
+
+    def emit(
+        self,
+        event_type: str,
+        user_id: UUID,
+        module_id: str,
+        lesson_number: Optional[int] = None,
+        **data: Any
+    ) -> None:
+        """Queue an event; never blocks and never raises"""
+        if len(self._buffer) >= settings.EVENT_BUFFER_MAX:
+            if self.dropped == 0:
+                logger.warning("Event buffer full (%d), dropping new events", settings.EVENT_BUFFER_MAX)
+            self.dropped += 1
+            return
+
+        self._buffer.append((
+            event_type,
+            user_id,
+            module_id,
+            lesson_number,
+            json.dumps(data, default=str) if data else None,
+            datetime.utcnow()
+        ))
+        if len(self._buffer) >= settings.EVENT_FLUSH_SIZE:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._buffer:
+            if not await self.flush():
+                break
+
+    async def _run(self) -> None:
+        interval = settings.EVENT_FLUSH_MS / 1000
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            # Drain in EVENT_FLUSH_SIZE batches; on failure wait for the next tick
+            while self._buffer:
+                if not await self.flush():
+                    break
+
+    async def flush(self) -> bool:
+        """Write one batch; on failure the batch goes back to the buffer head"""
+        count = min(len(self._buffer), settings.EVENT_FLUSH_SIZE)
+        if count == 0:
+            return True
+        batch = [self._buffer.popleft() for _ in range(count)]
+
+        try:
+            async with self.engine.connect() as conn:
+                raw = await conn.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(
+                    "learning_events", records=batch, columns=EVENT_COLUMNS
+                )
+        except Exception as e:
+            logger.warning("Could not flush %d learning events: %s", count, e)
+            # Keep the oldest events, up to the buffer limit
+            room = settings.EVENT_BUFFER_MAX - len(self._buffer)
+            requeued = batch[:max(room, 0)]
+            self.dropped += count - len(requeued)
+            self._buffer.extendleft(reversed(requeued))
+            return False
+
+        if self.dropped:
+            logger.warning("Dropped %d learning events while the buffer was full", self.dropped)
+            self.dropped = 0
+        return True
+
+
+event_log = EventLog(engine)
@@ -0,0 +1,266 @@
+import math
+import uuid
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as redis
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.test import TestResult
+from app.services.result_codec import is_correct
+from app.services.test_forms import asked_questions
+
+# item_stats:{module_id}:{version} hash, question i of the version:
+#   n                 attempts
+#   {i}:n             attempts that were asked question i (forms may sample)
+#   {i}:c             correct answers
+#   {i}:sy, {i}:syy   sum and sum of squares of the rest score (total minus item)
+#   {i}:sxy           sum of the rest score over correct answers
+#   {i}:o:{k}         option k selected; {i}:o:other, {i}:o:skip
+# Integer sums are exact, so the statistics can be updated forever
+# without drift and merged across processes with HINCRBY.
+
+# Reporting flags
+EASY_P = 0.9
+HARD_P = 0.2
+LOW_DISCRIMINATION = 0.2
+MIN_ATTEMPTS = 30
+
+REBUILD_BATCH_SIZE = 5000
+
+
+def _stats_key(module_id: str, version: str) -> str:
+    return f"item_stats:{module_id}:{version}"
+
+
+def _option_index(question: Dict[str, Any]) -> Optional[Dict[Any, int]]:
+    options = question.get("options")
+    if not isinstance(options, list) or not options:
+        return None
+    index = {}
+    for position, option in enumerate(options):
+        try:
+            index.setdefault(option, position)
+        except TypeError:
+            return None
+        if isinstance(option, str):
+            index.setdefault(option.strip().lower(), position)
+    return index
+
+
+def _selected(answer: Any, options: Dict[Any, int]) -> List[str]:
+    """Option fields chosen by an answer"""
+    if answer is None or answer == [] or answer == "":
+        return ["skip"]
+    values = answer if isinstance(answer, list) else [answer]
+    selected = []
+    for value in values:
+        try:
+            position = options.get(value)
+        except TypeError:
+            position = None
+        if position is None and isinstance(value, str):
+            position = options.get(value.strip().lower())
+        selected.append("other" if position is None else str(position))
+    return selected
+
+
+def _is_key(option: Any, correct_answer: Any) -> bool:
+    if isinstance(correct_answer, list):
+        return option in correct_answer
+    if isinstance(correct_answer, str):
+        return str(option).strip().lower() == correct_answer.strip().lower()
+    return option == correct_answer
+
+
+class ItemStatsService:
+    """Running item analysis per module and question-set version.
+
+    Every submission adds its counts to a Redis hash, so the report is a
+    single HGETALL: p-value, point-biserial discrimination (against the
+    rest score, so an item is not correlated with itself) and how often
+    each option was picked.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+
+    @staticmethod
+    def _increments(
+        questions: List[Dict[str, Any]],
+        correct_bits: bytes,
+        answers: List[Any],
+        option_indexes: List[Optional[Dict[Any, int]]],
+        asked: Optional[List[int]] = None
+    ) -> Dict[str, int]:
+        positions = asked if asked is not None else range(len(questions))
+        flags = {i: is_correct(correct_bits, i) for i in positions}
+        points = [question.get("points", 1) for question in questions]
+        score = sum(points[i] for i, correct in flags.items() if correct)
+
+        increments = {"n": 1}
+        for i, correct in flags.items():
+            rest = score - points[i] if correct else score
+            increments[f"{i}:n"] = 1
+            increments[f"{i}:sy"] = rest
+            increments[f"{i}:syy"] = rest * rest
+            if correct:
+                increments[f"{i}:c"] = 1
+                increments[f"{i}:sxy"] = rest
+            options = option_indexes[i]
+            if options is not None:
+                answer = answers[i] if i < len(answers) else None
+                for field in _selected(answer, options):
+                    key = f"{i}:o:{field}"
+                    increments[key] = increments.get(key, 0) + 1
+        return increments
+
+    async def record(
+        self,
+        module_id: str,
+        version: str,
+        questions: List[Dict[str, Any]],
+        correct_bits: bytes,
+        answers: List[Any],
+        asked: Optional[List[int]] = None
+    ) -> None:
+        """Add one graded attempt (compact form) to the running statistics"""
+        option_indexes = [_option_index(question) for question in questions]
+        increments = self._increments(questions, correct_bits, answers, option_indexes, asked)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for field, amount in increments.items():
+                if amount:
+                    pipe.hincrby(_stats_key(module_id, version), field, amount)
+            await pipe.execute()
+
+    async def rebuild(
+        self,
+        db: AsyncSession,
+        module_id: str,
+        version: str,
+        questions: List[Dict[str, Any]]
+    ) -> int:
+        """Recompute statistics from stored results of this version (e.g. after Redis loss).
+
+        Counts are built in a temporary hash and swapped in with RENAME, so
+        readers never see a partial hash. Submissions recorded while the scan
+        runs go to the old hash and are dropped by the swap (or missed if
+        committed after the scan), so run it while submissions are paused.
+        """
+        option_indexes = [_option_index(question) for question in questions]
+        totals: Dict[str, int] = {}
+        count = 0
+        after = None
+        while True:
+            query = (
+                select(
+                    TestResult.completed_at, TestResult.id, TestResult.correct_bits,
+                    TestResult.answers_compact, TestResult.form_seed, TestResult.form_size
+                )
+                .where(
+                    TestResult.module_id == module_id,
+                    TestResult.question_set_version == version,
+                    TestResult.correct_bits.is_not(None)
+                )
+                .order_by(TestResult.completed_at, TestResult.id)
+                .limit(REBUILD_BATCH_SIZE)
+            )
+            if after is not None:
+                query = query.where(tuple_(TestResult.completed_at, TestResult.id) > after)
+            rows = (await db.execute(query)).all()
+            if not rows:
+                break
+            after = (rows[-1].completed_at, rows[-1].id)
+            for row in rows:
+                asked = None
+                if row.form_size is not None:
+                    asked = asked_questions(row.form_seed, len(questions), row.form_size)
+                increments = self._increments(
+                    questions, row.correct_bits, row.answers_compact or [], option_indexes, asked
+                )
+                for field, amount in increments.items():
+                    totals[field] = totals.get(field, 0) + amount
+            count += len(rows)
+
+        key = _stats_key(module_id, version)
+        if not totals:
+            await self.redis.delete(key)
+            return count
+        building = f"{key}:rebuild:{uuid.uuid4().hex}"
+        await self.redis.hset(building, mapping=totals)
+        await self.redis.rename(building, key)
+        return count
+
+    async def report(
+        self,
+        module_id: str,
+        version: str,
+        questions: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        raw = await self.redis.hgetall(_stats_key(module_id, version))
+        counters = {field: int(value) for field, value in raw.items()}
+
+        items = []
+        for i, question in enumerate(questions):
+            n = counters.get(f"{i}:n", 0)
+            correct = counters.get(f"{i}:c", 0)
+            p_value = correct / n if n else None
+
+            # Point-biserial: (M1 - M0) / s * sqrt(p * q) over the rest score
+            discrimination = None
+            wrong = n - correct
+            if correct and wrong:
+                sy = counters.get(f"{i}:sy", 0)
+                variance = counters.get(f"{i}:syy", 0) / n - (sy / n) ** 2
+                if variance > 0:
+                    sxy = counters.get(f"{i}:sxy", 0)
+                    mean_correct = sxy / correct
+                    mean_wrong = (sy - sxy) / wrong
+                    discrimination = round(
+                        (mean_correct - mean_wrong) / math.sqrt(variance) * math.sqrt(correct * wrong) / n, 3
+                    )
+
+            options = None
+            if isinstance(question.get("options"), list) and question["options"]:
+                options = [
+                    {
+                        "option": option,
+                        "count": counters.get(f"{i}:o:{k}", 0),
+                        "share": round(counters.get(f"{i}:o:{k}", 0) / n, 3) if n else None,
+                        "is_correct": _is_key(option, question.get("correct_answer"))
+                    }
+                    for k, option in enumerate(question["options"])
+                ]
+
+            flags = []
+            if n >= MIN_ATTEMPTS:
+                if p_value > EASY_P:
+                    flags.append("too_easy")
+                if p_value < HARD_P:
+                    flags.append("too_hard")
+                if discrimination is not None and discrimination < LOW_DISCRIMINATION:
+                    flags.append("low_discrimination")
+                # A wrong option picked more often than every correct one hints at a wrong key
+                if options:
+                    correct_counts = [o["count"] for o in options if o["is_correct"]]
+                    wrong_counts = [o["count"] for o in options if not o["is_correct"]]
+                    if correct_counts and wrong_counts and max(wrong_counts) > max(correct_counts):
+                        flags.append("distractor_beats_key")
+
+            items.append({
+                "question_id": question["id"],
+                "attempts": n,
+                "p_value": round(p_value, 3) if p_value is not None else None,
+                "point_biserial": discrimination,
+                "options": options,
+                "other_answers": counters.get(f"{i}:o:other", 0) if options is not None else None,
+                "skipped": counters.get(f"{i}:o:skip", 0) if options is not None else None,
+                "flags": flags
+            })
+
+        return {
+            "module_id": module_id,
+            "question_set_version": version,
+            "attempts": counters.get("n", 0),
+            "items": items
+        }
@@ -0,0 +1,126 @@
+import uuid
+from typing import Dict, Iterable, List
+from uuid import UUID
+
+import redis.asyncio as redis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.config import settings
+from app.models.progress import UserProgress
+
+# progress_id -> highest lesson reached but not yet written to user_progress
+PENDING_KEY = "progress_pending"
+# Batch taken by a flusher; survives a crash and is replayed by the next flush
+FLUSHING_KEY = "progress_flushing"
+LOCK_KEY = "progress_flush_lock"
+
+# Keep the highest lesson number, so retries and races never move progress back
+ADVANCE_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1]))
+local lesson = tonumber(ARGV[2])
+if current == nil or lesson > current then
+    redis.call('HSET', KEYS[1], ARGV[1], lesson)
+    return lesson
+end
+return current
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# GREATEST makes applying the same batch twice harmless
+APPLY_SQL = text(
+    "UPDATE user_progress AS p "
+    "SET current_lesson = GREATEST(p.current_lesson, v.lesson), updated_at = now() AT TIME ZONE 'utc' "
+    "FROM unnest(CAST(:ids AS uuid[]), CAST(:lessons AS integer[])) AS v(id, lesson) "
+    "WHERE p.id = v.id AND p.current_lesson < v.lesson"
+)
+
+
+class ProgressWriteBuffer:
+    """Write-behind buffer for lesson advances (PROGRESS_WRITE_BEHIND).
+
+    Advances are recorded atomically in a Redis hash and flushed to
+    user_progress in coalesced batches: however many times a student clicks
+    "next" between flushes, one row update is written. Status transitions are
+    not buffered; callers persist the pending lesson synchronously with them
+    via persist().
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+
+    async def record_advance(self, progress_id: UUID, lesson_number: int) -> int:
+        return int(await self.redis.eval(ADVANCE_SCRIPT, 1, PENDING_KEY, str(progress_id), lesson_number))
+
+    async def pending_lessons(self, progress_ids: Iterable[UUID]) -> Dict[str, int]:
+        """Unflushed lesson numbers by progress id (pending or mid-flush)"""
+        fields = [str(progress_id) for progress_id in progress_ids]
+        if not fields:
+            return {}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hmget(PENDING_KEY, fields)
+            pipe.hmget(FLUSHING_KEY, fields)
+            pending, flushing = await pipe.execute()
+
+        lessons = {}
+        for field, *values in zip(fields, pending, flushing):
+            values = [int(value) for value in values if value is not None]
+            if values:
+                lessons[field] = max(values)
+        return lessons
+
+    async def apply_pending(self, progresses: List[UserProgress]) -> None:
+        """Overlay unflushed lessons on loaded rows without marking them dirty"""
+        lessons = await self.pending_lessons(progress.id for progress in progresses)
+        for progress in progresses:
+            lesson = lessons.get(str(progress.id))
+            if lesson is not None and lesson > (progress.current_lesson or 0):
+                set_committed_value(progress, "current_lesson", lesson)
+
+    async def persist(self, db: AsyncSession, progress_id: UUID) -> None:
+        """Write the pending lesson for one row into db's transaction (no commit)"""
+        lesson = (await self.pending_lessons([progress_id])).get(str(progress_id))
+        if lesson is not None:
+            await db.execute(APPLY_SQL, {"ids": [progress_id], "lessons": [lesson]})
+
+    async def flush(self, engine: AsyncEngine) -> int:
+        """Write buffered advances to user_progress; return rows applied.
+
+        The pending hash is renamed to FLUSHING_KEY before writing and deleted
+        only after commit, so a crash mid-flush leaves the batch in Redis and
+        the next flush (on startup or on schedule) replays it.
+        """
+        token = uuid.uuid4().hex
+        if not await self.redis.set(LOCK_KEY, token, nx=True, px=60000):
+            return 0
+
+        applied = 0
+        try:
+            # Leftover batch from a crashed flush first, then the current one
+            for _ in range(2):
+                if not await self.redis.exists(FLUSHING_KEY):
+                    if not await self.redis.exists(PENDING_KEY):
+                        break
+                    await self.redis.renamenx(PENDING_KEY, FLUSHING_KEY)
+
+                batch = await self.redis.hgetall(FLUSHING_KEY)
+                items = list(batch.items())
+                async with engine.begin() as conn:
+                    for start in range(0, len(items), settings.PROGRESS_FLUSH_BATCH):
+                        chunk = items[start:start + settings.PROGRESS_FLUSH_BATCH]
+                        await conn.execute(APPLY_SQL, {
+                            "ids": [UUID(progress_id) for progress_id, _ in chunk],
+                            "lessons": [int(lesson) for _, lesson in chunk]
+                        })
+                await self.redis.delete(FLUSHING_KEY)
+                applied += len(items)
+        finally:
+            await self.redis.eval(RELEASE_SCRIPT, 1, LOCK_KEY, token)
+        return applied
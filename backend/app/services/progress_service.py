@@ -1,26 +1,115 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from typing import Optional, Dict, Any, List
 from uuid import UUID
+import json
 
+from app.config import settings
+from app.core.cache import CacheService
 from app.models.progress import UserProgress, ProgressStatus
 from app.crud.progress import (
     get_user_progress as crud_get_user_progress,
     create_user_progress as crud_create_user_progress,
     update_current_lesson as crud_update_current_lesson,
-    update_status as crud_update_status
+    update_status as crud_update_status,
+    get_progress_summary as crud_get_progress_summary
 )
+from app.services.progress_buffer import ProgressWriteBuffer
 
 
 class ProgressService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, cache_service: Optional[CacheService] = None):
         self.db = db
+        self.cache = cache_service
+        # Lesson advances go through Redis first when write-behind is enabled
+        self.buffer = (
+            ProgressWriteBuffer(cache_service.redis)
+            if settings.PROGRESS_WRITE_BEHIND and cache_service else None
+        )
+    
+    @staticmethod
+    def summary_cache_key(user_id: UUID) -> str:
+        return f"progress_summary:{user_id}"
+    
+    async def get_summary(self, user_id: UUID) -> Dict[str, Any]:
+        """Get dashboard counters (cache first, one PK read on miss).
+
+        The miss is read from the primary: a lagging replica read cached for
+        the full TTL would undo the invalidation done after a write.
+        """
+        cache_key = self.summary_cache_key(user_id)
+        if self.cache:
+            cached = await self.cache.get(cache_key)
+            if cached:
+                return json.loads(cached)
+        
+        summary = await crud_get_progress_summary(self.db, user_id)
+        data = {
+            "total_modules": summary.total_modules if summary else 0,
+            "completed_modules": summary.completed_modules if summary else 0,
+            "in_progress_modules": (summary.in_progress_modules + summary.testing_modules) if summary else 0,
+            "grade_sum": summary.grade_sum if summary else 0,
+            "grade_count": summary.grade_count if summary else 0
+        }
+        
+        if self.cache:
+            await self.cache.set(cache_key, json.dumps(data), expire=300)
+        return data
+    
+    async def invalidate_summary(self, user_id: UUID) -> None:
+        """Drop cached summary; call after committing a progress change"""
+        if self.cache:
+            try:
+                await self.cache.delete(self.summary_cache_key(user_id))
+            except Exception:
+                pass
+    
+    @staticmethod
+    def lesson_state_cache_key(user_id: UUID, module_id: str) -> str:
+        return f"progress_lessons:{user_id}:{module_id}"
+    
+    async def get_lesson_state(self, user_id: UUID, module_id: str) -> Optional[Dict[str, int]]:
+        """Get total_lessons and current_lesson for lesson reads (cache first).
+
+        Dropped wherever progress is written, so a warm lesson read opens no
+        database session.
+        """
+        cache_key = self.lesson_state_cache_key(user_id, module_id)
+        if self.cache:
+            cached = await self.cache.get(cache_key)
+            if cached:
+                return json.loads(cached)
+        
+        progress = await self.get_user_progress(user_id, module_id)
+        if not progress:
+            return None
+        data = {"total_lessons": progress.total_lessons, "current_lesson": progress.current_lesson}
+        
+        if self.cache:
+            await self.cache.set(cache_key, json.dumps(data), expire=300)
+        return data
+    
+    async def invalidate_lesson_state(self, user_id: UUID, module_id: str) -> None:
+        """Drop cached lesson state; call after committing a progress change"""
+        if self.cache:
+            await self.cache.delete(self.lesson_state_cache_key(user_id, module_id))
     
     async def get_user_progress(
         self,
         user_id: UUID,
         module_id: str
     ) -> Optional[UserProgress]:
-        return await crud_get_user_progress(self.db, user_id, module_id)
+        progress = await crud_get_user_progress(self.db, user_id, module_id)
+        if progress:
+            await self.apply_pending([progress])
+        return progress
+    
+    async def apply_pending(self, progresses: List[UserProgress]) -> None:
+        """Reflect lesson advances not yet flushed from Redis"""
+        if self.buffer and progresses:
+            try:
+                await self.buffer.apply_pending(progresses)
+            except Exception:
+                pass
     
     async def create_user_progress(
         self,
@@ -28,24 +117,45 @@ class ProgressService:
         module_id: str,
         total_lessons: int
     ) -> UserProgress:
-        return await crud_create_user_progress(
+        progress = await crud_create_user_progress(
             self.db, user_id, module_id, total_lessons
         )
+        await self.invalidate_summary(user_id)
+        await self.invalidate_lesson_state(user_id, module_id)
+        return progress
     
     async def update_current_lesson(
         self,
-        progress_id: UUID,
+        progress: UserProgress,
         lesson_number: int
-    ) -> UserProgress:
-        return await crud_update_current_lesson(
-            self.db, progress_id, lesson_number
+    ) -> Optional[UserProgress]:
+        if self.buffer:
+            try:
+                await self.buffer.record_advance(progress.id, lesson_number)
+                await self.invalidate_lesson_state(progress.user_id, progress.module_id)
+                return None
+            except Exception as e:
+                print(f"Warning: Write-behind unavailable, writing progress directly: {e}")
+        updated = await crud_update_current_lesson(
+            self.db, progress.id, lesson_number
         )
+        await self.invalidate_lesson_state(progress.user_id, progress.module_id)
+        return updated
     
     async def update_status(
         self,
         progress_id: UUID,
         status: ProgressStatus
     ) -> UserProgress:
-        return await crud_update_status(self.db, progress_id, status)
+        if self.buffer:
+            # Status changes commit synchronously, together with the buffered lesson
+            try:
+                await self.buffer.persist(self.db, progress_id)
+            except Exception as e:
+                print(f"Warning: Could not read buffered progress: {e}")
+        progress = await crud_update_status(self.db, progress_id, status)
+        await self.invalidate_summary(progress.user_id)
+        await self.invalidate_lesson_state(progress.user_id, progress.module_id)
+        return progress
 
 
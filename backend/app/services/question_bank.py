@@ -0,0 +1,288 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.core.cache import CacheService
+from app.core.storage import StorageService
+from app.services.test_forms import FEISTEL_ROUNDS, DrawRule, SeededPermutation
+
+# A bank version is a JSONL file, one question per line, plus an index:
+#   {"version", "count", "offsets": [...], "lengths": [...],
+#    "buckets": {"tag:loops": [...], "difficulty:2": [...], "tag:loops|difficulty:2": [...]}}
+# Buckets hold item positions, so drawing k questions by tag and difficulty
+# touches k index entries and k byte ranges of the file, never the whole bank.
+
+# Parsed indexes by bank version (versions are content hashes, never change)
+_bank_indexes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+BANK_INDEX_CACHE_SIZE = 32
+
+# Cold items closer than this are read as one span; spans stay under the cap
+BANK_MERGE_GAP_BYTES = 1 << 16
+BANK_MAX_SPAN_BYTES = 1 << 20
+
+MAX_IMPORT_ERRORS = 1000
+
+
+def bucket_key(tag: Optional[str], difficulty: Optional[int]) -> Optional[str]:
+    parts = []
+    if tag:
+        parts.append(f"tag:{tag}")
+    if difficulty is not None:
+        parts.append(f"difficulty:{difficulty}")
+    return "|".join(parts) or None
+
+
+def validate_bank_item(item: Any, seen_ids: set) -> Optional[str]:
+    """Return an error message or None"""
+    if not isinstance(item, dict):
+        return "Expected a JSON object"
+    question_id = item.get("id")
+    if not isinstance(question_id, str) or not question_id:
+        return "Missing question id"
+    if question_id in seen_ids:
+        return f"Duplicate question id {question_id}"
+    difficulty = item.get("difficulty")
+    if difficulty is not None and (not isinstance(difficulty, int) or isinstance(difficulty, bool)):
+        return "difficulty must be an integer"
+    tags = item.get("tags", [])
+    if not isinstance(tags, list) or not all(isinstance(tag, str) and tag for tag in tags):
+        return "tags must be a list of strings"
+    return None
+
+
+def draw_positions(index: Dict[str, Any], rules: Tuple[DrawRule, ...], seed: int) -> List[int]:
+    """Positions of the questions a seed draws for (tag, difficulty, count) rules.
+
+    Each rule walks a seeded permutation of its bucket, skipping questions an
+    earlier rule already took; cost is proportional to the questions drawn.
+    """
+    chosen = []
+    seen = set()
+    for rule_number, (tag, difficulty, count) in enumerate(rules):
+        key = bucket_key(tag, difficulty)
+        bucket = index["buckets"].get(key, []) if key else None
+        size = len(bucket) if bucket is not None else index["count"]
+        # Keys disjoint from the form permutation of the same seed
+        permutation = SeededPermutation(size, seed + (rule_number + 1) * FEISTEL_ROUNDS)
+        taken = 0
+        position = 0
+        while taken < count and position < size:
+            item = permutation[position]
+            position += 1
+            if bucket is not None:
+                item = bucket[item]
+            if item in seen:
+                continue
+            seen.add(item)
+            chosen.append(item)
+            taken += 1
+    return chosen
+
+
+def merge_item_ranges(
+    offsets: List[int],
+    lengths: List[int],
+    positions: List[int]
+) -> List[Tuple[int, int, List[int]]]:
+    """Group sorted item positions into (start, end, positions) byte spans.
+
+    Neighbours closer than BANK_MERGE_GAP_BYTES share one range read, so k
+    cold items cost at most k reads and usually far fewer.
+    """
+    spans: List[Tuple[int, int, List[int]]] = []
+    for position in positions:
+        start = offsets[position]
+        end = start + lengths[position]
+        if spans:
+            span_start, span_end, members = spans[-1]
+            if start - span_end <= BANK_MERGE_GAP_BYTES and end - span_start <= BANK_MAX_SPAN_BYTES:
+                members.append(position)
+                spans[-1] = (span_start, max(span_end, end), members)
+                continue
+        spans.append((start, end, [position]))
+    return spans
+
+
+class QuestionBankService:
+    """Large question banks stored as JSONL with an offset index"""
+
+    def __init__(self, cache_service: CacheService, storage_service: StorageService):
+        self.cache = cache_service
+        self.storage = storage_service
+
+    async def current_version(self, course_id: UUID, module_id: str) -> Optional[str]:
+        cache_key = f"question_bank:{course_id}:{module_id}"
+        cached = await self.cache.get(cache_key)
+        if cached:
+            return cached
+
+        version = await self.storage.get_question_bank_version(course_id, module_id)
+        if version:
+            await self.cache.set(cache_key, version, expire=3600)
+        return version
+
+    async def get_index(self, course_id: UUID, module_id: str, version: str) -> Optional[Dict[str, Any]]:
+        index = _bank_indexes.get(version)
+        if index is not None:
+            _bank_indexes.move_to_end(version)
+            return index
+
+        index = await self.storage.get_question_bank_index(course_id, module_id, version)
+        if index is None:
+            return None
+        _bank_indexes[version] = index
+        if len(_bank_indexes) > BANK_INDEX_CACHE_SIZE:
+            _bank_indexes.popitem(last=False)
+        return index
+
+    async def get_items(
+        self,
+        course_id: UUID,
+        module_id: str,
+        version: str,
+        positions: List[int]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Questions at the given positions (Redis first, byte ranges of the bank on miss)"""
+        keys = [f"bank_item:{version}:{position}" for position in positions]
+        try:
+            cached = await self.cache.redis.mget(keys) if keys else []
+        except Exception:
+            cached = [None] * len(keys)
+
+        missing = sorted({position for position, value in zip(positions, cached) if not value})
+        lines: Dict[int, str] = {}
+        if missing:
+            index = await self.get_index(course_id, module_id, version)
+            if index is None:
+                return None
+            spans = merge_item_ranges(index["offsets"], index["lengths"], missing)
+            chunks = await self.storage.read_question_bank_ranges(
+                course_id, module_id, version, [(start, end - start) for start, end, _ in spans]
+            )
+            if chunks is None:
+                return None
+            for (start, _, members), chunk in zip(spans, chunks):
+                for position in members:
+                    offset = index["offsets"][position] - start
+                    lines[position] = chunk[offset:offset + index["lengths"][position]].decode("utf-8")
+            try:
+                # Items of a version never change
+                async with self.cache.redis.pipeline(transaction=False) as pipe:
+                    for position, line in lines.items():
+                        pipe.setex(f"bank_item:{version}:{position}", 86400, line)
+                    await pipe.execute()
+            except Exception:
+                pass
+
+        return [
+            json.loads(value if value else lines[position])
+            for position, value in zip(positions, cached)
+        ]
+
+    async def draw(
+        self,
+        course_id: UUID,
+        module_id: str,
+        rules: Tuple[DrawRule, ...],
+        seed: int,
+        version: Optional[str] = None
+    ) -> Optional[Tuple[str, List[int], List[Dict[str, Any]]]]:
+        """Draw a test from a bank version (current by default): (version, positions, questions)
+
+        None when the bank is missing or the rules match no questions.
+        """
+        version = version or await self.current_version(course_id, module_id)
+        if not version:
+            return None
+        index = await self.get_index(course_id, module_id, version)
+        if index is None:
+            return None
+        positions = draw_positions(index, rules, seed)
+        if not positions:
+            return None
+        questions = await self.get_items(course_id, module_id, version, positions)
+        if questions is None:
+            return None
+        return version, positions, questions
+
+    async def import_bank(
+        self,
+        course_id: UUID,
+        module_id: str,
+        lines: AsyncIterator[str]
+    ) -> Dict[str, Any]:
+        """Stream JSONL questions into a new bank version and make it current.
+
+        Lines are validated and written to a temporary file one at a time,
+        building the offset index on the way; nothing holds the whole bank.
+        """
+        report = {"version": None, "total": 0, "imported": 0, "failed": 0, "errors": []}
+        offsets, lengths = [], []
+        buckets: Dict[str, List[int]] = {}
+        seen_ids = set()
+        digest = hashlib.sha256()
+        offset = 0
+
+        handle, data_path = tempfile.mkstemp(suffix=".jsonl")
+        try:
+            with os.fdopen(handle, "wb") as data_file:
+                row = 0
+                async for line in lines:
+                    if not line.strip():
+                        continue
+                    row += 1
+                    report["total"] += 1
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        item, error = None, "Invalid JSON"
+                    else:
+                        error = validate_bank_item(item, seen_ids)
+                    if error:
+                        report["failed"] += 1
+                        if len(report["errors"]) < MAX_IMPORT_ERRORS:
+                            report["errors"].append({"row": row, "error": error})
+                        continue
+
+                    position = len(offsets)
+                    seen_ids.add(item["id"])
+                    encoded = (json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+                    data_file.write(encoded)
+                    digest.update(encoded)
+                    offsets.append(offset)
+                    lengths.append(len(encoded))
+                    offset += len(encoded)
+
+                    difficulty = item.get("difficulty")
+                    tags = set(item.get("tags", []))
+                    keys = {bucket_key(tag, None) for tag in tags}
+                    keys.update(bucket_key(tag, difficulty) for tag in tags)
+                    keys.add(bucket_key(None, difficulty))
+                    keys.discard(None)
+                    for key in keys:
+                        buckets.setdefault(key, []).append(position)
+
+            report["imported"] = len(offsets)
+            if not offsets:
+                return report
+
+            version = digest.hexdigest()[:16]
+            index = {
+                "version": version,
+                "count": len(offsets),
+                "offsets": offsets,
+                "lengths": lengths,
+                "buckets": buckets,
+            }
+            if not await self.storage.save_question_bank(course_id, module_id, version, data_path, index):
+                report["errors"].append({"row": None, "error": "Could not save the question bank"})
+                return report
+            await self.cache.delete(f"question_bank:{course_id}:{module_id}")
+            report["version"] = version
+            return report
+        finally:
+            os.unlink(data_path)
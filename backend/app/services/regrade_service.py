@@ -0,0 +1,378 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.test import TestResult
+from app.services.content_service import ContentService
+from app.services.test_service import CHOICES, TEXT, PlanItem, compile_grading_plan, _matches
+from app.services.test_forms import asked_questions
+
+# Bitmask value that never equals a correct mask: bit 63 is never an option
+INVALID_MASK = np.uint64(1 << 63)
+MAX_MASK_OPTIONS = 63
+
+# Below this many answer cells the pool costs more than it saves
+POOL_MIN_CELLS = 50000
+
+UPDATE_SQL = text(
+    "UPDATE test_results AS t "
+    "SET score = v.score, max_score = v.max_score, percentage = v.percentage, passed = v.passed, "
+    "question_set_version = :version, correct_bits = v.bits, "
+    "answers_compact = CAST(v.answers AS jsonb), answers = NULL, detailed_results = NULL "
+    "FROM unnest("
+    "CAST(:ids AS uuid[]), CAST(:completed AS timestamp[]), CAST(:scores AS integer[]), "
+    "CAST(:max_scores AS integer[]), CAST(:percentages AS integer[]), CAST(:passed AS boolean[]), "
+    "CAST(:bits AS bytea[]), CAST(:answers AS text[])"
+    ") AS v(id, completed_at, score, max_score, percentage, passed, bits, answers) "
+    "WHERE t.id = v.id AND t.completed_at = v.completed_at"
+)
+
+# Average-grade counters follow the rewritten passing percentages
+SUMMARY_DELTA_SQL = text(
+    "UPDATE user_progress_summary AS s "
+    "SET grade_sum = s.grade_sum + v.grade_sum, grade_count = s.grade_count + v.grade_count, "
+    "updated_at = now() AT TIME ZONE 'utc' "
+    "FROM unnest(CAST(:users AS uuid[]), CAST(:sums AS integer[]), CAST(:counts AS integer[])) "
+    "AS v(user_id, grade_sum, grade_count) "
+    "WHERE s.user_id = v.user_id"
+)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _regrade_pool() -> Tuple[ProcessPoolExecutor, int]:
+    global _pool
+    workers = settings.REGRADE_WORKERS or os.cpu_count() or 1
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers)
+    return _pool, workers
+
+
+def grade_columns(items: List[PlanItem], rows: List[List[Any]]) -> List[List[bool]]:
+    """Grade free-form columns row by row (runs in a worker process)"""
+    return [[_matches(item, answer) for item, answer in zip(items, row)] for row in rows]
+
+
+class RegradeEngine:
+    """Grade many attempts of one question set at once.
+
+    Single-choice answers are encoded as option indices and multiple-choice
+    answers as option bitmasks, so correctness for a whole batch is a couple
+    of array comparisons and the score is a matrix-vector product. Text and
+    other free-form questions are graded with the regular plan, in a process
+    pool for large batches. Results are identical to TestGradingService.
+    """
+
+    def __init__(self, questions: List[Dict[str, Any]], passing_threshold: float = 0.7):
+        self.plan = compile_grading_plan(questions)
+        self.passing_threshold = passing_threshold
+        self.points = np.array([item.points for item in self.plan.items], dtype=np.int64)
+
+        # (column, option -> index, correct index)
+        self.single: List[Tuple[int, Dict[str, int], int]] = []
+        # (column, option -> bit, correct mask)
+        self.multi: List[Tuple[int, Dict[Any, int], int]] = []
+        self.other: List[int] = []
+
+        for column, (item, question) in enumerate(zip(self.plan.items, questions)):
+            options = question.get("options")
+            if item.kind == TEXT and isinstance(options, list):
+                index = {}
+                for position, option in enumerate(options):
+                    index.setdefault(str(option).strip().lower(), position)
+                if item.expected in index:
+                    self.single.append((column, index, index[item.expected]))
+                    continue
+            if item.kind == CHOICES and isinstance(options, list) and len(options) <= MAX_MASK_OPTIONS:
+                try:
+                    bits = {option: 1 << position for position, option in enumerate(options)}
+                except TypeError:
+                    bits = None
+                if bits is not None and all(option in bits for option in item.expected):
+                    self.multi.append((column, bits, sum(bits[option] for option in item.expected)))
+                    continue
+            self.other.append(column)
+
+    @staticmethod
+    def _mask(answer: Any, bits: Dict[Any, int]) -> int:
+        if not isinstance(answer, list):
+            return int(INVALID_MASK)
+        mask = 0
+        for option in answer:
+            try:
+                bit = bits.get(option)
+            except TypeError:
+                return int(INVALID_MASK)
+            # Unknown options and duplicates can never match the correct list
+            if bit is None or mask & bit:
+                return int(INVALID_MASK)
+            mask |= bit
+        return mask
+
+    async def grade(
+        self,
+        rows: List[List[Any]],
+        asked: Optional[List[Optional[List[int]]]] = None
+    ) -> Dict[str, np.ndarray]:
+        """Grade rows of positional answers; return correctness matrix and scores.
+
+        asked gives, per row, the questions of a sampled test form (None: all).
+        """
+        n = len(rows)
+        correct = np.zeros((n, len(self.plan.items)), dtype=bool)
+
+        if self.single:
+            columns = [column for column, _, _ in self.single]
+            encoded = np.array([
+                [
+                    index.get(str(row[column]).strip().lower(), -1)
+                    for column, index, _ in self.single
+                ]
+                for row in rows
+            ], dtype=np.int32).reshape(n, len(self.single))
+            expected = np.array([answer for _, _, answer in self.single], dtype=np.int32)
+            correct[:, columns] = encoded == expected
+
+        if self.multi:
+            columns = [column for column, _, _ in self.multi]
+            encoded = np.array([
+                [self._mask(row[column], bits) for column, bits, _ in self.multi]
+                for row in rows
+            ], dtype=np.uint64).reshape(n, len(self.multi))
+            expected = np.array([mask for _, _, mask in self.multi], dtype=np.uint64)
+            correct[:, columns] = encoded == expected
+
+        if self.other:
+            items = [self.plan.items[column] for column in self.other]
+            values = [[row[column] for column in self.other] for row in rows]
+            if n * len(self.other) < POOL_MIN_CELLS:
+                graded = grade_columns(items, values)
+            else:
+                pool, workers = _regrade_pool()
+                size = -(-n // workers)
+                loop = asyncio.get_running_loop()
+                chunks = await asyncio.gather(*[
+                    loop.run_in_executor(pool, grade_columns, items, values[start:start + size])
+                    for start in range(0, n, size)
+                ])
+                graded = [row for chunk in chunks for row in chunk]
+            correct[:, self.other] = np.array(graded, dtype=bool).reshape(n, len(self.other))
+
+        if asked is not None and any(indices is not None for indices in asked):
+            mask = np.ones_like(correct)
+            for position, indices in enumerate(asked):
+                if indices is not None:
+                    mask[position] = False
+                    mask[position, indices] = True
+            correct &= mask
+            max_score = mask.astype(np.int64) @ self.points
+        else:
+            max_score = np.full(n, int(self.points.sum()), dtype=np.int64)
+
+        score = correct.astype(np.int64) @ self.points
+        has_points = max_score > 0
+        ratio = np.divide(score, max_score, out=np.zeros(n), where=has_points)
+        percentage = (ratio * 100).astype(np.int64)
+        passed = (ratio >= self.passing_threshold) & has_points
+
+        return {
+            "correct": correct,
+            # Same layout as result_codec.encode_result: bit i -> byte i // 8, bit i % 8
+            "bits": np.packbits(correct, axis=1, bitorder="little"),
+            "score": score,
+            "max_score": max_score,
+            "percentage": percentage,
+            "passed": passed,
+        }
+
+
+class RegradeService:
+    """Re-grade every stored attempt of a module against its current questions.
+
+    Writes keep user_progress_summary.grade_sum/grade_count in step with the
+    new passing percentages; user_progress.status is left as it was.
+    """
+
+    def __init__(self, db: AsyncSession, content_service: ContentService):
+        self.db = db
+        self.content = content_service
+        self._remaps: Dict[str, Optional[Tuple[List[int], int]]] = {}
+        # Owners of rewritten results (their cached summaries are stale)
+        self.changed_users: Set[UUID] = set()
+
+    async def _remap(
+        self,
+        module_id: str,
+        version: str,
+        question_ids: List[str]
+    ) -> Optional[Tuple[List[int], int]]:
+        """Position of each current question in an older question-set version, and its size"""
+        if version not in self._remaps:
+            old_questions = await self.content.get_question_set(module_id, version, self.db)
+            if old_questions is None:
+                self._remaps[version] = None
+            else:
+                old_index = {question["id"]: position for position, question in enumerate(old_questions)}
+                remap = [old_index.get(question_id, -1) for question_id in question_ids]
+                self._remaps[version] = (remap, len(old_questions))
+        return self._remaps[version]
+
+    @staticmethod
+    def _summary_deltas(
+        batch: List[Any],
+        changed: List[int],
+        graded: Dict[str, np.ndarray]
+    ) -> Dict[UUID, Tuple[int, int]]:
+        """(grade_sum, grade_count) change per user: passing percentages in, failing out"""
+        deltas: Dict[UUID, Tuple[int, int]] = {}
+        for p in changed:
+            row = batch[p]
+            if not row.user_id:
+                continue
+            passed = bool(graded["passed"][p])
+            grade_sum = (int(graded["percentage"][p]) if passed else 0) - (row.percentage if row.passed else 0)
+            grade_count = int(passed) - int(bool(row.passed))
+            if grade_sum or grade_count:
+                old_sum, old_count = deltas.get(row.user_id, (0, 0))
+                deltas[row.user_id] = (old_sum + grade_sum, old_count + grade_count)
+        return deltas
+
+    async def regrade_module(
+        self,
+        module_id: str,
+        questions: List[Dict[str, Any]],
+        dry_run: bool = False,
+        limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Re-grade the module's results; limit stops after that many (oldest first)"""
+        started = time.perf_counter()
+        engine = RegradeEngine(questions)
+        version = await self.content.snapshot_question_set(module_id, questions, self.db)
+        question_ids = [question["id"] for question in questions]
+
+        report = {
+            "module_id": module_id,
+            "question_set_version": version,
+            "dry_run": dry_run,
+            "processed": 0,
+            "updated": 0,
+            "skipped": 0,
+            "flipped_to_pass": [],
+            "flipped_to_fail": [],
+            "truncated": False,
+        }
+
+        after = None
+        while True:
+            query = (
+                select(
+                    TestResult.id, TestResult.completed_at, TestResult.user_id,
+                    TestResult.question_set_version, TestResult.answers_compact, TestResult.answers,
+                    TestResult.form_seed, TestResult.form_size, TestResult.bank_positions,
+                    TestResult.score, TestResult.max_score, TestResult.percentage, TestResult.passed
+                )
+                .where(TestResult.module_id == module_id)
+                .order_by(TestResult.completed_at, TestResult.id)
+                .limit(settings.REGRADE_BATCH_SIZE)
+            )
+            if limit is not None:
+                if report["processed"] >= limit:
+                    report["truncated"] = True
+                    break
+                query = query.limit(min(settings.REGRADE_BATCH_SIZE, limit - report["processed"]))
+            if after is not None:
+                query = query.where(tuple_(TestResult.completed_at, TestResult.id) > after)
+            rows = (await self.db.execute(query)).all()
+            if not rows:
+                break
+            after = (rows[-1].completed_at, rows[-1].id)
+            report["processed"] += len(rows)
+
+            # Bring every attempt's answers into the current question order
+            batch, answers, asked = [], [], []
+            for row in rows:
+                # Question bank attempts are not graded against questions.json
+                if row.bank_positions is not None:
+                    report["skipped"] += 1
+                    continue
+                if row.answers_compact is not None:
+                    remapped = await self._remap(module_id, row.question_set_version, question_ids)
+                    if remapped is None:
+                        report["skipped"] += 1
+                        continue
+                    remap, old_count = remapped
+                    if row.form_size is not None:
+                        # The seed picks questions by position, so a sampled form can
+                        # only move to a version with the same questions in the same order
+                        if remap != list(range(old_count)):
+                            report["skipped"] += 1
+                            continue
+                        asked.append(asked_questions(row.form_seed, old_count, row.form_size))
+                    else:
+                        asked.append(None)
+                    stored = row.answers_compact
+                    answers.append([stored[j] if 0 <= j < len(stored) else None for j in remap])
+                elif row.answers is not None:
+                    by_id = {answer["question_id"]: answer["answer"] for answer in row.answers}
+                    answers.append([by_id.get(question_id) for question_id in question_ids])
+                    asked.append(None)
+                else:
+                    report["skipped"] += 1
+                    continue
+                batch.append(row)
+            if not batch:
+                continue
+
+            graded = await engine.grade(answers, asked)
+            changed = []
+            for position, row in enumerate(batch):
+                max_score = int(graded["max_score"][position])
+                score = int(graded["score"][position])
+                percentage = int(graded["percentage"][position])
+                passed = bool(graded["passed"][position])
+                if (score, max_score, percentage, passed) == (row.score, row.max_score, row.percentage, row.passed):
+                    continue
+                changed.append(position)
+                if passed != row.passed:
+                    flip = {
+                        "result_id": str(row.id),
+                        "user_id": str(row.user_id) if row.user_id else None,
+                        "old_percentage": row.percentage,
+                        "new_percentage": percentage,
+                    }
+                    report["flipped_to_pass" if passed else "flipped_to_fail"].append(flip)
+            report["updated"] += len(changed)
+
+            if changed and not dry_run:
+                await self.db.execute(UPDATE_SQL, {
+                    "version": version,
+                    "ids": [batch[p].id for p in changed],
+                    "completed": [batch[p].completed_at for p in changed],
+                    "scores": [int(graded["score"][p]) for p in changed],
+                    "max_scores": [int(graded["max_score"][p]) for p in changed],
+                    "percentages": [int(graded["percentage"][p]) for p in changed],
+                    "passed": [bool(graded["passed"][p]) for p in changed],
+                    "bits": [graded["bits"][p].tobytes() for p in changed],
+                    "answers": [json.dumps(answers[p], ensure_ascii=False) for p in changed],
+                })
+                deltas = self._summary_deltas(batch, changed, graded)
+                if deltas:
+                    await self.db.execute(SUMMARY_DELTA_SQL, {
+                        "users": list(deltas),
+                        "sums": [grade_sum for grade_sum, _ in deltas.values()],
+                        "counts": [grade_count for _, grade_count in deltas.values()],
+                    })
+                await self.db.commit()
+                self.changed_users.update(batch[p].user_id for p in changed if batch[p].user_id)
+
+        report["elapsed_seconds"] = round(time.perf_counter() - started, 2)
+        return report
@@ -0,0 +1,59 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def question_set_version(questions: List[Dict[str, Any]]) -> str:
+    """Stable content hash identifying a questions.json revision"""
+    canonical = json.dumps(questions, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_result(
+    questions: List[Dict[str, Any]],
+    user_answers: Dict[str, Any],
+    correct_flags: List[bool]
+) -> Tuple[bytes, List[Any]]:
+    """Encode an attempt as (correctness bitset, answers by question index).
+
+    Bit i of the bitset (byte i // 8, bit i % 8) is set when question i of the
+    question set was answered correctly. Answers are stored positionally, so
+    question ids and correct answers are not repeated in every row.
+    """
+    bits = bytearray((len(questions) + 7) // 8)
+    for index, correct in enumerate(correct_flags):
+        if correct:
+            bits[index // 8] |= 1 << (index % 8)
+    answers = [user_answers.get(question["id"]) for question in questions]
+    return bytes(bits), answers
+
+
+def is_correct(correct_bits: bytes, index: int) -> bool:
+    return bool(correct_bits[index // 8] & (1 << (index % 8)))
+
+
+def decode_result(
+    questions: List[Dict[str, Any]],
+    correct_bits: bytes,
+    answers: List[Any],
+    asked: Optional[List[int]] = None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Rebuild legacy (answers, detailed_results) JSON from compact form.
+
+    asked limits the result to the questions of a sampled test form.
+    """
+    legacy_answers = []
+    detailed_results = []
+    for index in (asked if asked is not None else range(len(questions))):
+        question = questions[index]
+        user_answer = answers[index] if index < len(answers) else None
+        correct = is_correct(correct_bits, index)
+        if user_answer is not None:
+            legacy_answers.append({"question_id": question["id"], "answer": user_answer})
+        detailed_results.append({
+            "question_id": question["id"],
+            "correct": correct,
+            "user_answer": user_answer,
+            "correct_answer": None if correct else question.get("correct_answer")
+        })
+    return legacy_answers, detailed_results
@@ -0,0 +1,206 @@
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+import redis.asyncio as redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import CacheService
+from app.core.storage import StorageService
+from app.crud.progress import record_attempt, adjust_status_counters, adjust_progress_summary
+from app.db.session import AsyncSessionLocal, engine_router
+from app.models.progress import ProgressStatus, UserProgress
+from app.models.test import TestResult
+from app.schemas.test import TestResult as GradedTest
+from app.services.content_service import ContentService
+from app.services.event_log import event_log, TEST_SUBMITTED
+from app.services.item_stats import ItemStatsService
+from app.services.progress_service import ProgressService
+from app.services.result_codec import encode_result
+from app.services.test_forms import form_seed, form_size, asked_questions
+from app.services.test_service import TestGradingService, compile_grading_plan, select_plan
+from app.services.test_sessions import TestSessionService, CLAIMED, NO_SESSION
+
+
+class AttemptAlreadyFinalized(Exception):
+    """The module left testing (a concurrent submit wrote the attempt) before this one"""
+
+
+async def finalize_attempt(
+    db: AsyncSession,
+    content_service: ContentService,
+    progress_service: ProgressService,
+    grading_service: TestGradingService,
+    redis_client: redis.Redis,
+    user_id: UUID,
+    module_id: str,
+    progress: UserProgress,
+    user_answers: List[Dict[str, Any]],
+    bank_version: Optional[str] = None
+) -> Optional[Tuple[TestResult, GradedTest, int]]:
+    """Grade the current attempt and write it (result row, progress, counters).
+
+    Shared by submit_test and the deadline sweeper. bank_version is the bank
+    version pinned by the attempt's session (the current one without it).
+    Returns (test_result, result, attempt_number), or None when the questions
+    of the attempt cannot be loaded. Raises AttemptAlreadyFinalized (nothing
+    written) when the module is no longer in testing.
+    """
+    spec = await content_service.get_form_spec(module_id, db)
+    seed, size, asked, positions = None, None, None, None
+    if not spec.is_identity:
+        seed = form_seed(user_id, module_id, progress.attempts_count + 1)
+
+    if spec.draw:
+        # Bank test: the seed and the pinned version draw the questions the student was shown
+        drawn = await content_service.draw_bank_questions(module_id, spec, seed, db, bank_version)
+        if drawn is None:
+            return None
+        version, positions, questions = drawn
+        plan = compile_grading_plan(questions)
+    else:
+        # Test questions (with correct answers) and the plan compiled for their version
+        grading = await content_service.get_grading_questions(module_id, db)
+        if grading is None:
+            return None
+        version, questions, plan = grading
+
+        # A sampled form is graded on the questions it asked; the seed tells which
+        if seed is not None:
+            size = form_size(spec, len(questions))
+        if size is not None:
+            asked = asked_questions(seed, len(questions), size)
+            plan = select_plan(plan, asked)
+            asked_ids = {questions[index]["id"] for index in asked}
+            user_answers = [ans for ans in user_answers if ans["question_id"] in asked_ids]
+
+    result = grading_service.grade_test(user_answers, questions, plan=plan)
+
+    # Store answers compactly against the versioned snapshot of the question set
+    # (for bank tests: against the drawn questions, found again by bank_positions)
+    correct_flags = [False] * len(questions)
+    for index, detail in zip(asked if asked is not None else range(len(questions)), result.detailed_results):
+        correct_flags[index] = detail.correct
+    correct_bits, answers_compact = encode_result(
+        questions,
+        {ans["question_id"]: ans["answer"] for ans in user_answers},
+        correct_flags
+    )
+
+    # Calculate attempt number from the counter on progress
+    result_id = uuid.uuid4()
+    attempt_number = await record_attempt(db, progress.id, result_id)
+    if attempt_number is None:
+        # Status guard in the UPDATE: counters were already moved by the other submit
+        await db.rollback()
+        raise AttemptAlreadyFinalized()
+
+    test_result = TestResult(
+        id=result_id,
+        progress_id=progress.id,
+        user_id=user_id,
+        module_id=module_id,
+        score=result.score,
+        max_score=result.max_score,
+        percentage=result.percentage,
+        passed=result.passed,
+        question_set_version=version,
+        correct_bits=correct_bits,
+        answers_compact=answers_compact,
+        form_seed=seed,
+        form_size=size,
+        bank_positions=positions,
+        attempt_number=attempt_number
+    )
+    db.add(test_result)
+
+    # Update progress status and dashboard summary in the same transaction
+    new_status = ProgressStatus.COMPLETED if result.passed else ProgressStatus.FAILED
+    await adjust_status_counters(db, user_id, ProgressStatus.TESTING, new_status)
+    if result.passed:
+        await adjust_progress_summary(db, user_id, grade_sum=result.percentage, grade_count=1)
+        progress.completed_at = datetime.utcnow()
+    progress.status = new_status
+
+    await db.commit()
+    await db.refresh(test_result)
+    await progress_service.invalidate_summary(user_id)
+    await progress_service.invalidate_lesson_state(user_id, module_id)
+    await engine_router.mark_write(user_id, redis_client)
+    event_log.emit(
+        TEST_SUBMITTED, user_id, module_id,
+        result_id=result_id, attempt_number=attempt_number,
+        percentage=result.percentage, passed=result.passed
+    )
+    if positions is None:
+        try:
+            await ItemStatsService(redis_client).record(
+                module_id, version, questions, correct_bits, answers_compact, asked=asked
+            )
+        except Exception as e:
+            print(f"Warning: Could not update item statistics: {e}")
+
+    return test_result, result, attempt_number
+
+
+async def _finalize_expired(redis_client: redis.Redis, sessions: TestSessionService, user_id: str, module_id: str) -> bool:
+    code, session = await sessions.claim(user_id, module_id, mode="expire")
+    if code == NO_SESSION:
+        await sessions.forget(user_id, module_id)
+    if code != CLAIMED:
+        return False
+
+    written = None
+    async with AsyncSessionLocal() as db:
+        cache_service = CacheService(redis_client)
+        progress_service = ProgressService(db, cache_service)
+        progress = await progress_service.get_user_progress(UUID(user_id), module_id)
+        # Already written (or not the attempt this session belongs to): just clean up
+        if (
+            progress
+            and progress.status == ProgressStatus.TESTING
+            and progress.attempts_count + 1 == session["attempt"]
+        ):
+            try:
+                written = await finalize_attempt(
+                    db, ContentService(cache_service, StorageService()), progress_service,
+                    TestGradingService(), redis_client, UUID(user_id), module_id, progress,
+                    session["answers"], session["bank_version"]
+                )
+            except AttemptAlreadyFinalized:
+                # A submit got there first; only the session is left to clean up
+                written = None
+            else:
+                if written is None:
+                    # The claim expires after FINALIZE_RETRY_SECONDS and a later sweep retries
+                    print(f"Warning: Could not load questions to finalize test of {user_id} in {module_id}")
+                    return False
+
+    await sessions.finish(user_id, module_id)
+    return written is not None
+
+
+async def sweep_expired_sessions(redis_client: redis.Redis, batch_size: int = 100) -> int:
+    """Finalize timed attempts past their deadline with the autosaved answers.
+
+    The claim in Redis makes the sweeper and a late submit mutually
+    exclusive; the attempt counter on progress makes a retried finalization
+    (crash between commit and cleanup) a no-op. Returns attempts written.
+    """
+    sessions = TestSessionService(redis_client)
+    finalized = 0
+    while True:
+        due = await sessions.due(batch_size)
+        failed = False
+        for user_id, module_id in due:
+            try:
+                if await _finalize_expired(redis_client, sessions, user_id, module_id):
+                    finalized += 1
+            except Exception as e:
+                failed = True
+                print(f"Warning: Could not finalize test of {user_id} in {module_id}: {e}")
+        # Handled sessions leave the due range, so a full batch means more are
+        # waiting; after a failure the rest waits for the next tick
+        if failed or len(due) < batch_size:
+            return finalized
@@ -0,0 +1,162 @@
+import hashlib
+import hmac
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+MASK64 = (1 << 64) - 1
+FEISTEL_ROUNDS = 4
+
+
+def _mix(value: int) -> int:
+    """splitmix64 finalizer"""
+    value = (value + 0x9E3779B97F4A7C15) & MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK64
+    return value ^ (value >> 31)
+
+
+class SeededPermutation:
+    """Pseudo-random permutation of range(n) evaluated one position at a time.
+
+    A small Feistel network over the next even power of two, walking the
+    cycle until the value falls inside range(n). The first k positions of a
+    10k-question pool cost O(k), with no shuffled list in memory. Unlike
+    random.shuffle the mapping is fixed by this code, so stored seeds decode
+    the same way after Python upgrades.
+    """
+
+    def __init__(self, n: int, seed: int):
+        self.n = n
+        bits = max(2, (n - 1).bit_length())
+        bits += bits % 2
+        self.half = bits // 2
+        self.mask = (1 << self.half) - 1
+        self.keys = [_mix(seed + round_number) for round_number in range(FEISTEL_ROUNDS)]
+
+    def _encrypt(self, value: int) -> int:
+        left, right = value >> self.half, value & self.mask
+        for key in self.keys:
+            left, right = right, left ^ (_mix(right ^ key) & self.mask)
+        return (left << self.half) | right
+
+    def __getitem__(self, position: int) -> int:
+        value = self._encrypt(position)
+        while value >= self.n:
+            value = self._encrypt(value)
+        return value
+
+
+def _shuffled(n: int, seed: int) -> List[int]:
+    """Fisher-Yates over range(n) driven by splitmix64 (cheaper per item than the Feistel walk)"""
+    order = list(range(n))
+    state = seed
+    for i in range(n - 1, 0, -1):
+        state = _mix(state)
+        j = state % (i + 1)
+        order[i], order[j] = order[j], order[i]
+    return order
+
+
+# (tag, difficulty, count) of a question bank draw; None matches any
+DrawRule = Tuple[Optional[str], Optional[int], int]
+
+
+@dataclass(frozen=True)
+class FormSpec:
+    shuffle_questions: bool = False
+    shuffle_options: bool = False
+    # Questions drawn per attempt; None means all of them
+    size: Optional[int] = None
+    # Draw the test from the module's question bank instead of questions.json
+    draw: Optional[Tuple[DrawRule, ...]] = None
+
+    @property
+    def is_identity(self) -> bool:
+        return not (self.shuffle_questions or self.shuffle_options or self.size or self.draw)
+
+
+def _draw_rules(value: Any) -> Optional[Tuple[DrawRule, ...]]:
+    if not isinstance(value, list):
+        return None
+    rules = []
+    for rule in value:
+        if not isinstance(rule, dict) or not isinstance(rule.get("count"), int) or rule["count"] <= 0:
+            continue
+        difficulty = rule.get("difficulty")
+        rules.append((
+            rule.get("tag") or None,
+            difficulty if isinstance(difficulty, int) else None,
+            rule["count"]
+        ))
+    return tuple(rules) or None
+
+
+def form_spec(test_settings: Optional[Dict[str, Any]]) -> FormSpec:
+    """Read form options from settings.json"""
+    test_settings = test_settings or {}
+    size = test_settings.get("questions_per_attempt")
+    return FormSpec(
+        shuffle_questions=bool(test_settings.get("shuffle_questions", False)),
+        shuffle_options=bool(test_settings.get("shuffle_options", False)),
+        size=size if isinstance(size, int) and size > 0 else None,
+        draw=_draw_rules(test_settings.get("bank_draw"))
+    )
+
+
+def form_seed(user_id, module_id: str, attempt_number: int) -> int:
+    """Seed of a user's form for an attempt; reloading the test shows the same form"""
+    message = f"{user_id}:{module_id}:{attempt_number}".encode("utf-8")
+    digest = hmac.new(settings.SECRET_KEY.encode("utf-8"), message, hashlib.sha256).digest()
+    # 63 bits, so it fits a signed BIGINT
+    return int.from_bytes(digest[:8], "big") >> 1
+
+
+def form_size(spec: FormSpec, total: int) -> Optional[int]:
+    """Number of sampled questions, or None when the form asks all of them"""
+    if spec.size is None or spec.size >= total:
+        return None
+    return spec.size
+
+
+def asked_questions(seed: int, total: int, size: Optional[int], shuffle: bool = False) -> List[int]:
+    """Indices (in the question set) of the questions on a form, in form order.
+
+    With size the form is the first size positions of the seed's permutation;
+    only seed, total and size are needed to know which questions were asked.
+    """
+    if size is None:
+        return _shuffled(total, seed) if shuffle else list(range(total))
+    permutation = SeededPermutation(total, seed)
+    indices = [permutation[position] for position in range(size)]
+    if not shuffle:
+        indices.sort()
+    return indices
+
+
+def option_order(seed: int, question_index: int, count: int) -> List[int]:
+    return _shuffled(count, _mix(seed ^ (question_index << 1 | 1)))
+
+
+def build_form(public_test: Dict[str, Any], seed: int, spec: FormSpec) -> Dict[str, Any]:
+    """Student form for one attempt, built from the public projection.
+
+    public_test is shared (cached), so it is never modified: only the
+    reordered questions are copied.
+    """
+    questions = public_test.get("questions", [])
+    indices = asked_questions(seed, len(questions), form_size(spec, len(questions)), spec.shuffle_questions)
+
+    form_questions = []
+    for index in indices:
+        question = questions[index]
+        options = question.get("options")
+        if spec.shuffle_options and isinstance(options, list) and len(options) > 1:
+            question = dict(question)
+            question["options"] = [options[k] for k in option_order(seed, index, len(options))]
+        form_questions.append(question)
+
+    form = {key: value for key, value in public_test.items() if key != "questions"}
+    form["questions"] = form_questions
+    return form
@@ -1,25 +1,121 @@
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple
 from app.schemas.test import TestResult, TestResultDetail
 
 
+# How a question's correct answer is compared
+CHOICES = "choices"   # list, order-insensitive
+SORTED = "sorted"     # list with duplicates or unhashable options
+TEXT = "text"         # string, case- and whitespace-insensitive
+EXACT = "exact"       # anything else, plain equality
+NO_ANSWER = "none"    # no correct answer, never correct
+
+
+@dataclass(frozen=True)
+class PlanItem:
+    question_id: str
+    kind: str
+    # frozenset for CHOICES, sorted list for SORTED, normalized string for TEXT
+    expected: Any
+    expected_len: int
+    points: int
+    correct_answer: Any
+
+
+@dataclass(frozen=True)
+class GradingPlan:
+    """Questions compiled once per question-set version.
+
+    Correct answers are normalized ahead of time, so grading a submission
+    only normalizes the user's side.
+    """
+    items: Tuple[PlanItem, ...]
+    index: Dict[str, int]
+    max_score: int
+
+
+def compile_grading_plan(questions: List[Dict[str, Any]]) -> GradingPlan:
+    items = []
+    for question in questions:
+        correct = question.get("correct_answer")
+        if correct is None:
+            kind, expected, expected_len = NO_ANSWER, None, 0
+        elif isinstance(correct, list):
+            try:
+                expected = frozenset(correct)
+            except TypeError:
+                expected = None
+            # Duplicates or unhashable options: keep exact multiset comparison
+            if expected is None or len(expected) != len(correct):
+                kind, expected, expected_len = SORTED, sorted(correct), len(correct)
+            else:
+                kind, expected_len = CHOICES, len(correct)
+        elif isinstance(correct, str):
+            kind, expected, expected_len = TEXT, correct.strip().lower(), 0
+        else:
+            kind, expected, expected_len = EXACT, correct, 0
+        items.append(PlanItem(
+            question_id=question["id"],
+            kind=kind,
+            expected=expected,
+            expected_len=expected_len,
+            points=question.get("points", 1),
+            correct_answer=correct
+        ))
+    return GradingPlan(
+        items=tuple(items),
+        index={item.question_id: position for position, item in enumerate(items)},
+        max_score=sum(item.points for item in items)
+    )
+
+
+def select_plan(plan: GradingPlan, indices: List[int]) -> GradingPlan:
+    """Plan for the questions of one test form (a subset of the question set)"""
+    items = tuple(plan.items[i] for i in indices)
+    return GradingPlan(
+        items=items,
+        index={item.question_id: position for position, item in enumerate(items)},
+        max_score=sum(item.points for item in items)
+    )
+
+
+def _matches(item: PlanItem, user_answer: Any) -> bool:
+    kind = item.kind
+    if kind == TEXT:
+        if not isinstance(user_answer, str):
+            user_answer = str(user_answer)
+        return user_answer.strip().lower() == item.expected
+    if kind == CHOICES:
+        if not isinstance(user_answer, list) or len(user_answer) != item.expected_len:
+            return False
+        try:
+            return frozenset(user_answer) == item.expected
+        except TypeError:
+            return False
+    if kind == SORTED:
+        if not isinstance(user_answer, list):
+            return False
+        try:
+            return sorted(user_answer) == item.expected
+        except TypeError:
+            return False
+    if kind == EXACT:
+        return user_answer == item.expected
+    return False
+
+
 class TestGradingService:
     
     def grade_test(
         self,
         user_answers: List[Dict[str, Any]],
         questions: List[Dict[str, Any]],
-        passing_threshold: float = 0.7
+        passing_threshold: float = 0.7,
+        plan: Optional[GradingPlan] = None
     ) -> TestResult:
         """Grade test submission and return detailed results"""
-        score = 0
-        total_points = 0
-        detailed_results = []
-        
-        # Create question lookup dict
-        question_lookup = {
-            q["id"]: q 
-            for q in questions
-        }
+        if plan is None:
+            plan = compile_grading_plan(questions)
         
         # Create user answer lookup
         user_answer_lookup = {
@@ -27,26 +123,23 @@ class TestGradingService:
             for ans in user_answers
         }
         
-        for question in questions:
-            question_id = question["id"]
-            user_response = user_answer_lookup.get(question_id)
-            correct_response = question.get("correct_answer")
-            points = question.get("points", 1)
-            total_points += points
-            
-            is_correct = self._compare_answers(user_response, correct_response)
-            
+        score = 0
+        detailed_results = []
+        for item in plan.items:
+            user_response = user_answer_lookup.get(item.question_id)
+            is_correct = _matches(item, user_response)
+        
             if is_correct:
-                score += points
-            
+                score += item.points
+        
             detailed_results.append(TestResultDetail(
-                question_id=question_id,
+                question_id=item.question_id,
                 correct=is_correct,
                 user_answer=user_response,
-                correct_answer=correct_response if not is_correct else None
+                correct_answer=item.correct_answer if not is_correct else None
             ))
         
-        max_score = total_points
+        max_score = plan.max_score
         percentage = int((score / max_score) * 100) if max_score > 0 else 0
         passed = (score / max_score) >= passing_threshold if max_score > 0 else False
         
@@ -57,23 +150,3 @@ class TestGradingService:
             passed=passed,
             detailed_results=detailed_results
         )
-    
-    def _compare_answers(self, user_answer: Any, correct_answer: Any) -> bool:
-        """Compare user answer with correct answer"""
-        if correct_answer is None:
-            return False
-        
-        if isinstance(correct_answer, list):
-            # Multiple choice - compare sorted lists
-            if not isinstance(user_answer, list):
-                return False
-            return sorted(user_answer) == sorted(correct_answer)
-        elif isinstance(correct_answer, str):
-            # Single choice or text input - case insensitive comparison
-            if not isinstance(user_answer, str):
-                user_answer = str(user_answer)
-            return user_answer.strip().lower() == correct_answer.strip().lower()
-        else:
-            return user_answer == correct_answer
-
-
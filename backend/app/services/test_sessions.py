@@ -0,0 +1,218 @@
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+
+from app.config import settings
+
+# test_session:{user_id}:{module_id} hash: attempt, started_at, deadline
+# (epoch seconds, 0 = untimed), state (active | finalizing), bank_version
+# (question bank version the form was drawn from, "" for questions.json)
+# and a:{question_id} -> JSON answer for every autosaved answer.
+# test_deadlines sorted set: "{user_id}:{module_id}" scored by deadline, or by
+# the retry time while a finalization is in flight.
+DEADLINES_KEY = "test_deadlines"
+
+# Claim results
+NO_SESSION = 0
+CLAIMED = 1
+EXPIRED = 2
+FINALIZING = 3
+NOT_DUE = 4
+
+# Autosave results
+SAVED = 1
+NOT_ACTIVE = -1
+TIME_UP = -2
+
+# Seconds before a claimed but unfinished finalization is picked up again
+FINALIZE_RETRY_SECONDS = 60
+
+START_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    if redis.call('HGET', KEYS[1], 'attempt') == ARGV[2] then
+        local fields = redis.call('HMGET', KEYS[1], 'deadline', 'bank_version')
+        return {fields[1], fields[2], 0}
+    end
+    redis.call('DEL', KEYS[1])
+end
+redis.call(
+    'HSET', KEYS[1], 'attempt', ARGV[2], 'started_at', ARGV[3], 'deadline', ARGV[4],
+    'state', 'active', 'bank_version', ARGV[6]
+)
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+if tonumber(ARGV[4]) > 0 then
+    redis.call('ZADD', KEYS[2], ARGV[4], ARGV[1])
+else
+    redis.call('ZREM', KEYS[2], ARGV[1])
+end
+return {ARGV[4], ARGV[6], 1}
+"""
+
+AUTOSAVE_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'state') ~= 'active' then
+    return -1
+end
+local deadline = tonumber(redis.call('HGET', KEYS[1], 'deadline'))
+if deadline > 0 and tonumber(ARGV[1]) > deadline + tonumber(ARGV[2]) then
+    return -2
+end
+for i = 3, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+return 1
+"""
+
+# Submit claims an active session in time; the sweeper claims expired ones
+# and finalizations that never finished. The loser of a race gets nothing.
+CLAIM_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state')
+if not state then
+    return {0}
+end
+local now = tonumber(ARGV[2])
+if state == 'finalizing' then
+    if ARGV[5] ~= 'expire' then
+        return {3}
+    end
+else
+    local deadline = tonumber(redis.call('HGET', KEYS[1], 'deadline'))
+    local late = deadline > 0 and now > deadline + tonumber(ARGV[3])
+    if ARGV[5] == 'submit' and late then
+        return {2}
+    end
+    if ARGV[5] == 'expire' and not late then
+        return {4}
+    end
+end
+redis.call('HSET', KEYS[1], 'state', 'finalizing')
+redis.call('ZADD', KEYS[2], ARGV[4], ARGV[1])
+return {1, redis.call('HGETALL', KEYS[1])}
+"""
+
+# A submit that failed after claiming hands the session back, so the student
+# can retry instead of waiting for the sweeper to finalize it
+RELEASE_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'state') ~= 'finalizing' then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'state', 'active')
+local deadline = tonumber(redis.call('HGET', KEYS[1], 'deadline'))
+if deadline > 0 then
+    redis.call('ZADD', KEYS[2], deadline, ARGV[1])
+else
+    redis.call('ZREM', KEYS[2], ARGV[1])
+end
+return 1
+"""
+
+
+def _session_key(member: str) -> str:
+    return f"test_session:{member}"
+
+
+def _member(user_id, module_id: str) -> str:
+    return f"{user_id}:{module_id}"
+
+
+def _parse(flat: List[str]) -> Dict[str, Any]:
+    """Session hash to {attempt, deadline, bank_version, answers: [{question_id, answer}]}"""
+    fields = dict(zip(flat[::2], flat[1::2]))
+    return {
+        "attempt": int(fields.get("attempt", 0)),
+        "deadline": float(fields.get("deadline", 0)) or None,
+        "bank_version": fields.get("bank_version") or None,
+        "answers": [
+            {"question_id": field[2:], "answer": json.loads(value)}
+            for field, value in fields.items() if field.startswith("a:")
+        ],
+    }
+
+
+class TestSessionService:
+    """Timed test attempts with answers autosaved in Redis.
+
+    Autosaves never touch Postgres; the attempt is written once, either by
+    submit_test or by the sweeper when the deadline passes.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+
+    async def start(
+        self,
+        user_id,
+        module_id: str,
+        attempt: int,
+        time_limit_minutes: Optional[int],
+        bank_version: Optional[str] = None
+    ) -> Tuple[Optional[float], Optional[str], bool]:
+        """Start (or resume) the session of an attempt: (deadline, bank_version, created).
+
+        A resumed session keeps the deadline and bank version it started
+        with, so a bank imported mid-attempt does not change the questions.
+        """
+        now = time.time()
+        deadline = now + time_limit_minutes * 60 if time_limit_minutes else 0
+        member = _member(user_id, module_id)
+        ttl = settings.TEST_SESSION_TTL_DAYS * 86400
+        if time_limit_minutes:
+            ttl = max(ttl, time_limit_minutes * 60 + 86400)
+        result = await self.redis.eval(
+            START_SCRIPT, 2, _session_key(member), DEADLINES_KEY,
+            member, str(attempt), str(now), str(deadline), str(ttl), bank_version or ""
+        )
+        return float(result[0] or 0) or None, result[1] or None, bool(int(result[2]))
+
+    async def save_answers(self, user_id, module_id: str, answers: List[Dict[str, Any]]) -> int:
+        args = [str(time.time()), str(settings.TEST_SESSION_GRACE_SECONDS)]
+        for answer in answers:
+            args.append(f"a:{answer['question_id']}")
+            args.append(json.dumps(answer["answer"], ensure_ascii=False))
+        return int(await self.redis.eval(
+            AUTOSAVE_SCRIPT, 1, _session_key(_member(user_id, module_id)), *args
+        ))
+
+    async def get(self, user_id, module_id: str) -> Optional[Dict[str, Any]]:
+        fields = await self.redis.hgetall(_session_key(_member(user_id, module_id)))
+        if not fields:
+            return None
+        return _parse([item for pair in fields.items() for item in pair])
+
+    async def claim(self, user_id, module_id: str, mode: str = "submit") -> Tuple[int, Optional[Dict[str, Any]]]:
+        """Take the session for finalization: (claim result, session)"""
+        member = _member(user_id, module_id)
+        now = time.time()
+        result = await self.redis.eval(
+            CLAIM_SCRIPT, 2, _session_key(member), DEADLINES_KEY,
+            member, str(now), str(settings.TEST_SESSION_GRACE_SECONDS),
+            str(now + FINALIZE_RETRY_SECONDS), mode
+        )
+        code = int(result[0])
+        return code, _parse(result[1]) if code == CLAIMED else None
+
+    async def release(self, user_id, module_id: str) -> None:
+        """Undo a claim whose finalization failed"""
+        member = _member(user_id, module_id)
+        await self.redis.eval(RELEASE_SCRIPT, 2, _session_key(member), DEADLINES_KEY, member)
+
+    async def finish(self, user_id, module_id: str) -> None:
+        """Drop a finalized session"""
+        member = _member(user_id, module_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(_session_key(member))
+            pipe.zrem(DEADLINES_KEY, member)
+            await pipe.execute()
+
+    async def forget(self, user_id, module_id: str) -> None:
+        """Drop a deadline whose session no longer exists (expired hash)"""
+        await self.redis.zrem(DEADLINES_KEY, _member(user_id, module_id))
+
+    async def due(self, limit: int = 100) -> List[Tuple[str, str]]:
+        """(user_id, module_id) of sessions past deadline and grace"""
+        members = await self.redis.zrangebyscore(
+            DEADLINES_KEY, "-inf", time.time() - settings.TEST_SESSION_GRACE_SECONDS,
+            start=0, num=limit
+        )
+        return [tuple(member.split(":", 1)) for member in members]
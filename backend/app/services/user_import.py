@@ -0,0 +1,309 @@
+import asyncio
+import csv
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import EmailStr, TypeAdapter, ValidationError
+import redis.asyncio as redis
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.core.security import get_password_hash
+
+_email_adapter = TypeAdapter(EmailStr)
+
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+USER_COPY_COLUMNS = [
+    "id", "email", "username", "hashed_password",
+    "is_active", "is_superuser", "created_at", "updated_at"
+]
+
+# Staging table lives for one batch transaction; ON CONFLICT catches users
+# registered concurrently after the dedupe query
+CREATE_STAGING_SQL = (
+    "CREATE TEMP TABLE users_import (LIKE users INCLUDING DEFAULTS) ON COMMIT DROP"
+)
+INSERT_FROM_STAGING_SQL = (
+    "INSERT INTO users (" + ", ".join(USER_COPY_COLUMNS) + ") "
+    "SELECT " + ", ".join(USER_COPY_COLUMNS) + " FROM users_import "
+    "ON CONFLICT DO NOTHING RETURNING username"
+)
+# Served by the unique ix_users_email_lower index
+EXISTING_USERS_SQL = (
+    "SELECT username, email FROM users "
+    "WHERE username = ANY($1::varchar[]) OR lower(email) = ANY($2::varchar[])"
+)
+
+
+def _hash_workers() -> int:
+    return settings.IMPORT_HASH_WORKERS or os.cpu_count() or 1
+
+
+def _hash_pool_executor() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=_hash_workers())
+    return _hash_pool
+
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown()
+        _hash_pool = None
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash a chunk of passwords (runs in a worker process)"""
+    return [get_password_hash(password) for password in passwords]
+
+
+# Background import jobs: user_import:{job_id} -> JSON status and report
+IMPORT_JOB_TTL_SECONDS = 86400
+# Errors kept in a job report; the failed count stays exact
+MAX_REPORT_ERRORS = 1000
+
+
+def iter_user_records(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (row number, record or error message) from CSV or JSONL lines.
+
+    CSV lines go through one csv.reader, so quoted fields may span lines;
+    open files with newline="".
+    """
+    if fmt == "jsonl":
+        row = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            row += 1
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield row, "Invalid JSON"
+                continue
+            yield row, record if isinstance(record, dict) else "Expected a JSON object"
+        return
+
+    header = None
+    row = 0
+    for values in csv.reader(lines):
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield row, dict(zip(header, values))
+
+
+def _parse_bool(value: Any, default: bool) -> bool:
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+def validate_user_record(record: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Normalize one import record; return (user, None) or (None, error)"""
+    username = str(record.get("username") or "").strip()
+    if not username:
+        return None, "Missing username"
+    if len(username) > 100:
+        return None, "Username too long"
+
+    try:
+        email = _email_adapter.validate_python(str(record.get("email") or "").strip())
+    except ValidationError:
+        return None, "Invalid email"
+
+    password = record.get("password")
+    password_hash = record.get("password_hash")
+    if password_hash:
+        # Pre-hashed bcrypt passwords (migrations from another system) skip hashing
+        if not str(password_hash).startswith("$2"):
+            return None, "password_hash must be a bcrypt hash"
+    elif not password:
+        return None, "Missing password"
+
+    return {
+        "username": username,
+        # Case-insensitive uniqueness: Ivan@Corp.com and ivan@corp.com are one user
+        "email": email.lower(),
+        "password": str(password) if password else None,
+        "hashed_password": str(password_hash) if password_hash else None,
+        "is_active": _parse_bool(record.get("is_active"), True),
+    }, None
+
+
+class UserImportService:
+    """Bulk user provisioning: validate, dedupe, hash off-loop, COPY.
+
+    Runs as a background job (UserImportJobs) or from import_users.py; a
+    100k-row import outlives an HTTP request.
+    Records are processed in IMPORT_BATCH_SIZE batches. Each batch is
+    deduplicated against existing users with one set-based query, passwords
+    are hashed in a process pool, and rows are loaded with COPY into a staging
+    table and inserted in one statement.
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+
+    async def import_users(self, records: Iterable[Tuple[int, Any]]) -> Dict[str, Any]:
+        report = {"total": 0, "created": 0, "failed": 0, "errors": []}
+        seen_usernames = set()
+        seen_emails = set()
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+
+        def fail(row: int, username: Optional[str], error: str) -> None:
+            report["failed"] += 1
+            report["errors"].append({"row": row, "username": username, "error": error})
+
+        for row, record in records:
+            report["total"] += 1
+            if isinstance(record, str):
+                fail(row, None, record)
+                continue
+
+            user, error = validate_user_record(record)
+            if error:
+                fail(row, record.get("username"), error)
+                continue
+
+            # Duplicates within the file itself
+            if user["username"] in seen_usernames:
+                fail(row, user["username"], "Duplicate username in file")
+                continue
+            if user["email"] in seen_emails:
+                fail(row, user["username"], "Duplicate email in file")
+                continue
+            seen_usernames.add(user["username"])
+            seen_emails.add(user["email"])
+
+            batch.append((row, user))
+            if len(batch) >= settings.IMPORT_BATCH_SIZE:
+                report["created"] += await self._import_batch(batch, fail)
+                batch = []
+
+        if batch:
+            report["created"] += await self._import_batch(batch, fail)
+
+        report["errors"].sort(key=lambda error: error["row"])
+        return report
+
+    async def _hash_batch(self, passwords: List[str]) -> List[str]:
+        loop = asyncio.get_running_loop()
+        pool = _hash_pool_executor()
+        size = max(1, -(-len(passwords) // _hash_workers()))
+        chunks = await asyncio.gather(*[
+            loop.run_in_executor(pool, hash_passwords, passwords[start:start + size])
+            for start in range(0, len(passwords), size)
+        ])
+        return [hashed for chunk in chunks for hashed in chunk]
+
+    async def _import_batch(self, batch: List[Tuple[int, Dict[str, Any]]], fail) -> int:
+        async with self.engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            existing = await raw.driver_connection.fetch(
+                EXISTING_USERS_SQL,
+                [user["username"] for _, user in batch],
+                [user["email"] for _, user in batch]
+            )
+        taken_usernames = {record["username"] for record in existing}
+        taken_emails = {record["email"].lower() for record in existing}
+
+        pending = []
+        for row, user in batch:
+            if user["username"] in taken_usernames:
+                fail(row, user["username"], "Username already registered")
+            elif user["email"] in taken_emails:
+                fail(row, user["username"], "Email already registered")
+            else:
+                pending.append((row, user))
+        if not pending:
+            return 0
+
+        # Hash without holding a pooled connection
+        to_hash = [user for _, user in pending if user["hashed_password"] is None]
+        for user, hashed in zip(to_hash, await self._hash_batch([user["password"] for user in to_hash])):
+            user["hashed_password"] = hashed
+
+        now = datetime.utcnow()
+        records = [
+            (
+                uuid.uuid4(), user["email"], user["username"], user["hashed_password"],
+                user["is_active"], False, now, now
+            )
+            for _, user in pending
+        ]
+
+        async with self.engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            driver = raw.driver_connection
+            async with driver.transaction():
+                await driver.execute(CREATE_STAGING_SQL)
+                await driver.copy_records_to_table(
+                    "users_import", records=records, columns=USER_COPY_COLUMNS
+                )
+                inserted = {record["username"] for record in await driver.fetch(INSERT_FROM_STAGING_SQL)}
+
+        for row, user in pending:
+            if user["username"] not in inserted:
+                fail(row, user["username"], "Username or email already registered")
+        return len(inserted)
+
+
+class UserImportJobs:
+    """Imports that outlive the request: run in the background, report in Redis.
+
+    The status entry is written before the job starts and replaced with the
+    report when it ends; a worker that dies mid-import leaves it "running"
+    until the entry expires.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis = redis_client
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"user_import:{job_id}"
+
+    async def _put(self, job_id: str, state: Dict[str, Any]) -> None:
+        await self.redis.set(self._key(job_id), json.dumps(state, default=str), ex=IMPORT_JOB_TTL_SECONDS)
+
+    async def create(self, filename: Optional[str]) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        state = {"job_id": job_id, "status": "running", "filename": filename, "started_at": time.time()}
+        await self._put(job_id, state)
+        return state
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.redis.get(self._key(job_id))
+        return json.loads(raw) if raw else None
+
+    async def run(self, job_id: str, engine: AsyncEngine, path: str, fmt: str) -> None:
+        """Import a spooled file and store the report (deletes the file)"""
+        state = await self.get(job_id) or {"job_id": job_id}
+        try:
+            with open(path, encoding="utf-8-sig", newline="") as f:
+                report = await UserImportService(engine).import_users(iter_user_records(f, fmt))
+            report["errors_truncated"] = len(report["errors"]) > MAX_REPORT_ERRORS
+            report["errors"] = report["errors"][:MAX_REPORT_ERRORS]
+            state.update(status="done", **report)
+        except Exception as e:
+            print(f"Warning: User import {job_id} failed: {e}")
+            state.update(status="failed", error=str(e))
+        finally:
+            os.unlink(path)
+        state["finished_at"] = time.time()
+        await self._put(job_id, state)
@@ -0,0 +1,38 @@
+"""
+Скрипт для переноса старых результатов тестов в архив
+
+Результаты старше ARCHIVE_AFTER_DAYS (или --days) переносятся из таблицы
+test_results в сжатые сегменты archive/test_results/*.jsonl.gz в хранилище.
+GET /api/v1/results/{result_id} продолжает находить их через индекс архива.
+"""
+import argparse
+import asyncio
+import sys
+
+from app.db.session import AsyncSessionLocal, engine
+from app.core.storage import StorageService
+from app.services.archive_service import ResultArchiveService
+
+
+async def archive_results(days):
+    try:
+        async with AsyncSessionLocal() as session:
+            service = ResultArchiveService(session, StorageService())
+            archived = await service.archive_older_than(days)
+        print(f"✓ Archived {archived} test results")
+        await engine.dispose()
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=None, help="archive results older than N days")
+    args = parser.parse_args()
+    success = asyncio.run(archive_results(args.days))
+    sys.exit(0 if success else 1)
@@ -0,0 +1,104 @@
+"""
+Бенчмарк постраничной выдачи модулей в админке на 100k строк
+
+Создает временный курс со 100 000 модулей, затем сравнивает:
+  - полную загрузку ORM-объектов (как раньше делал admin_list_modules),
+  - OFFSET-пагинацию (страница из середины таблицы),
+  - keyset-пагинацию по (order_index, id) с проекцией колонок.
+После замера временные данные удаляются.
+
+Требует запущенный PostgreSQL с созданной схемой.
+
+    python benchmarks/admin_pagination.py --rows 100000 --page-size 100
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import select, delete, insert
+
+from app.db.session import AsyncSessionLocal, engine
+from app.models.course import Course
+from app.models.module import Module
+from app.crud.module import list_modules_page
+
+
+async def timed(label, coro_factory, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await coro_factory()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<40} {best * 1000:9.1f} ms  ({result} rows)")
+
+
+async def run(rows: int, page_size: int):
+    course_id = uuid.uuid4()
+    prefix = f"bench_{course_id.hex[:8]}_"
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Course).values(id=course_id, title="benchmark", order_index=0))
+        batch = 10000
+        for start in range(0, rows, batch):
+            await db.execute(insert(Module), [
+                {
+                    "id": f"{prefix}{i:07d}",
+                    "course_id": course_id,
+                    "title": f"Module {i}",
+                    "total_lessons": 3,
+                    "order_index": i,
+                }
+                for i in range(start, min(start + batch, rows))
+            ])
+        await db.commit()
+
+    try:
+        async with AsyncSessionLocal() as db:
+            async def full_load():
+                result = await db.execute(
+                    select(Module).where(Module.course_id == course_id).order_by(Module.order_index)
+                )
+                count = len(result.scalars().all())
+                db.expunge_all()
+                return count
+
+            async def offset_page():
+                result = await db.execute(
+                    select(Module)
+                    .where(Module.course_id == course_id)
+                    .order_by(Module.order_index, Module.id)
+                    .offset(rows // 2)
+                    .limit(page_size)
+                )
+                count = len(result.scalars().all())
+                db.expunge_all()
+                return count
+
+            middle = rows // 2
+            after = (middle - 1, f"{prefix}{middle - 1:07d}")
+
+            async def keyset_page():
+                return len(await list_modules_page(db, page_size, after, course_id=course_id))
+
+            await timed("full ORM load (old listing)", full_load, repeat=3)
+            await timed(f"OFFSET {middle} LIMIT {page_size}", offset_page)
+            await timed(f"keyset page (projection, {page_size})", keyset_page)
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Module).where(Module.course_id == course_id))
+            await db.execute(delete(Course).where(Course.id == course_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.page_size))
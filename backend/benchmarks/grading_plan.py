@@ -0,0 +1,96 @@
+"""
+Микробенчмарк проверки теста из 200 вопросов
+
+Сравнивает проверку без плана (вопросы разбираются и нормализуются при
+каждой отправке) с проверкой по заранее скомпилированному плану, который
+ContentService кэширует для версии набора вопросов. БД и Redis не нужны.
+
+    python benchmarks/grading_plan.py --questions 200 --submissions 2000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--submissions", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def make_test(count: int, rng: random.Random):
+    """Mix of single choice, multiple choice and text questions"""
+    questions = []
+    for i in range(count):
+        options = [f"Option {chr(65 + j)}" for j in range(5)]
+        kind = i % 3
+        if kind == 0:
+            correct = rng.choice(options)
+        elif kind == 1:
+            correct = rng.sample(options, rng.randint(2, 4))
+        else:
+            correct = f"  Answer Number {i}  "
+        questions.append({"id": f"q{i}", "options": options, "correct_answer": correct, "points": 1})
+    return questions
+
+
+def make_submission(questions, rng: random.Random):
+    answers = []
+    for question in questions:
+        correct = question["correct_answer"]
+        right = rng.random() < 0.7
+        if isinstance(correct, list):
+            answer = list(reversed(correct)) if right else correct[:1]
+        elif question["options"] and correct in question["options"]:
+            answer = correct if right else rng.choice(question["options"])
+        else:
+            answer = correct.strip().upper() if right else "wrong"
+        answers.append({"question_id": question["id"], "answer": answer})
+    return answers
+
+
+def main():
+    args = parse_args()
+    from app.services.test_service import TestGradingService, compile_grading_plan
+
+    rng = random.Random(args.seed)
+    questions = make_test(args.questions, rng)
+    submissions = [make_submission(questions, rng) for _ in range(args.submissions)]
+    service = TestGradingService()
+
+    # Warm up both paths so neither pays for first-call costs
+    warmup_plan = compile_grading_plan(questions)
+    for answers in submissions[:50]:
+        service.grade_test(answers, questions)
+        service.grade_test(answers, questions, plan=warmup_plan)
+
+    started = time.perf_counter()
+    uncompiled = [service.grade_test(answers, questions) for answers in submissions]
+    uncompiled_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    plan = compile_grading_plan(questions)
+    compile_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    compiled = [service.grade_test(answers, questions, plan=plan) for answers in submissions]
+    compiled_elapsed = time.perf_counter() - started
+
+    assert [r.score for r in uncompiled] == [r.score for r in compiled]
+
+    per_uncompiled = uncompiled_elapsed / args.submissions * 1e6
+    per_compiled = compiled_elapsed / args.submissions * 1e6
+    print(f"Questions per test:   {args.questions}")
+    print(f"Plan compile:         {compile_elapsed * 1e6:.0f} us (once per question-set version)")
+    print(f"Without cached plan:  {per_uncompiled:.0f} us per submission")
+    print(f"With cached plan:     {per_compiled:.0f} us per submission ({per_uncompiled / per_compiled:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
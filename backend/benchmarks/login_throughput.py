@@ -0,0 +1,94 @@
+"""
+Бенчмарк пропускной способности проверки паролей (логинов) на ядро
+
+Сравнивает проверку bcrypt прямо в цикле событий с пулом потоков из
+app.core.security: сколько проверок в секунду выдается на ядро, насколько
+при этом задерживается цикл событий и сколько запросов отклоняется с 503,
+когда очередь пула переполнена. БД и Redis не нужны.
+
+    python benchmarks/login_throughput.py --rounds 12 --logins 200 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--queue-limit", type=int, default=32)
+    return parser.parse_args()
+
+
+async def loop_lag(stop: asyncio.Event) -> float:
+    """Worst delay of a 10 ms timer while the benchmark runs"""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        worst = max(worst, time.perf_counter() - started - 0.01)
+    return worst
+
+
+async def run(args):
+    from fastapi import HTTPException
+    from app.config import settings
+    from app.core import security
+
+    settings.BCRYPT_ROUNDS = args.rounds
+    settings.PASSWORD_WORKERS = args.workers
+    settings.PASSWORD_QUEUE_LIMIT = args.queue_limit
+    workers = args.workers or os.cpu_count() or 1
+    hashed = security.get_password_hash("benchmark-password")
+
+    # Inline: what login did before, bcrypt on the event loop
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(loop_lag(stop))
+    started = time.perf_counter()
+    for _ in range(args.logins):
+        security.verify_password("benchmark-password", hashed)
+        await asyncio.sleep(0)
+    inline_elapsed = time.perf_counter() - started
+    stop.set()
+    inline_lag = await lag_task
+
+    # Pool: concurrent logins with queue limit
+    rejected = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        nonlocal rejected
+        async with semaphore:
+            try:
+                await security.verify_password_async("benchmark-password", hashed)
+            except HTTPException:
+                rejected += 1
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(loop_lag(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(args.logins)])
+    pool_elapsed = time.perf_counter() - started
+    stop.set()
+    pool_lag = await lag_task
+    accepted = args.logins - rejected
+
+    print(f"bcrypt rounds:        {args.rounds}")
+    print(f"Inline:               {args.logins / inline_elapsed:.1f} logins/s, "
+          f"max loop lag {inline_lag * 1000:.0f} ms")
+    print(f"Pool ({workers} workers):   {accepted / pool_elapsed:.1f} logins/s "
+          f"({accepted / pool_elapsed / workers:.1f} per core), "
+          f"max loop lag {pool_lag * 1000:.0f} ms")
+    print(f"Rejected with 503:    {rejected} of {args.logins} (queue limit {args.queue_limit})")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
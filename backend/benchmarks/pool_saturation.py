@@ -0,0 +1,104 @@
+"""
+Бенчмарк насыщения пула соединений при высоком RPS
+
+Запускает GET /modules/{module_id}/lessons/{lesson_number} с высокой
+конкурентностью против маленького пула и считает, сколько раз запросы
+брали соединение из пула. При прогретом кэше (урок и прогресс в Redis)
+чтение урока не должно занимать соединение вовсе; иначе бенчмарк падает.
+
+Требует запущенные PostgreSQL и Redis (docker-compose up -d postgres redis)
+и инициализированную БД (python check_and_init.py).
+
+    python benchmarks/pool_saturation.py --requests 5000 --concurrency 200 --pool-size 2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--max-overflow", type=int, default=0)
+    parser.add_argument("--module-id", default="Company_Module_01")
+    parser.add_argument("--lesson-number", type=int, default=1)
+    parser.add_argument("--username", default="testdemo")
+    parser.add_argument("--password", default="demotest")
+    return parser.parse_args()
+
+
+async def run(args):
+    import httpx
+    from sqlalchemy import event
+    from app.main import app
+    from app.db.session import engine
+
+    checkouts = 0
+
+    def on_checkout(*_):
+        nonlocal checkouts
+        checkouts += 1
+
+    event.listen(engine.sync_engine, "checkout", on_checkout)
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        response = await client.post(
+            "/api/v1/auth/login",
+            json={"username": args.username, "password": args.password}
+        )
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        await client.post(f"/api/v1/modules/{args.module_id}/start", headers=headers)
+
+        url = f"/api/v1/modules/{args.module_id}/lessons/{args.lesson_number}"
+        # Warm up cache
+        (await client.get(url, headers=headers)).raise_for_status()
+
+        checkouts = 0
+        latencies = []
+        errors = 0
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    r = await client.get(url, headers=headers)
+                    if r.status_code != 200:
+                        errors += 1
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"pool_size={args.pool_size} max_overflow={args.max_overflow} concurrency={args.concurrency}")
+    print(f"requests:          {args.requests}")
+    print(f"errors:            {errors}")
+    print(f"throughput:        {args.requests / elapsed:.0f} req/s")
+    print(f"latency p50:       {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"latency p99:       {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+    print(f"pool checkouts:    {checkouts} ({checkouts / args.requests:.2f} per request)")
+
+    await engine.dispose()
+    assert checkouts == 0, f"warm lesson reads checked out {checkouts} connections"
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # Pool settings are read at import time
+    os.environ["DB_POOL_SIZE"] = str(args.pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(args.max_overflow)
+    asyncio.run(run(args))
@@ -0,0 +1,101 @@
+"""
+Бенчмарк пакетной перепроверки результатов тестов
+
+Генерирует синтетические попытки (одиночный выбор, множественный выбор и
+текстовые ответы), проверяет их векторизованным RegradeEngine и сверяет
+выборку с обычной проверкой TestGradingService. Показывает, сколько попыток
+в секунду перепроверяется без учета БД. БД и Redis не нужны.
+
+    python benchmarks/regrade_throughput.py --attempts 1000000 --questions 20
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--attempts", type=int, default=1000000)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--text-share", type=float, default=0.1)
+    parser.add_argument("--batch", type=int, default=20000)
+    parser.add_argument("--check", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def make_test(count: int, text_share: float, rng: random.Random):
+    questions = []
+    for i in range(count):
+        options = [f"Option {chr(65 + j)}" for j in range(5)]
+        roll = rng.random()
+        if roll < text_share:
+            questions.append({"id": f"q{i}", "options": [], "correct_answer": f"Answer {i}", "points": 1})
+        elif roll < 0.5:
+            questions.append({"id": f"q{i}", "options": options,
+                              "correct_answer": rng.sample(options, rng.randint(2, 4)), "points": 2})
+        else:
+            questions.append({"id": f"q{i}", "options": options,
+                              "correct_answer": rng.choice(options), "points": 1})
+    return questions
+
+
+def make_attempt(questions, rng: random.Random):
+    answers = []
+    for question in questions:
+        correct = question["correct_answer"]
+        right = rng.random() < 0.7
+        if isinstance(correct, list):
+            answers.append(rng.sample(correct, len(correct)) if right else correct[:1])
+        elif question["options"]:
+            answers.append(correct if right else rng.choice(question["options"]))
+        else:
+            answers.append(correct.upper() if right else "wrong")
+    return answers
+
+
+async def run(args):
+    from app.config import settings
+    from app.services.regrade_service import RegradeEngine
+    from app.services.test_service import TestGradingService
+
+    rng = random.Random(args.seed)
+    questions = make_test(args.questions, args.text_share, rng)
+    pool = [make_attempt(questions, rng) for _ in range(min(args.attempts, 50000))]
+    engine = RegradeEngine(questions)
+    settings.REGRADE_BATCH_SIZE = args.batch
+
+    # Vectorized results must equal the regular grader
+    sample = pool[:args.check]
+    graded = await engine.grade(sample)
+    grader = TestGradingService()
+    for position, answers in enumerate(sample):
+        expected = grader.grade_test(
+            [{"question_id": q["id"], "answer": a} for q, a in zip(questions, answers)], questions
+        )
+        assert expected.score == int(graded["score"][position])
+        assert expected.percentage == int(graded["percentage"][position])
+        assert expected.passed == bool(graded["passed"][position])
+
+    started = time.perf_counter()
+    for start in range(0, args.attempts, args.batch):
+        size = min(args.batch, args.attempts - start)
+        offset = start % len(pool)
+        batch = (pool[offset:] + pool[:offset])[:size]
+        await engine.grade(batch)
+    elapsed = time.perf_counter() - started
+
+    print(f"Questions:          {args.questions} "
+          f"(single {len(engine.single)}, multiple {len(engine.multi)}, text {len(engine.other)})")
+    print(f"Checked:            {len(sample)} attempts match TestGradingService")
+    print(f"Regraded:           {args.attempts} attempts in {elapsed:.1f}s "
+          f"({args.attempts / elapsed:,.0f} attempts/s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
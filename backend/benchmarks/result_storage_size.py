@@ -0,0 +1,104 @@
+"""
+Сравнение размера хранения результатов тестов: JSON против компактного формата
+
+Генерирует синтетические попытки (тест из --questions вопросов: single choice,
+multiple choice и текстовые ответы) и считает размер полей answers +
+detailed_results в старом JSON-формате и correct_bits + answers_compact в
+новом. Размер на попытку усредняется по выборке --sample и экстраполируется
+на --attempts попыток (по умолчанию 10 млн). Сжатие TOAST не учитывается,
+поэтому для длинных тестов реальный размер старого формата будет меньше.
+БД не требуется.
+
+    python benchmarks/result_storage_size.py --attempts 10000000 --questions 20
+"""
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.result_codec import encode_result, decode_result
+
+# Per-value overhead of a varlena column in a heap tuple (short header)
+VARLENA_HEADER = 1
+# JSONB stores a binary tree; this is a rough overhead relative to compact text
+JSONB_OVERHEAD = 1.15
+
+
+def make_questions(count: int):
+    questions = []
+    for i in range(count):
+        kind = ("single_choice", "multiple_choice", "text_input")[i % 3]
+        if kind == "single_choice":
+            correct = random.choice("ABCD")
+        elif kind == "multiple_choice":
+            correct = sorted(random.sample("ABCD", 2))
+        else:
+            correct = f"answer {i}"
+        questions.append({"id": f"q{i + 1}", "type": kind, "correct_answer": correct, "points": 1})
+    return questions
+
+
+def random_answer(question):
+    if random.random() < 0.6:
+        return question["correct_answer"]
+    if question["type"] == "single_choice":
+        return random.choice("ABCD")
+    if question["type"] == "multiple_choice":
+        return sorted(random.sample("ABCD", random.randint(1, 3)))
+    return "wrong answer"
+
+
+def json_size(value) -> int:
+    return len(json.dumps(value, ensure_ascii=False).encode("utf-8")) + VARLENA_HEADER
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--attempts", type=int, default=10_000_000)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--sample", type=int, default=20_000)
+    args = parser.parse_args()
+
+    random.seed(42)
+    questions = make_questions(args.questions)
+
+    legacy_total = 0
+    compact_total = 0
+    for _ in range(args.sample):
+        user_answers = {q["id"]: random_answer(q) for q in questions}
+        detailed = []
+        for q in questions:
+            answer = user_answers[q["id"]]
+            correct = answer == q["correct_answer"]
+            detailed.append({
+                "question_id": q["id"],
+                "correct": correct,
+                "user_answer": answer,
+                "correct_answer": None if correct else q["correct_answer"]
+            })
+        legacy_answers = [{"question_id": qid, "answer": a} for qid, a in user_answers.items()]
+        legacy_total += json_size(legacy_answers) + json_size(detailed)
+
+        bits, answers = encode_result(questions, user_answers, [d["correct"] for d in detailed])
+        compact_total += (len(bits) + VARLENA_HEADER) + int(json_size(answers) * JSONB_OVERHEAD) + 17  # + version
+
+        assert decode_result(questions, bits, answers)[1] == detailed
+
+    legacy_per_row = legacy_total / args.sample
+    compact_per_row = compact_total / args.sample
+    gib = 1024 ** 3
+
+    print(f"questions per test:   {args.questions}")
+    print(f"sampled attempts:     {args.sample}")
+    print(f"legacy JSON per row:  {legacy_per_row:8.1f} bytes")
+    print(f"compact per row:      {compact_per_row:8.1f} bytes")
+    print(f"ratio:                {legacy_per_row / compact_per_row:8.2f}x")
+    print(f"legacy @ {args.attempts:,}:  {legacy_per_row * args.attempts / gib:8.2f} GiB")
+    print(f"compact @ {args.attempts:,}: {compact_per_row * args.attempts / gib:8.2f} GiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy import select, text
 from app.config import settings
 from app.db.base import Base
+from app.db.partitions import ensure_partitions
 from app.models.course import Course
 from app.models.module import Module
 from app.models.user import User
@@ -27,6 +28,7 @@ async def check_and_init():
         # Create tables
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await ensure_partitions(conn)
         print("✓ Tables created/verified")
         
         # Create session
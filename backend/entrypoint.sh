@@ -21,6 +21,12 @@ su - appuser -c "cd /app && python check_and_init.py" || {
   echo "Warning: Database initialization failed, but continuing..."
 }
 
+# Apply schema migrations on top of create_all (run as appuser)
+echo "Applying migrations..."
+su - appuser -c "cd /app && alembic upgrade head" || {
+  echo "Warning: Migrations failed, but continuing..."
+}
+
 # Start the application
 echo "Starting API server..."
 exec "$@"
@@ -0,0 +1,47 @@
+"""
+Скрипт для массового импорта пользователей из CSV или JSONL
+
+Поля: username, email, password (или готовый bcrypt password_hash),
+необязательный is_active. CSV — с заголовком. Пароли хэшируются в пуле
+процессов (IMPORT_HASH_WORKERS), строки загружаются через COPY пачками
+IMPORT_BATCH_SIZE. Ошибки выводятся по номерам строк.
+
+    python import_users.py cohort.csv [--format csv|jsonl]
+"""
+import argparse
+import asyncio
+import sys
+
+from app.db.session import engine
+from app.services.user_import import UserImportService, iter_user_records, shutdown_hash_pool
+
+
+async def import_users(path, fmt):
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            report = await UserImportService(engine).import_users(iter_user_records(f, fmt))
+
+        print(f"✓ Processed {report['total']} rows")
+        print(f"✓ Created {report['created']} users, failed {report['failed']}")
+        for error in report["errors"]:
+            print(f"  row {error['row']} ({error['username']}): {error['error']}")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        shutdown_hash_pool()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="default: by file extension")
+    args = parser.parse_args()
+    fmt = args.format or ("jsonl" if args.path.endswith((".jsonl", ".ndjson")) else "csv")
+    success = asyncio.run(import_users(args.path, fmt))
+    sys.exit(0 if success else 1)
@@ -7,6 +7,7 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy import select
 from app.config import settings
 from app.db.base import Base
+from app.db.partitions import ensure_partitions
 from app.models.module import Module
 from app.models.user import User
 from app.core.security import get_password_hash
@@ -18,6 +19,7 @@ async def init_db():
     # Create tables
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await ensure_partitions(conn)
     
     # Create session
     async_session = sessionmaker(
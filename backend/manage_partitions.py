@@ -0,0 +1,60 @@
+"""
+Скрипт для обслуживания помесячных партиций test_results
+
+  --ensure              создать партиции на PARTITION_MONTHS_AHEAD месяцев вперед
+  --detach-before DATE  отсоединить партиции за месяцы раньше DATE (YYYY-MM-DD)
+  --drop                удалить отсоединенные партиции (только вместе с --detach-before);
+                        партиции должны быть пустыми — сначала archive_results.py,
+                        иначе ничего не отсоединяется
+
+Отсоединение партиции — изменение каталога, а не DELETE по строкам, поэтому
+выполняется за O(1) независимо от объема данных.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import date
+
+from sqlalchemy import text
+
+from app.db.session import engine
+from app.db.partitions import ensure_partitions, detach_partitions_before
+
+
+async def manage_partitions(args):
+    try:
+        if args.ensure:
+            async with engine.begin() as conn:
+                created = await ensure_partitions(conn)
+            print(f"✓ Partitions in place: {', '.join(created) or 'none (table not partitioned)'}")
+
+        if args.detach_before:
+            async with engine.begin() as conn:
+                detached = await detach_partitions_before(
+                    conn, date.fromisoformat(args.detach_before), require_empty=args.drop
+                )
+                if args.drop:
+                    for name in detached:
+                        await conn.execute(text(f"DROP TABLE {name}"))
+            print(f"✓ Detached: {', '.join(detached) or 'nothing'}")
+            if args.drop and detached:
+                print("✓ Detached partitions dropped")
+
+        await engine.dispose()
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ensure", action="store_true")
+    parser.add_argument("--detach-before", default=None)
+    parser.add_argument("--drop", action="store_true")
+    args = parser.parse_args()
+    success = asyncio.run(manage_partitions(args))
+    sys.exit(0 if success else 1)
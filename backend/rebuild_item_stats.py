@@ -0,0 +1,66 @@
+"""
+Скрипт для пересборки статистики по вопросам из сохраненных результатов
+
+Нужен после потери данных Redis. Счетчики версии набора вопросов
+(по умолчанию текущей) собираются заново во временном хэше и подменяют
+старый через RENAME. Отправки тестов во время пересборки могут не попасть
+в статистику, поэтому запускайте, когда прием тестов приостановлен.
+
+    python rebuild_item_stats.py --module-id <uuid> [--version <version>]
+"""
+import argparse
+import asyncio
+import sys
+
+import redis.asyncio as redis
+
+from app.config import settings
+from app.db.session import AsyncSessionLocal, engine
+from app.core.cache import CacheService
+from app.core.storage import StorageService
+from app.services.content_service import ContentService
+from app.services.item_stats import ItemStatsService
+
+
+async def rebuild_item_stats(module_id, version):
+    redis_client = redis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
+    try:
+        content_service = ContentService(CacheService(redis_client), StorageService())
+        async with AsyncSessionLocal() as session:
+            if version is None:
+                test_questions = await content_service.get_test_questions(module_id, session)
+                if not test_questions or not test_questions.get("questions"):
+                    print(f"❌ Test questions not found for module {module_id}")
+                    return False
+                questions = test_questions["questions"]
+                version = await content_service.snapshot_question_set(
+                    module_id, questions, session, test_questions["question_set_version"]
+                )
+            else:
+                questions = await content_service.get_question_set(module_id, version, session)
+                if questions is None:
+                    print(f"❌ Question set version {version} not found for module {module_id}")
+                    return False
+
+            count = await ItemStatsService(redis_client).rebuild(session, module_id, version, questions)
+
+        print(f"✓ Item statistics of version {version} rebuilt from {count} results")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        await redis_client.close()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module-id", required=True)
+    parser.add_argument("--version", help="question-set version; default: current")
+    args = parser.parse_args()
+    success = asyncio.run(rebuild_item_stats(args.module_id, args.version))
+    sys.exit(0 if success else 1)
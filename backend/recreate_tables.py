@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy import text
 from app.config import settings
 from app.db.base import Base
+from app.db.partitions import ensure_partitions
 
 # Import all models to ensure they are registered with Base
 from app.models.user import User
@@ -29,6 +30,7 @@ async def recreate_tables():
         # Create all tables
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await ensure_partitions(conn)
         print("✓ All tables created")
         
         await engine.dispose()
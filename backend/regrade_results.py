@@ -0,0 +1,81 @@
+"""
+Скрипт для перепроверки сохраненных результатов теста модуля
+
+После исправления correct_answer в questions.json все попытки модуля
+проверяются заново по текущим вопросам (пакетами REGRADE_BATCH_SIZE),
+измененные баллы записываются обратно. Выводит, у кого сменился статус
+"сдал/не сдал". Средний балл в сводке пользователя (grade_sum/grade_count)
+меняется в той же транзакции, статусы прогресса не меняются. Архивные
+результаты не перепроверяются. После записи пересчитывается статистика по
+вопросам новой версии и сбрасываются кэши сводок затронутых пользователей.
+
+    python regrade_results.py --module-id <uuid> [--dry-run]
+"""
+import argparse
+import asyncio
+import sys
+
+import redis.asyncio as redis
+
+from app.config import settings
+from app.db.session import AsyncSessionLocal, engine
+from app.core.cache import CacheService
+from app.core.storage import StorageService
+from app.services.content_service import ContentService
+from app.services.item_stats import ItemStatsService
+from app.services.progress_service import ProgressService
+from app.services.regrade_service import RegradeService
+
+
+async def regrade_results(module_id, dry_run):
+    redis_client = redis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True)
+    try:
+        content_service = ContentService(CacheService(redis_client), StorageService())
+        async with AsyncSessionLocal() as session:
+            test_questions = await content_service.get_test_questions(module_id, session)
+            if not test_questions or not test_questions.get("questions"):
+                print(f"❌ Test questions not found for module {module_id}")
+                return False
+            service = RegradeService(session, content_service)
+            report = await service.regrade_module(
+                module_id, test_questions["questions"], dry_run=dry_run
+            )
+            if not dry_run:
+                rebuilt = await ItemStatsService(redis_client).rebuild(
+                    session, module_id, report["question_set_version"], test_questions["questions"]
+                )
+                print(f"✓ Item statistics rebuilt from {rebuilt} results")
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    for user_id in service.changed_users:
+                        pipe.delete(ProgressService.summary_cache_key(user_id))
+                    await pipe.execute()
+                print(f"✓ Summary cache cleared for {len(service.changed_users)} users")
+
+        prefix = "Would update" if dry_run else "Updated"
+        print(f"✓ Processed {report['processed']} results in {report['elapsed_seconds']}s")
+        print(f"✓ {prefix} {report['updated']} results, skipped {report['skipped']}")
+        for flip in report["flipped_to_pass"]:
+            print(f"  + passed: result {flip['result_id']} user {flip['user_id']} "
+                  f"{flip['old_percentage']}% -> {flip['new_percentage']}%")
+        for flip in report["flipped_to_fail"]:
+            print(f"  - failed: result {flip['result_id']} user {flip['user_id']} "
+                  f"{flip['old_percentage']}% -> {flip['new_percentage']}%")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        await redis_client.close()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module-id", required=True)
+    parser.add_argument("--dry-run", action="store_true", help="report changes without writing them")
+    args = parser.parse_args()
+    success = asyncio.run(regrade_results(args.module_id, args.dry_run))
+    sys.exit(0 if success else 1)
@@ -0,0 +1,47 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import test_sessions
+
+
+@pytest.fixture
+async def redis_client():
+    """Redis for the session scripts: TEST_REDIS_URL if set, else fakeredis with Lua.
+
+    TEST_REDIS_URL must point at a throwaway database; it is flushed before
+    and after each test.
+    """
+    url = os.environ.get("TEST_REDIS_URL")
+    if url:
+        import redis.asyncio as redis
+        client = redis.from_url(url, decode_responses=True)
+        try:
+            await client.ping()
+        except Exception:
+            pytest.skip(f"Redis at {url} is unavailable")
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    await client.flushdb()
+    yield client
+    await client.flushdb()
+    await client.aclose()
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    """Controls time.time() as seen by the session service"""
+    fake = Clock(1_700_000_000.0)
+    monkeypatch.setattr(test_sessions, "time", SimpleNamespace(time=fake))
+    return fake
@@ -0,0 +1,80 @@
+import pytest
+
+from app.services.test_forms import (
+    FormSpec, SeededPermutation, asked_questions, build_form, form_seed, form_size, form_spec
+)
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 10, 17, 100, 1000])
+def test_permutation_is_a_bijection(n):
+    permutation = SeededPermutation(n, seed=12345)
+    assert sorted(permutation[position] for position in range(n)) == list(range(n))
+
+
+def test_permutation_is_fixed_by_seed():
+    first = [SeededPermutation(500, 7)[position] for position in range(500)]
+    again = [SeededPermutation(500, 7)[position] for position in range(500)]
+    other = [SeededPermutation(500, 8)[position] for position in range(500)]
+
+    assert first == again
+    assert first != other
+
+
+def test_permutation_values_are_pinned():
+    # Stored seeds must decode to the same questions forever
+    assert [SeededPermutation(10, 42)[position] for position in range(10)] == PINNED_PERMUTATION
+
+
+def test_asked_questions_is_deterministic_and_sorted():
+    asked = asked_questions(987654321, 10000, 20)
+
+    assert asked == asked_questions(987654321, 10000, 20)
+    assert asked == sorted(asked)
+    assert len(set(asked)) == 20
+    assert all(0 <= index < 10000 for index in asked)
+
+
+def test_asked_questions_form_order_is_a_prefix_of_the_permutation():
+    permutation = SeededPermutation(50, 99)
+    assert asked_questions(99, 50, 5, shuffle=True) == [permutation[position] for position in range(5)]
+
+
+def test_asked_questions_without_size():
+    assert asked_questions(1, 5, None) == [0, 1, 2, 3, 4]
+    shuffled = asked_questions(1, 5, None, shuffle=True)
+    assert sorted(shuffled) == [0, 1, 2, 3, 4]
+    assert shuffled == asked_questions(1, 5, None, shuffle=True)
+
+
+def test_form_seed_depends_on_attempt():
+    assert form_seed("user", "module", 1) == form_seed("user", "module", 1)
+    assert form_seed("user", "module", 1) != form_seed("user", "module", 2)
+    assert 0 <= form_seed("user", "module", 1) < 1 << 63
+
+
+def test_form_spec_and_size():
+    spec = form_spec({"questions_per_attempt": 3, "shuffle_options": True})
+
+    assert spec == FormSpec(shuffle_options=True, size=3)
+    assert form_size(spec, 10) == 3
+    assert form_size(spec, 3) is None
+    assert form_spec(None).is_identity
+
+
+def test_build_form_matches_asked_questions_and_keeps_the_cache_intact():
+    public_test = {
+        "title": "Test",
+        "questions": [{"id": f"q{i}", "options": ["a", "b", "c"]} for i in range(8)]
+    }
+    spec = FormSpec(shuffle_questions=True, shuffle_options=True, size=4)
+
+    form = build_form(public_test, 2024, spec)
+
+    indices = asked_questions(2024, 8, 4, shuffle=True)
+    assert [question["id"] for question in form["questions"]] == [f"q{i}" for i in indices]
+    assert all(sorted(question["options"]) == ["a", "b", "c"] for question in form["questions"])
+    assert form["title"] == "Test"
+    assert all(question["options"] == ["a", "b", "c"] for question in public_test["questions"])
+
+
+PINNED_PERMUTATION = [4, 6, 5, 2, 8, 0, 9, 1, 7, 3]
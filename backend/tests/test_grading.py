@@ -0,0 +1,74 @@
+from app.services.test_service import (
+    CHOICES, EXACT, NO_ANSWER, SORTED, TEXT,
+    TestGradingService as GradingService, compile_grading_plan, select_plan
+)
+
+QUESTIONS = [
+    {"id": "q1", "options": ["Paris", "Rome"], "correct_answer": " Paris ", "points": 2},
+    {"id": "q2", "options": ["a", "b", "c"], "correct_answer": ["a", "c"]},
+    {"id": "q3", "correct_answer": ["x", "x", "y"]},
+    {"id": "q4", "correct_answer": 42, "points": 3},
+    {"id": "q5", "correct_answer": None},
+]
+
+
+def answers(**by_id):
+    return [{"question_id": question_id, "answer": answer} for question_id, answer in by_id.items()]
+
+
+def test_plan_kinds_and_normalized_answers():
+    plan = compile_grading_plan(QUESTIONS)
+
+    assert [item.kind for item in plan.items] == [TEXT, CHOICES, SORTED, EXACT, NO_ANSWER]
+    assert plan.items[0].expected == "paris"
+    assert plan.items[1].expected == frozenset(["a", "c"])
+    assert plan.items[2].expected == ["x", "x", "y"]
+    assert plan.index == {"q1": 0, "q2": 1, "q3": 2, "q4": 3, "q5": 4}
+    assert plan.max_score == 2 + 1 + 1 + 3 + 1
+
+
+def test_unhashable_choices_fall_back_to_sorted():
+    plan = compile_grading_plan([{"id": "q", "correct_answer": [[1], [2]]}])
+    assert plan.items[0].kind == SORTED
+
+
+def test_grading_normalizes_user_answers():
+    result = GradingService().grade_test(
+        answers(q1="PARIS", q2=["c", "a"], q3=["y", "x", "x"], q4=42, q5="anything"),
+        QUESTIONS
+    )
+
+    assert [detail.correct for detail in result.detailed_results] == [True, True, True, True, False]
+    assert result.score == 7
+    assert result.max_score == 8
+    assert result.percentage == 87
+    assert result.passed
+
+
+def test_wrong_and_missing_answers():
+    result = GradingService().grade_test(
+        answers(q1="Rome", q2=["a", "a"], q3=["x", "y"], q4="42"),
+        QUESTIONS
+    )
+
+    assert result.score == 0
+    assert not result.passed
+    # Correct answers are only revealed for wrong ones
+    assert result.detailed_results[0].correct_answer == " Paris "
+    assert result.detailed_results[4].user_answer is None
+
+
+def test_select_plan_grades_a_sampled_form():
+    plan = select_plan(compile_grading_plan(QUESTIONS), [0, 3])
+
+    assert plan.max_score == 5
+    assert plan.index == {"q1": 0, "q4": 1}
+
+    result = GradingService().grade_test(answers(q1="paris", q4=1), QUESTIONS, plan=plan)
+    assert [detail.question_id for detail in result.detailed_results] == ["q1", "q4"]
+    assert (result.score, result.max_score, result.percentage, result.passed) == (2, 5, 40, False)
+
+
+def test_plan_without_points_never_passes():
+    result = GradingService().grade_test([], [{"id": "q", "correct_answer": "a", "points": 0}])
+    assert (result.percentage, result.passed) == (0, False)
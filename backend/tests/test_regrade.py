@@ -0,0 +1,128 @@
+import random
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services import regrade_service
+from app.services.regrade_service import RegradeEngine, RegradeService
+from app.services.test_forms import asked_questions
+from app.services.test_service import TestGradingService as GradingService, select_plan
+
+QUESTIONS = [
+    {"id": "single", "options": ["Paris", "Rome", "Oslo"], "correct_answer": "paris", "points": 2},
+    {"id": "multi", "options": ["a", "b", "c", "d"], "correct_answer": ["a", "c"]},
+    {"id": "text", "correct_answer": "Photosynthesis"},
+    {"id": "number", "correct_answer": 42, "points": 3},
+    {"id": "dupes", "options": ["x", "y"], "correct_answer": ["x", "x"]},
+    {"id": "unkeyed", "options": ["p", "q"], "correct_answer": None},
+    {"id": "foreign", "options": ["yes", "no"], "correct_answer": "maybe"},
+]
+
+CANDIDATES = {
+    "single": ["Paris", " PARIS ", "Rome", "Oslo", "London", None, 1, ["Paris"]],
+    "multi": [["a", "c"], ["c", "a"], ["a"], ["a", "c", "c"], ["a", "e"], "a", None, [["a"]], []],
+    "text": ["photosynthesis", "  Photosynthesis", "osmosis", None, 7],
+    "number": [42, 42.0, "42", 41, None, True],
+    "dupes": [["x", "x"], ["x"], ["x", "y"], None],
+    "unkeyed": ["p", None],
+    "foreign": ["maybe", "yes", None],
+}
+
+
+def random_rows(count, seed):
+    rng = random.Random(seed)
+    return [[rng.choice(CANDIDATES[question["id"]]) for question in QUESTIONS] for _ in range(count)]
+
+
+def by_id(row, indices=None):
+    indices = range(len(QUESTIONS)) if indices is None else indices
+    return [{"question_id": QUESTIONS[i]["id"], "answer": row[i]} for i in indices if row[i] is not None]
+
+
+async def test_engine_matches_grading_service():
+    rows = random_rows(500, seed=1)
+    engine = RegradeEngine(QUESTIONS)
+
+    graded = await engine.grade(rows)
+
+    grader = GradingService()
+    for position, row in enumerate(rows):
+        expected = grader.grade_test(by_id(row), QUESTIONS)
+        assert list(graded["correct"][position]) == [detail.correct for detail in expected.detailed_results]
+        assert int(graded["score"][position]) == expected.score
+        assert int(graded["max_score"][position]) == expected.max_score
+        assert int(graded["percentage"][position]) == expected.percentage
+        assert bool(graded["passed"][position]) == expected.passed
+
+
+async def test_engine_matches_grading_service_on_sampled_forms():
+    rows = random_rows(200, seed=2)
+    asked = [
+        asked_questions(seed, len(QUESTIONS), 4) if seed % 3 else None
+        for seed in range(len(rows))
+    ]
+    engine = RegradeEngine(QUESTIONS)
+
+    graded = await engine.grade(rows, asked)
+
+    grader = GradingService()
+    for position, (row, indices) in enumerate(zip(rows, asked)):
+        plan = engine.plan if indices is None else select_plan(engine.plan, indices)
+        expected = grader.grade_test(by_id(row, indices), QUESTIONS, plan=plan)
+        assert int(graded["score"][position]) == expected.score
+        assert int(graded["max_score"][position]) == expected.max_score
+        assert int(graded["percentage"][position]) == expected.percentage
+        assert bool(graded["passed"][position]) == expected.passed
+
+
+async def test_pool_path_matches_inline_path(monkeypatch):
+    rows = random_rows(300, seed=3)
+    inline = await RegradeEngine(QUESTIONS).grade(rows)
+
+    monkeypatch.setattr(regrade_service, "POOL_MIN_CELLS", 0)
+    monkeypatch.setattr(regrade_service.settings, "REGRADE_WORKERS", 2)
+    pooled = await RegradeEngine(QUESTIONS).grade(rows)
+
+    assert (pooled["correct"] == inline["correct"]).all()
+    assert (pooled["score"] == inline["score"]).all()
+
+
+@pytest.mark.parametrize("correct_flags", [[True] * 7, [False] * 7, [i % 2 == 0 for i in range(7)]])
+async def test_bits_use_result_codec_layout(correct_flags):
+    from app.services.result_codec import encode_result
+
+    rows = [[
+        "Paris" if correct_flags[0] else "Rome",
+        ["a", "c"] if correct_flags[1] else ["b"],
+        "photosynthesis" if correct_flags[2] else "no",
+        42 if correct_flags[3] else 0,
+        ["x", "x"] if correct_flags[4] else ["y"],
+        "p",
+        "maybe" if correct_flags[6] else "no",
+    ]]
+    # The unkeyed question is never correct
+    flags = [flag and i != 5 for i, flag in enumerate(correct_flags)]
+
+    graded = await RegradeEngine(QUESTIONS).grade(rows)
+
+    expected_bits, _ = encode_result(QUESTIONS, {}, flags)
+    assert graded["bits"][0].tobytes() == expected_bits
+
+
+def test_summary_deltas_move_passing_percentages():
+    batch = [
+        SimpleNamespace(user_id="u1", passed=True, percentage=80),
+        SimpleNamespace(user_id="u1", passed=False, percentage=40),
+        SimpleNamespace(user_id="u2", passed=True, percentage=70),
+        SimpleNamespace(user_id=None, passed=False, percentage=10),
+    ]
+    graded = {
+        "passed": np.array([True, True, False, True]),
+        "percentage": np.array([75, 90, 50, 95]),
+    }
+
+    deltas = RegradeService._summary_deltas(batch, [0, 1, 2, 3], graded)
+
+    # u1: 80 -> 75 and a fail turned into a 90 pass; u2 drops out of the average
+    assert deltas == {"u1": (85, 1), "u2": (-70, -1)}
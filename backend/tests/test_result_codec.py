@@ -0,0 +1,52 @@
+from app.services.result_codec import decode_result, encode_result, is_correct, question_set_version
+
+QUESTIONS = [{"id": f"q{i}", "correct_answer": f"a{i}"} for i in range(11)]
+
+
+def test_round_trip():
+    flags = [i % 3 == 0 for i in range(11)]
+    user_answers = {f"q{i}": f"u{i}" for i in range(11) if i != 4}
+
+    bits, answers = encode_result(QUESTIONS, user_answers, flags)
+
+    assert len(bits) == 2
+    assert [is_correct(bits, i) for i in range(11)] == flags
+    assert answers[4] is None
+
+    legacy_answers, detailed = decode_result(QUESTIONS, bits, answers)
+    assert legacy_answers == [
+        {"question_id": question_id, "answer": answer} for question_id, answer in user_answers.items()
+    ]
+    assert [detail["correct"] for detail in detailed] == flags
+    assert [detail["user_answer"] for detail in detailed] == answers
+    # Correct answers are only revealed for wrong ones
+    assert detailed[0]["correct_answer"] is None
+    assert detailed[1]["correct_answer"] == "a1"
+
+
+def test_bit_layout():
+    bits, _ = encode_result(QUESTIONS, {}, [i in (0, 9) for i in range(11)])
+    assert bits == bytes([0b00000001, 0b00000010])
+
+
+def test_decode_sampled_form():
+    bits, answers = encode_result(QUESTIONS, {"q2": "x", "q7": "y"}, [i == 7 for i in range(11)])
+
+    legacy_answers, detailed = decode_result(QUESTIONS, bits, answers, asked=[2, 7])
+
+    assert [detail["question_id"] for detail in detailed] == ["q2", "q7"]
+    assert [detail["correct"] for detail in detailed] == [False, True]
+    assert len(legacy_answers) == 2
+
+
+def test_decode_tolerates_short_answer_lists():
+    bits, _ = encode_result(QUESTIONS, {}, [False] * 11)
+    _, detailed = decode_result(QUESTIONS, bits, [])
+    assert all(detail["user_answer"] is None for detail in detailed)
+
+
+def test_version_is_content_hash():
+    reordered = [dict(reversed(list(question.items()))) for question in QUESTIONS]
+
+    assert question_set_version(QUESTIONS) == question_set_version(reordered)
+    assert question_set_version(QUESTIONS) != question_set_version(QUESTIONS[:-1])
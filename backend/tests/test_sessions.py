@@ -0,0 +1,144 @@
+import pytest
+
+from app.config import settings
+from app.services.test_sessions import (
+    CLAIMED, DEADLINES_KEY, EXPIRED, FINALIZE_RETRY_SECONDS, FINALIZING, NO_SESSION, NOT_ACTIVE,
+    NOT_DUE, SAVED, TIME_UP, TestSessionService as SessionService
+)
+
+USER = "11111111-1111-1111-1111-111111111111"
+MODULE = "Module_01"
+MEMBER = f"{USER}:{MODULE}"
+ANSWERS = [{"question_id": "q1", "answer": ["a", "b"]}, {"question_id": "q2", "answer": "текст"}]
+
+
+@pytest.fixture
+def sessions(redis_client):
+    return SessionService(redis_client)
+
+
+def past_grace(clock, deadline):
+    clock.now = deadline + settings.TEST_SESSION_GRACE_SECONDS + 1
+
+
+async def test_start_resumes_the_same_attempt(sessions, clock, redis_client):
+    deadline, bank_version, created = await sessions.start(USER, MODULE, 1, 30, "v1")
+    assert deadline == clock.now + 30 * 60
+    assert (bank_version, created) == ("v1", True)
+    assert await redis_client.zrange(DEADLINES_KEY, 0, -1, withscores=True) == [(MEMBER, deadline)]
+
+    clock.now += 60
+    # Reloading keeps the deadline and the pinned bank version
+    assert await sessions.start(USER, MODULE, 1, 30, "v2") == (deadline, "v1", False)
+
+    # The next attempt replaces the session and its answers
+    await sessions.save_answers(USER, MODULE, ANSWERS)
+    assert await sessions.start(USER, MODULE, 2, None) == (None, None, True)
+    assert (await sessions.get(USER, MODULE))["answers"] == []
+    assert await redis_client.zscore(DEADLINES_KEY, MEMBER) is None
+
+
+async def test_autosave_until_deadline_and_grace(sessions, clock):
+    deadline, _, _ = await sessions.start(USER, MODULE, 1, 10)
+
+    assert await sessions.save_answers(USER, MODULE, ANSWERS) == SAVED
+    session = await sessions.get(USER, MODULE)
+    assert session["answers"] == ANSWERS
+    assert session["attempt"] == 1
+
+    clock.now = deadline + settings.TEST_SESSION_GRACE_SECONDS
+    assert await sessions.save_answers(USER, MODULE, ANSWERS) == SAVED
+    past_grace(clock, deadline)
+    assert await sessions.save_answers(USER, MODULE, ANSWERS) == TIME_UP
+
+
+async def test_submit_claim_is_exclusive(sessions, clock, redis_client):
+    await sessions.start(USER, MODULE, 1, 10)
+    await sessions.save_answers(USER, MODULE, ANSWERS)
+
+    code, session = await sessions.claim(USER, MODULE)
+    assert code == CLAIMED
+    assert session["answers"] == ANSWERS
+    # A claimed session is rescheduled for the sweeper in case the writer dies
+    assert await redis_client.zscore(DEADLINES_KEY, MEMBER) == clock.now + FINALIZE_RETRY_SECONDS
+
+    assert await sessions.claim(USER, MODULE) == (FINALIZING, None)
+    assert await sessions.save_answers(USER, MODULE, ANSWERS) == NOT_ACTIVE
+
+
+async def test_late_submit_loses_to_the_sweeper(sessions, clock):
+    deadline, _, _ = await sessions.start(USER, MODULE, 1, 10)
+
+    assert await sessions.claim(USER, MODULE, mode="expire") == (NOT_DUE, None)
+
+    past_grace(clock, deadline)
+    assert await sessions.claim(USER, MODULE) == (EXPIRED, None)
+    code, _ = await sessions.claim(USER, MODULE, mode="expire")
+    assert code == CLAIMED
+
+
+async def test_untimed_session_is_never_expired(sessions, clock):
+    await sessions.start(USER, MODULE, 1, None)
+
+    clock.now += 365 * 86400
+    assert await sessions.claim(USER, MODULE, mode="expire") == (NOT_DUE, None)
+    code, _ = await sessions.claim(USER, MODULE)
+    assert code == CLAIMED
+
+
+async def test_sweeper_retries_a_stuck_finalization(sessions, clock):
+    await sessions.start(USER, MODULE, 1, 10)
+    await sessions.claim(USER, MODULE)
+
+    assert await sessions.due() == []
+    clock.now += FINALIZE_RETRY_SECONDS + settings.TEST_SESSION_GRACE_SECONDS + 1
+    assert await sessions.due() == [(USER, MODULE)]
+    code, _ = await sessions.claim(USER, MODULE, mode="expire")
+    assert code == CLAIMED
+
+
+async def test_release_hands_the_session_back(sessions, clock, redis_client):
+    deadline, _, _ = await sessions.start(USER, MODULE, 1, 10)
+    await sessions.claim(USER, MODULE)
+
+    await sessions.release(USER, MODULE)
+
+    assert await redis_client.zscore(DEADLINES_KEY, MEMBER) == deadline
+    assert await sessions.save_answers(USER, MODULE, ANSWERS) == SAVED
+    code, _ = await sessions.claim(USER, MODULE)
+    assert code == CLAIMED
+
+
+async def test_release_of_untimed_session_drops_the_retry(sessions, redis_client):
+    await sessions.start(USER, MODULE, 1, None)
+    await sessions.claim(USER, MODULE)
+    assert await redis_client.zscore(DEADLINES_KEY, MEMBER) is not None
+
+    await sessions.release(USER, MODULE)
+
+    assert await redis_client.zscore(DEADLINES_KEY, MEMBER) is None
+
+
+async def test_finish_and_forget(sessions, clock, redis_client):
+    deadline, _, _ = await sessions.start(USER, MODULE, 1, 10)
+    await sessions.claim(USER, MODULE)
+
+    await sessions.finish(USER, MODULE)
+
+    assert await sessions.get(USER, MODULE) is None
+    assert await sessions.claim(USER, MODULE) == (NO_SESSION, None)
+    assert await redis_client.zscore(DEADLINES_KEY, MEMBER) is None
+
+    # A deadline left behind by an expired hash
+    await redis_client.zadd(DEADLINES_KEY, {MEMBER: deadline})
+    await sessions.forget(USER, MODULE)
+    assert await redis_client.zscore(DEADLINES_KEY, MEMBER) is None
+
+
+async def test_due_lists_sessions_past_grace(sessions, clock):
+    deadline, _, _ = await sessions.start(USER, MODULE, 1, 10)
+    await sessions.start(USER, "Module_02", 1, 20)
+
+    past_grace(clock, deadline)
+
+    assert await sessions.due() == [(USER, MODULE)]
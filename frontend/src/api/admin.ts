@@ -63,12 +63,23 @@ export interface LessonContent {
   files?: string[];
 }
 
+// Admin listings are keyset-paginated; follow X-Next-Cursor until exhausted
+const fetchAllPages = async <T>(url: string, params: Record<string, string> = {}): Promise<T[]> => {
+  const items: T[] = [];
+  let cursor: string | undefined;
+  do {
+    const response = await axios.get<T[]>(url, { params: cursor ? { ...params, cursor } : params });
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return items;
+};
+
 // Course and Module Management
 export const adminApi = {
   // Courses
   listCourses: async (): Promise<Course[]> => {
-    const response = await axios.get('/admin/courses');
-    return response.data;
+    return fetchAllPages<Course>('/admin/courses');
   },
 
   getCourse: async (courseId: string): Promise<CourseWithModules> => {
@@ -92,11 +103,7 @@ export const adminApi = {
 
   // Modules
   listModules: async (courseId?: string) => {
-    const url = courseId 
-      ? `/admin/modules?course_id=${courseId}`
-      : '/admin/modules';
-    const response = await axios.get(url);
-    return response.data;
+    return fetchAllPages('/admin/modules', courseId ? { course_id: courseId } : {});
   },
 
   createModule: async (moduleData: ModuleCreate) => {
@@ -14,6 +14,7 @@ export interface RegisterData {
 export interface TokenResponse {
   access_token: string
   token_type: string
+  refresh_token?: string | null
 }
 
 export const login = async (credentials: LoginCredentials): Promise<TokenResponse> => {
@@ -21,6 +22,14 @@ export const login = async (credentials: LoginCredentials): Promise<TokenRespons
   return response.data
 }
 
+export const logout = async (accessToken: string, refreshToken?: string | null) => {
+  await api.post(
+    '/auth/logout',
+    refreshToken ? { refresh_token: refreshToken } : undefined,
+    { headers: { Authorization: `Bearer ${accessToken}` } }
+  )
+}
+
 export const register = async (data: RegisterData) => {
   const response = await api.post('/auth/register', data)
   return response.data
@@ -21,12 +21,46 @@ api.interceptors.request.use(
   }
 )
 
+// Single in-flight refresh shared by all requests that got 401
+let refreshPromise: Promise<string | null> | null = null
+
+const refreshAccessToken = async (): Promise<string | null> => {
+  const refreshToken = localStorage.getItem('refresh_token')
+  if (!refreshToken) {
+    return null
+  }
+  try {
+    // Plain axios: the refresh call must not go through these interceptors
+    const response = await axios.post('/api/v1/auth/refresh', { refresh_token: refreshToken })
+    localStorage.setItem('access_token', response.data.access_token)
+    if (response.data.refresh_token) {
+      localStorage.setItem('refresh_token', response.data.refresh_token)
+    }
+    return response.data.access_token
+  } catch {
+    return null
+  }
+}
+
 // Response interceptor to handle errors
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const original = error.config
+    if (error.response?.status === 401 && original && !original._retry) {
+      original._retry = true
+      refreshPromise = refreshPromise || refreshAccessToken().finally(() => {
+        refreshPromise = null
+      })
+      const token = await refreshPromise
+      if (token) {
+        original.headers.Authorization = `Bearer ${token}`
+        return api(original)
+      }
+    }
     if (error.response?.status === 401) {
       localStorage.removeItem('access_token')
+      localStorage.removeItem('refresh_token')
       window.location.href = '/login'
     }
     return Promise.reject(error)
@@ -12,6 +12,7 @@ export interface TestSubmission {
 export interface TestResult {
   status: string
   result_id: string
+  completed_at?: string
   score: number
   max_score: number
   percentage: number
@@ -36,8 +37,11 @@ export const submitTest = async (moduleId: string, submission: TestSubmission):
   return response.data
 }
 
-export const getTestResult = async (resultId: string) => {
-  const response = await api.get(`/tests/results/${resultId}`)
+export const getTestResult = async (resultId: string, completedAt?: string) => {
+  // completedAt lets the backend read a single test_results partition
+  const response = await api.get(`/tests/results/${resultId}`, {
+    params: completedAt ? { completed_at: completedAt } : undefined
+  })
   return response.data
 }
 
@@ -1,5 +1,5 @@
 import React, { createContext, useContext, useState, useEffect } from 'react'
-import { login as apiLogin, getCurrentUser } from '../api/auth'
+import { login as apiLogin, logout as apiLogout, getCurrentUser } from '../api/auth'
 
 interface User {
   id: string
@@ -58,11 +58,21 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
   const login = async (username: string, password: string) => {
     const response = await apiLogin({ username, password })
     localStorage.setItem('access_token', response.access_token)
+    if (response.refresh_token) {
+      localStorage.setItem('refresh_token', response.refresh_token)
+    } else {
+      localStorage.removeItem('refresh_token')
+    }
     await loadUser()
   }
 
   const logout = () => {
+    const accessToken = localStorage.getItem('access_token')
+    if (accessToken) {
+      apiLogout(accessToken, localStorage.getItem('refresh_token')).catch(() => {})
+    }
     localStorage.removeItem('access_token')
+    localStorage.removeItem('refresh_token')
     setUser(null)
   }
 